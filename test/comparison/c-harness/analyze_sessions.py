@@ -8,13 +8,22 @@ Usage:
 
 import os
 import sys
-import json
-import glob
 import re
+import importlib.util
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 SESSIONS_DIR = os.path.normpath(os.path.join(SCRIPT_DIR, '..', 'sessions'))
 
+# Session catalog (see session_index.py).
+_si_spec = importlib.util.spec_from_file_location('session_index', os.path.join(SCRIPT_DIR, 'session_index.py'))
+_session_index = importlib.util.module_from_spec(_si_spec)
+_si_spec.loader.exec_module(_session_index)
+
+# Random-access session reader (see session_reader.py).
+_sr_spec = importlib.util.spec_from_file_location('session_reader', os.path.join(SCRIPT_DIR, 'session_reader.py'))
+_session_reader = importlib.util.module_from_spec(_sr_spec)
+_sr_spec.loader.exec_module(_session_reader)
+
 # Patterns for detecting events
 DESCENT_PATTERNS = [
     r'You descend',
@@ -76,10 +85,9 @@ LEVEL_INDICATOR = re.compile(r'(Dlvl|Mines|Sokoban|Quest|Astral|Fort|Vlad|Air|Ea
 
 def analyze_session(session_path):
     """Analyze a session for events."""
-    with open(session_path) as f:
-        session_data = json.load(f)
+    session_data = _session_reader.SessionReader(session_path)
 
-    steps = session_data.get('steps', [])
+    steps = session_data
     seed = session_data.get('seed', 0)
     options = session_data.get('options', {})
 
@@ -103,7 +111,7 @@ def analyze_session(session_path):
 
     current_depth = 1
 
-    for step in steps:
+    for step in steps.iter_steps():
         msg = step.get('msg', '')
         if not msg:
             continue
@@ -177,15 +185,13 @@ def analyze_session(session_path):
 def main():
     pattern = sys.argv[1] if len(sys.argv) > 1 else '*'
 
-    # Find sessions
+    # Find sessions in the catalog
+    index = _session_index.load_index()
     if pattern == '*':
-        sessions = glob.glob(os.path.join(SESSIONS_DIR, '*_gameplay.session.json'))
-        sessions += glob.glob(os.path.join(SESSIONS_DIR, '*_selfplay*.session.json'))
-        sessions += glob.glob(os.path.join(SESSIONS_DIR, '*_wizard.session.json'))
+        keys = _session_index.select_gameplay(index, directory=SESSIONS_DIR)
     else:
-        sessions = glob.glob(os.path.join(SESSIONS_DIR, f'*{pattern}*.session.json'))
-
-    sessions = sorted(sessions)
+        keys = _session_index.select(index, pattern=f'*{pattern}*.session.json', directory=SESSIONS_DIR)
+    sessions = [_session_index.session_path(key) for key in keys]
 
     all_stats = []
     for session_path in sessions:
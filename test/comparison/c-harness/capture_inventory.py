@@ -47,21 +47,26 @@ CHARACTER = {
 # Reuse helpers
 parse_rng_lines = _session.parse_rng_lines
 compact_session_json = _session.compact_session_json
-read_rng_log = _session.read_rng_log
+RngLogTailer = _session.RngLogTailer
 tmux_send = _session.tmux_send
 tmux_send_special = _session.tmux_send_special
+tmux_capture = _session.tmux_capture
+tmux_kill_session = _session.tmux_kill_session
 capture_screen_lines = _session.capture_screen_lines
 clear_more_prompts = _session.clear_more_prompts
 detect_depth = _session.detect_depth
 quit_game = _session.quit_game
 fixed_datetime_env = _session.fixed_datetime_env
+create_sandbox = _session.create_sandbox
 
-RESULTS_DIR = os.path.join(SCRIPT_DIR, 'results')
 
+def setup_home(tmpdir):
+    """Create a capture sandbox in tmpdir with .nethackrc for CHARACTER.
 
-def setup_home():
-    os.makedirs(RESULTS_DIR, exist_ok=True)
-    nethackrc = os.path.join(RESULTS_DIR, '.nethackrc')
+    Returns (home, nethackdir), the HOME and NETHACKDIR to launch with.
+    """
+    home, nethackdir = create_sandbox(tmpdir, INSTALL_DIR)
+    nethackrc = os.path.join(home, '.nethackrc')
     with open(nethackrc, 'w') as f:
         f.write(f'OPTIONS=name:{CHARACTER["name"]}\n')
         f.write(f'OPTIONS=race:{CHARACTER["race"]}\n')
@@ -71,31 +76,20 @@ def setup_home():
         f.write('OPTIONS=!autopickup\n')
         f.write('OPTIONS=suppress_alert:3.4.3\n')
         f.write('OPTIONS=symset:DECgraphics\n')
-
-    # Clean up stale game state
-    import glob
-    save_dir = os.path.join(INSTALL_DIR, 'save')
-    if os.path.isdir(save_dir):
-        for f in glob.glob(os.path.join(save_dir, '*')):
-            os.unlink(f)
-    for pattern in ['*wizard*', '*Wizard*', '*Merlin*', '*merlin*', 'bon*']:
-        for f in glob.glob(os.path.join(INSTALL_DIR, pattern)):
-            if not f.endswith('.lua'):
-                os.unlink(f)
+    return home, nethackdir
 
 
 def wait_for_game_ready(session, rng_log_file):
     """Navigate startup prompts until the game is ready."""
+    rng_tail = RngLogTailer(rng_log_file)
     for attempt in range(60):
         try:
-            content = subprocess.run(
-                ['tmux', 'capture-pane', '-t', session, '-p', '-S', '0', '-E', '30'],
-                capture_output=True, text=True, check=True
-            ).stdout
+            content = tmux_capture(session)
         except subprocess.CalledProcessError:
             break
 
-        rng_count, _ = read_rng_log(rng_log_file)
+        rng_tail.read_new()
+        rng_count = rng_tail.count
 
         if '--More--' in content:
             print(f'  [startup-{attempt}] rng={rng_count} --More--')
@@ -178,9 +172,8 @@ def run_session(seed, output_json, move_str):
         print(f"Error: nethack binary not found at {NETHACK_BINARY}")
         sys.exit(1)
 
-    setup_home()
-
     tmpdir = tempfile.mkdtemp(prefix='webhack-inv-')
+    home, nethackdir = setup_home(tmpdir)
     rng_log_file = os.path.join(tmpdir, 'rnglog.txt')
     dumpmap_file = os.path.join(tmpdir, 'dumpmap.txt')
 
@@ -189,11 +182,11 @@ def run_session(seed, output_json, move_str):
     try:
         cmd = (
             f'{fixed_datetime_env()}'
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'NETHACK_SEED={seed} '
             f'NETHACK_RNGLOG={rng_log_file} '
             f'NETHACK_DUMPMAP={dumpmap_file} '
-            f'HOME={RESULTS_DIR} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u {CHARACTER["name"]} -D; '
             f'sleep 999'
@@ -214,10 +207,11 @@ def run_session(seed, output_json, move_str):
 
         # Capture startup state
         startup_screen = capture_screen_lines(session_name)
-        startup_rng_count, startup_rng_lines = read_rng_log(rng_log_file)
+        rng_tail = RngLogTailer(rng_log_file)
+        startup_rng_entries = rng_tail.read_new_entries()
+        startup_rng_count = rng_tail.count
         print(f'Startup: {startup_rng_count} RNG calls')
 
-        startup_rng_entries = parse_rng_lines(startup_rng_lines)
         session_data = {
             'version': 1,
             'seed': seed,
@@ -248,9 +242,8 @@ def run_session(seed, output_json, move_str):
             # For inventory, the display stays up until dismissed
             # Capture what's on screen before dismissing
             screen = capture_screen_lines(session_name)
-            rng_count, rng_lines = read_rng_log(rng_log_file)
-            delta_lines = rng_lines[prev_rng_count:rng_count]
-            rng_entries = parse_rng_lines(delta_lines)
+            rng_entries = rng_tail.read_new_entries()
+            rng_count = rng_tail.count
 
             # Detect depth from status line
             depth = detect_depth(screen)
@@ -281,10 +274,7 @@ def run_session(seed, output_json, move_str):
 
             # After inventory display, need to dismiss it
             # C NetHack inventory uses a menu that needs ESC or space to dismiss
-            content = subprocess.run(
-                ['tmux', 'capture-pane', '-t', session_name, '-p', '-S', '0', '-E', '30'],
-                capture_output=True, text=True, check=True
-            ).stdout
+            content = tmux_capture(session_name)
             if '(end)' in content or '--More--' in content or key == 'i':
                 tmux_send_special(session_name, 'Space', 0.2)
                 clear_more_prompts(session_name)
@@ -304,7 +294,7 @@ def run_session(seed, output_json, move_str):
         print(f'Steps: {len(session_data["steps"])}')
 
     finally:
-        subprocess.run(['tmux', 'kill-session', '-t', session_name], capture_output=True)
+        tmux_kill_session(session_name)
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
@@ -13,14 +13,19 @@ import time
 import subprocess
 import shutil
 import tempfile
+import importlib.util
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.normpath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
-RESULTS_DIR = os.path.join(SCRIPT_DIR, 'results')
 INSTALL_DIR = os.path.join(PROJECT_ROOT, 'nethack-c', 'install', 'games', 'lib', 'nethackdir')
 NETHACK_BINARY = os.path.join(INSTALL_DIR, 'nethack')
 DEFAULT_FIXED_DATETIME = '20000110090000'
 
+# Private HOME and playground per capture (see capture_sandbox.py).
+_cs_spec = importlib.util.spec_from_file_location('capture_sandbox', os.path.join(SCRIPT_DIR, 'capture_sandbox.py'))
+_capture_sandbox = importlib.util.module_from_spec(_cs_spec)
+_cs_spec.loader.exec_module(_capture_sandbox)
+
 CHARACTER_PRESETS = {
     'valkyrie': {'name': 'Wizard', 'role': 'Valkyrie', 'race': 'human', 'gender': 'female', 'align': 'neutral'},
     'wizard':   {'name': 'Wizard', 'role': 'Wizard',   'race': 'human', 'gender': 'male',   'align': 'neutral'},
@@ -70,9 +75,13 @@ def tmux_capture(session):
     return result.stdout
 
 
-def setup_home(character):
-    os.makedirs(RESULTS_DIR, exist_ok=True)
-    nethackrc = os.path.join(RESULTS_DIR, '.nethackrc')
+def setup_home(tmpdir, character):
+    """Create a capture sandbox in tmpdir with .nethackrc for character.
+
+    Returns (home, nethackdir), the HOME and NETHACKDIR to launch with.
+    """
+    home, nethackdir = _capture_sandbox.create_sandbox(tmpdir, INSTALL_DIR)
+    nethackrc = os.path.join(home, '.nethackrc')
     with open(nethackrc, 'w') as f:
         f.write(f'OPTIONS=name:{character["name"]}\n')
         f.write(f'OPTIONS=race:{character["race"]}\n')
@@ -82,23 +91,7 @@ def setup_home(character):
         f.write('OPTIONS=!autopickup\n')
         f.write('OPTIONS=suppress_alert:3.4.3\n')
         f.write('OPTIONS=symset:DECgraphics\n')
-
-    # Clean up stale game state
-    import glob
-    save_dir = os.path.join(INSTALL_DIR, 'save')
-    if os.path.isdir(save_dir):
-        for f in glob.glob(os.path.join(save_dir, '*')):
-            try:
-                os.unlink(f)
-            except FileNotFoundError:
-                pass
-    for pattern in ['*wizard*', '*Wizard*', 'bon*']:
-        for f in glob.glob(os.path.join(INSTALL_DIR, pattern)):
-            if not f.endswith('.lua'):
-                try:
-                    os.unlink(f)
-                except FileNotFoundError:
-                    pass
+    return home, nethackdir
 
 
 def wait_for_game_ready(session, captured_keys):
@@ -226,7 +219,8 @@ def capture_moves(seed, original_moves, character=None, verbose=False):
         - stats: Dict with statistics about the capture
     """
     char = character or DEFAULT_CHARACTER
-    setup_home(char)
+    tmpdir = tempfile.mkdtemp(prefix='webhack-capture-')
+    home, nethackdir = setup_home(tmpdir, char)
 
     session_name = f'webhack-capture-{seed}-{os.getpid()}'
     captured_keys = []
@@ -234,10 +228,10 @@ def capture_moves(seed, original_moves, character=None, verbose=False):
 
     try:
         cmd = (
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'{fixed_datetime_env()}'
             f'NETHACK_SEED={seed} '
-            f'HOME={RESULTS_DIR} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u {char["name"]} -D; '
             f'sleep 999'
@@ -278,6 +272,7 @@ def capture_moves(seed, original_moves, character=None, verbose=False):
         raise
     finally:
         subprocess.run(['tmux', 'kill-session', '-t', session_name], capture_output=True)
+        shutil.rmtree(tmpdir, ignore_errors=True)
 
     captured = ''.join(captured_keys)
     stats['captured_len'] = len(captured)
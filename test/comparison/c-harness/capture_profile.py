@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Per-phase timing for session captures.
+
+The harness wraps its primitives -- key delivery, input waits, screen
+captures, --More-- clearing, RNG log reads, #dumpmap, session writes -- in
+profiler.phase(name) or @profiler.timed(name).  Phases do not nest: time
+spent in an inner phase is charged to the outermost one, so the phases of a
+step add up to at most its wall time and 'other' is the remainder.
+
+Counters (--More-- prompts cleared, clear_more_prompts calls) are always
+kept.  With WEBHACK_PROFILE=1 each step is also written as one JSON line to
+a sidecar next to the session file (<name>.profile.jsonl, never into the
+session itself), and summary() renders p50/p95/max per phase.
+"""
+
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+
+
+def profiling_enabled():
+    return os.environ.get('WEBHACK_PROFILE', '0') not in ('0', 'false', 'no', '')
+
+
+def sidecar_path(output_json):
+    """<dir>/<name>.profile.jsonl for <dir>/<name>.session.json."""
+    base = output_json
+    for suffix in ('.session.json', '.json'):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    return base + '.profile.jsonl'
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[min(len(sorted_values), int(rank)) - 1]
+
+
+class CaptureProfiler:
+    """Accumulates phase durations per capture step."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.enabled = profiling_enabled()
+        self.path = None
+        self.sidecar = None
+        self.counts = {}
+        self.records = []
+        self._phases = {}
+        self._step_counts = {}
+        self._active = None
+        self._step_start = time.perf_counter()
+
+    def start(self, output_json):
+        """Begin profiling a capture that will be written to output_json."""
+        self.close()
+        self.reset()
+        if self.enabled:
+            self.path = sidecar_path(output_json)
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.sidecar = open(self.path, 'w')
+
+    @contextmanager
+    def phase(self, name):
+        if self._active is not None:
+            yield
+            return
+        self._active = name
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] = self._phases.get(name, 0.0) + time.perf_counter() - t0
+            self._active = None
+
+    def timed(self, name):
+        """Decorator form of phase()."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.phase(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+        self._step_counts[name] = self._step_counts.get(name, 0) + n
+
+    def end_step(self, key=None):
+        """Close the current step; everything since the last call belongs to it."""
+        now = time.perf_counter()
+        total = now - self._step_start
+        phases = {name: round(sec, 6) for name, sec in self._phases.items()}
+        record = {
+            'step': len(self.records),
+            'key': key,
+            'total': round(total, 6),
+            'phases': phases,
+            'other': round(max(0.0, total - sum(self._phases.values())), 6),
+        }
+        if self._step_counts:
+            record['counts'] = dict(self._step_counts)
+        self.records.append(record)
+        if self.sidecar:
+            self.sidecar.write(json.dumps(record) + '\n')
+            self.sidecar.flush()
+        self._phases = {}
+        self._step_counts = {}
+        self._step_start = now
+
+    def summary(self):
+        """Table of total/p50/p95/max seconds per phase over all steps."""
+        names = sorted({name for r in self.records for name in r['phases']})
+        columns = [(name, [r['phases'].get(name, 0.0) for r in self.records]) for name in names]
+        columns.append(('other', [r['other'] for r in self.records]))
+        columns.append(('step', [r['total'] for r in self.records]))
+        wall = sum(r['total'] for r in self.records) or 1.0
+        lines = [f'{"phase":<12} {"total":>9} {"share":>6} {"p50":>8} {"p95":>8} {"max":>8}']
+        for name, values in columns:
+            values = sorted(values)
+            lines.append(
+                f'{name:<12} {sum(values):9.3f} {100 * sum(values) / wall:5.1f}% '
+                f'{percentile(values, 50):8.4f} {percentile(values, 95):8.4f} {values[-1] if values else 0:8.4f}'
+            )
+        lines.append(f'{len(self.records)} steps; counts: '
+                     + (', '.join(f'{k}={v}' for k, v in sorted(self.counts.items())) or 'none'))
+        return '\n'.join(lines)
+
+    def finish(self, key='end'):
+        """Record the trailing step, print the summary if enabled, close the sidecar."""
+        self.end_step(key)
+        if self.enabled:
+            print('\n=== PHASE TIMINGS (seconds) ===')
+            print(self.summary())
+            if self.path:
+                print(f'Profile: {self.path}')
+        self.close()
+
+    def close(self):
+        if self.sidecar:
+            self.sidecar.close()
+            self.sidecar = None
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Private HOME and playground directories for one C NetHack capture.
+
+Captures used to share HOME=results/ (one .nethackrc) and the installed
+playground NETHACKDIR (save/, lock and level files, bones, record), and each
+setup_home() wiped that shared state before starting.  Two captures running
+at once could therefore read each other's options or delete each other's
+lock files.
+
+create_sandbox() builds, under a capture's own temp directory:
+
+    home/        HOME for the game; setup_home() writes .nethackrc here
+    nethackdir/  NETHACKDIR: symlinks to the installed read-only files
+                 (data files, sysconf, symbols, ...), plus an empty save/
+                 and empty score/lock files of its own
+
+Symlinks make this a few dozen syscalls, and removing the temp directory
+(which every capture already does) removes the sandbox.  Stale game state
+left in the install directory by older runs (lock/level files, bones) is
+not linked, so a sandbox always starts clean.
+"""
+
+import os
+
+# Files the game writes in its playground: created empty in each sandbox.
+WRITABLE_FILES = ('perm', 'record', 'logfile', 'xlogfile', 'livelog', 'paniclog')
+WRITABLE_DIRS = ('save',)
+
+
+def is_game_state(name):
+    """True for per-game files: <uid><name> locks, <uid><name>.<n> levels, bones."""
+    return name[:1].isdigit() or name.startswith('bon')
+
+
+def create_sandbox(parent, install_dir):
+    """Create home/ and nethackdir/ under parent; return (home, nethackdir)."""
+    home = os.path.join(parent, 'home')
+    nethackdir = os.path.join(parent, 'nethackdir')
+    os.makedirs(home, exist_ok=True)
+    os.makedirs(nethackdir, exist_ok=True)
+    for name in WRITABLE_DIRS:
+        os.makedirs(os.path.join(nethackdir, name), exist_ok=True)
+    for name in WRITABLE_FILES:
+        open(os.path.join(nethackdir, name), 'a').close()
+    try:
+        names = os.listdir(install_dir)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        if name in WRITABLE_FILES or name in WRITABLE_DIRS or is_game_state(name):
+            continue
+        link = os.path.join(nethackdir, name)
+        if not os.path.lexists(link):
+            os.symlink(os.path.join(install_dir, name), link)
+    return home, nethackdir
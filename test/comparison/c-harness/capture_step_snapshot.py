@@ -6,43 +6,58 @@ Usage:
 
 step_index is 0-based over gameplay steps (session.steps excluding startup).
 Example: step_index 37 replays 38 gameplay steps, then captures #dumpsnap.
+
+With a C binary built with patches/019-fastforward-more.patch, the steps
+before step_index are fast-forwarded (run_session.fast_forward): sent in
+batches with no screen polling while the game dismisses --More-- itself.
+Only the requested step is replayed key by key with clear_more_prompts.
+Sessions whose keys include the Spaces for --More-- (regen.mode keylog,
+or regen raw_moves) are never fast-forwarded; --no-fast-forward replays
+every step key by key for any session.
 """
 
 import argparse
 import json
 import os
 import shutil
-import subprocess
 import tempfile
 import time
 
 from run_session import (
     CHARACTER,
-    INSTALL_DIR,
     NETHACK_BINARY,
-    RESULTS_DIR,
+    CheckpointTailer,
     clear_more_prompts,
+    fast_forward,
+    fast_forward_env,
     fixed_datetime_env,
-    get_clear_more_stats,
-    read_checkpoint_entries,
+    input_wait_env,
+    parse_checkpoint,
+    profiler,
+    raw_moves_session,
     read_rng_log,
     setup_home,
+    start_game_session,
     tmux_capture,
+    tmux_kill_session,
     tmux_send,
     tmux_send_special,
     wait_for_game_ready,
+    wait_for_input,
 )
+from session_reader import SessionReader
 
 
 def load_session(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return SessionReader(path)
 
 
-def extract_keys(session):
-    raw_steps = session.get("steps") or []
+def extract_keys(session, limit=None):
+    """Gameplay keys of session, stopping once limit keys have been found."""
     keys = []
-    for i, step in enumerate(raw_steps):
+    for i, step in enumerate(session.iter_steps()):
+        if limit is not None and len(keys) >= limit:
+            break
         if i == 0 and (step.get("key") is None or step.get("action") == "startup"):
             continue
         key = step.get("key")
@@ -75,9 +90,13 @@ def send_char(session_name, ch):
         tmux_send(session_name, ch)
 
 
-def replay_steps(session_name, keys, step_index):
+def replay_steps(session_name, keys, step_index, fast=True):
+    """Replay keys up to step_index; return (replayed, fast_forwarded) counts."""
     target = min(step_index + 1, len(keys))
-    for idx in range(target):
+    start = 0
+    if fast and target > 1 and fast_forward(session_name, "".join(keys[:target - 1])):
+        start = target - 1
+    for idx in range(start, target):
         key = keys[idx]
         # Session gameplay keys are expected to be single-char, but handle
         # multi-char defensively for compatibility with hand-edited traces.
@@ -85,18 +104,32 @@ def replay_steps(session_name, keys, step_index):
             send_char(session_name, ch)
             time.sleep(0.003)
         clear_more_prompts(session_name)
-    return target
+    return target, start
+
+
+def find_checkpoint(lines, tag):
+    """The last checkpoint tagged tag, else the last one; only it is fully parsed."""
+    fallback = None
+    for line in reversed(lines):
+        try:
+            if parse_checkpoint(line, ("phase",)).get("phase") == tag:
+                return parse_checkpoint(line)
+            if fallback is None:
+                fallback = parse_checkpoint(line)
+        except ValueError:
+            continue
+    return fallback
 
 
-def run_capture(session_path, step_index, output_path, phase_tag=None):
+def run_capture(session_path, step_index, output_path, phase_tag=None, fast=True):
     session = load_session(session_path)
-    keys = extract_keys(session)
+    keys = extract_keys(session, step_index + 1)
+    fast = fast and not raw_moves_session(session.get("regen"))
     seed = int(session.get("seed", 1))
     char = build_character(session)
 
-    setup_home(char)
-
     tmpdir = tempfile.mkdtemp(prefix="webhack-step-snapshot-")
+    home, nethackdir = setup_home(tmpdir, char)
     rng_log_file = os.path.join(tmpdir, "rnglog.txt")
     checkpoint_file = os.path.join(tmpdir, "checkpoints.jsonl")
     session_name = f"webhack-step-snapshot-{seed}-{os.getpid()}"
@@ -107,29 +140,28 @@ def run_capture(session_path, step_index, output_path, phase_tag=None):
             f"NETHACK_MONMOVE_DEBUG={monmove_debug} " if monmove_debug else ""
         )
         cmd = (
-            f"NETHACKDIR={INSTALL_DIR} "
+            f"NETHACKDIR={nethackdir} "
             f"{fixed_datetime_env()}"
             f"{monmove_debug_env}"
             f"NETHACK_SEED={seed} "
             f"NETHACK_RNGLOG={rng_log_file} "
             f"NETHACK_DUMPSNAP={checkpoint_file} "
-            f"HOME={RESULTS_DIR} "
+            f"{input_wait_env(session_name, tmpdir)}"
+            f"{fast_forward_env(session_name, tmpdir)}"
+            f"HOME={home} "
             f"TERM=xterm-256color "
             f"{NETHACK_BINARY} -u {char['name']} -D; "
             f"sleep 999"
         )
-        subprocess.run(
-            ["tmux", "new-session", "-d", "-s", session_name, "-x", "80", "-y", "24", cmd],
-            check=True,
-        )
-        time.sleep(1.0)
+        start_game_session(session_name, cmd)
+        wait_for_input(session_name, 1.0)
 
         wait_for_game_ready(session_name, rng_log_file)
-        time.sleep(0.02)
+        wait_for_input(session_name)
         clear_more_prompts(session_name)
-        time.sleep(0.02)
+        wait_for_input(session_name)
 
-        replayed_steps = replay_steps(session_name, keys, step_index)
+        replayed_steps, fast_forwarded = replay_steps(session_name, keys, step_index, fast)
         pre_snapshot_screen = tmux_capture(session_name)
 
         tag = phase_tag or f"manual_step_{step_index}"
@@ -140,8 +172,8 @@ def run_capture(session_path, step_index, output_path, phase_tag=None):
         tmux_send_special(session_name, "Enter", 0.2)
         clear_more_prompts(session_name)
 
-        checkpoints, _ = read_checkpoint_entries(checkpoint_file, 0)
-        last = checkpoints[-1] if checkpoints else None
+        checkpoint_lines = CheckpointTailer(checkpoint_file).read_new_lines()
+        last = find_checkpoint(checkpoint_lines, tag)
         rng_count, _ = read_rng_log(rng_log_file)
 
         payload = {
@@ -149,13 +181,17 @@ def run_capture(session_path, step_index, output_path, phase_tag=None):
             "seed": seed,
             "requestedStepIndex": step_index,
             "replayedSteps": replayed_steps,
+            "fastForwardedSteps": fast_forwarded,
             "phaseTag": tag,
             "rngCallCount": rng_count,
-            "checkpointCount": len(checkpoints),
+            "checkpointCount": len(checkpoint_lines),
             "checkpoint": last,
             "preSnapshotScreen": pre_snapshot_screen,
             "screen": tmux_capture(session_name),
-            "clearMore": get_clear_more_stats(),
+            "clearMore": {
+                "calls": profiler.counts.get("clear_more_calls", 0),
+                "cleared": profiler.counts.get("more_cleared", 0),
+            },
         }
 
         os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
@@ -163,7 +199,7 @@ def run_capture(session_path, step_index, output_path, phase_tag=None):
             json.dump(payload, f, indent=2)
             f.write("\n")
     finally:
-        subprocess.run(["tmux", "kill-session", "-t", session_name], capture_output=True)
+        tmux_kill_session(session_name)
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
@@ -173,9 +209,20 @@ def main():
     parser.add_argument("step_index", type=int, help="0-based gameplay step index")
     parser.add_argument("output_json", help="Output file path for captured snapshot JSON")
     parser.add_argument("--phase", default=None, help="Optional phase tag for #dumpsnap")
+    parser.add_argument(
+        "--no-fast-forward",
+        action="store_true",
+        help="Replay every step key by key with clear_more_prompts",
+    )
     args = parser.parse_args()
 
-    run_capture(args.session_json, args.step_index, args.output_json, args.phase)
+    run_capture(
+        args.session_json,
+        args.step_index,
+        args.output_json,
+        args.phase,
+        fast=not args.no_fast_forward,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Delta encoding of level-generation checkpoints in session files.
+
+Each checkpoint written by 008-checkpoint-snapshots.patch carries the
+whole level: typ, flag and wall_info grids plus monster, object, trap,
+room and door lists.  Successive phases of one level share most of that.
+With the 'delta' checkpoint encoding
+(WEBHACK_SESSION_CHECKPOINT_ENCODING=delta), the first checkpoint of each
+`checkpoints` list stays in full and every later one is stored as
+
+    {"delta": {"set": {...}, "rows": {...}, "cells": {...}, "edits": {...},
+               "unset": [...], "keys": [...]}}
+
+against the checkpoint before it (parts that would be empty are left
+out):
+
+    set    top-level keys whose new value is stored whole
+    rows   RLE grids (rows joined by '|'): [row_count, [row, text], ...]
+           replaces the listed rows and cuts or pads to row_count rows
+    cells  grids stored as lists of rows, same shape as before:
+           [[row, col, [values...]], ...] overwrites runs of cells
+    edits  lists (monsters, objects, traps, ...): [[start, end, items], ...]
+           replaces prev[start:end] with items, in ascending order
+    unset  keys the checkpoint no longer has
+    keys   the key order, only when it is not the previous order with
+           new keys appended
+
+A checkpoint whose delta would not be smaller is stored in full, and
+decoding restarts there.  Files using it carry a top-level
+"checkpointEncoding": {"version": 1} ahead of the startup, steps and
+levels.  expand_session_checkpoints() restores plain checkpoints;
+session_loader.js does the same in JS.
+"""
+
+import difflib
+import json
+import os
+
+VERSION = 1
+ENCODINGS = ('full', 'delta')
+HOLDER_KEYS = ('startup', 'steps', 'levels')
+
+
+def checkpoint_encoding():
+    """Checkpoint encoding requested for new session files: 'full' or 'delta'."""
+    return os.environ.get('WEBHACK_SESSION_CHECKPOINT_ENCODING', 'full')
+
+
+def _size(value):
+    return len(json.dumps(value, separators=(',', ':')))
+
+
+def _is_rle_grid(value):
+    return isinstance(value, str) and '|' in value
+
+
+def _row_delta(prev, cur):
+    old = prev.split('|')
+    new = cur.split('|')
+    delta = [len(new)]
+    for row, text in enumerate(new):
+        if row >= len(old) or old[row] != text:
+            delta.append([row, text])
+    return delta
+
+
+def _apply_rows(prev, delta):
+    rows = prev.split('|')
+    count = delta[0]
+    rows += [''] * (count - len(rows))
+    for row, text in delta[1:]:
+        rows[row] = text
+    return '|'.join(rows[:count])
+
+
+def _same_shape_grids(prev, cur):
+    return (len(prev) == len(cur) and len(prev) > 0
+            and all(isinstance(a, list) and isinstance(b, list) and len(a) == len(b)
+                    for a, b in zip(prev, cur)))
+
+
+def _cell_runs(prev, cur):
+    runs = []
+    for y, (old, new) in enumerate(zip(prev, cur)):
+        x = 0
+        while x < len(new):
+            if old[x] == new[x]:
+                x += 1
+                continue
+            start = x
+            while x < len(new) and old[x] != new[x]:
+                x += 1
+            runs.append([y, start, new[start:x]])
+    return runs
+
+
+def _apply_cells(prev, runs):
+    grid = [list(row) for row in prev]
+    for y, x, values in runs:
+        grid[y][x:x + len(values)] = values
+    return grid
+
+
+def _list_edits(prev, cur):
+    old = [json.dumps(item, sort_keys=True) for item in prev]
+    new = [json.dumps(item, sort_keys=True) for item in cur]
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    return [[i1, i2, cur[j1:j2]]
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def _apply_edits(prev, edits):
+    out = []
+    pos = 0
+    for start, end, items in edits:
+        out += prev[pos:start]
+        out += items
+        pos = end
+    out += prev[pos:]
+    return out
+
+
+def diff_checkpoint(prev, cur):
+    """Delta that turns checkpoint prev into cur (see the module docstring)."""
+    delta = {'set': {}, 'rows': {}, 'cells': {}, 'edits': {}}
+    for key, value in cur.items():
+        if key in prev and prev[key] == value:
+            continue
+        old = prev.get(key)
+        if _is_rle_grid(old) and _is_rle_grid(value):
+            rows = _row_delta(old, value)
+            if _size(rows) < _size(value):
+                delta['rows'][key] = rows
+                continue
+        elif isinstance(old, list) and isinstance(value, list):
+            options = [(_size(value), 'set', value)]
+            if _same_shape_grids(old, value):
+                cells = _cell_runs(old, value)
+                options.append((_size(cells), 'cells', cells))
+            else:
+                edits = _list_edits(old, value)
+                options.append((_size(edits), 'edits', edits))
+            _, part, encoded = min(options, key=lambda option: option[0])
+            delta[part][key] = encoded
+            continue
+        delta['set'][key] = value
+    delta = {part: value for part, value in delta.items() if value}
+    unset = [key for key in prev if key not in cur]
+    if unset:
+        delta['unset'] = unset
+    if list(cur) != _key_order(prev, delta):
+        delta['keys'] = list(cur)
+    return delta
+
+
+def _key_order(prev, delta):
+    unset = set(delta.get('unset', ()))
+    keys = [key for key in prev if key not in unset]
+    keys += [key for key in delta.get('set', {}) if key not in prev]
+    return keys
+
+
+def apply_checkpoint_delta(prev, delta):
+    """Inverse of diff_checkpoint(): the checkpoint delta leads to from prev."""
+    keys = delta.get('keys') or _key_order(prev, delta)
+    sets = delta.get('set', {})
+    rows = delta.get('rows', {})
+    cells = delta.get('cells', {})
+    edits = delta.get('edits', {})
+    out = {}
+    for key in keys:
+        if key in sets:
+            out[key] = sets[key]
+        elif key in rows:
+            out[key] = _apply_rows(prev[key], rows[key])
+        elif key in cells:
+            out[key] = _apply_cells(prev[key], cells[key])
+        elif key in edits:
+            out[key] = _apply_edits(prev[key], edits[key])
+        else:
+            out[key] = prev[key]
+    return out
+
+
+def _is_delta(entry):
+    return isinstance(entry, dict) and set(entry) == {'delta'}
+
+
+def encode_checkpoints(checkpoints):
+    """The first checkpoint in full, later ones as deltas where smaller."""
+    if any(isinstance(cp, dict) and 'delta' in cp for cp in checkpoints):
+        return checkpoints  # would be ambiguous; leave it as it is
+    out = []
+    prev = None
+    for cp in checkpoints:
+        entry = cp
+        if isinstance(prev, dict) and isinstance(cp, dict):
+            delta = diff_checkpoint(prev, cp)
+            if _size(delta) + len('{"delta":}') < _size(cp):
+                entry = {'delta': delta}
+        out.append(entry)
+        prev = cp
+    return out
+
+
+def expand_checkpoints(checkpoints, stop=None):
+    """Decode encode_checkpoints() output, up to index stop if given."""
+    out = []
+    prev = None
+    for entry in checkpoints[:stop]:
+        if _is_delta(entry):
+            if not isinstance(prev, dict):
+                raise ValueError('checkpoint delta without a full checkpoint before it')
+            entry = apply_checkpoint_delta(prev, entry['delta'])
+        out.append(entry)
+        prev = entry
+    return out
+
+
+def checkpoint_at(checkpoints, index):
+    """Checkpoint index (one phase) of an encoded list, decoded."""
+    if index < 0:
+        index += len(checkpoints)
+    if not 0 <= index < len(checkpoints):
+        raise IndexError('checkpoint index out of range')
+    return expand_checkpoints(checkpoints, index + 1)[-1]
+
+
+def _map_holders(session_data, fn):
+    """Copy session_data with fn applied to every checkpoints list."""
+    out = dict(session_data)
+    for key in HOLDER_KEYS:
+        value = out.get(key)
+        if isinstance(value, dict):
+            out[key] = map_holder(value, fn)
+        elif isinstance(value, list):
+            out[key] = [map_holder(item, fn) for item in value]
+    return out
+
+
+def map_holder(holder, fn):
+    """holder (a startup, step or level) with fn applied to its checkpoints."""
+    if isinstance(holder, dict) and isinstance(holder.get('checkpoints'), list):
+        return dict(holder, checkpoints=fn(holder['checkpoints']))
+    return holder
+
+
+def _has_checkpoints(session_data):
+    for key in HOLDER_KEYS:
+        value = session_data.get(key)
+        holders = [value] if isinstance(value, dict) else value if isinstance(value, list) else []
+        if any(isinstance(h, dict) and isinstance(h.get('checkpoints'), list) for h in holders):
+            return True
+    return False
+
+
+def encode_session_checkpoints(session_data):
+    """Return a copy of session_data with its checkpoints delta-encoded."""
+    if 'checkpointEncoding' in session_data or not _has_checkpoints(session_data):
+        return session_data
+    encoded = _map_holders(session_data, encode_checkpoints)
+    marker = {'version': VERSION}
+    out = {}
+    for key, value in encoded.items():
+        if key in HOLDER_KEYS and 'checkpointEncoding' not in out:
+            out['checkpointEncoding'] = marker
+        out[key] = value
+    out.setdefault('checkpointEncoding', marker)
+    return out
+
+
+def expand_session_checkpoints(session_data):
+    """Inverse of encode_session_checkpoints(): every checkpoint in full."""
+    encoding = session_data.get('checkpointEncoding')
+    if encoding is None:
+        return session_data
+    if encoding.get('version') != VERSION:
+        raise ValueError(f"unsupported checkpointEncoding version {encoding.get('version')}")
+    out = _map_holders(session_data, expand_checkpoints)
+    del out['checkpointEncoding']
+    return out
@@ -37,6 +37,7 @@ _spec.loader.exec_module(_session)
 compact_session_json = _session.compact_session_json
 capture_screen_compressed = _session.capture_screen_compressed
 fixed_datetime_env = _session.fixed_datetime_env
+create_sandbox = _session.create_sandbox
 tmux_send = _session.tmux_send
 tmux_send_special = _session.tmux_send_special
 read_rng_log = _session.read_rng_log
@@ -58,9 +59,8 @@ def start_tmux_session(session):
 
 
 def kill_tmux_session(session):
-    """Kill the tmux session."""
-    subprocess.run(['tmux', 'kill-session', '-t', session],
-                   stderr=subprocess.DEVNULL, check=False)
+    """Kill the tmux session (and any control-mode client attached to it)."""
+    _session.tmux_kill_session(session)
 
 
 # Use capture_screen_compressed from run_session.py
@@ -72,10 +72,10 @@ def capture_startup_sequence():
     session = tmux_session_name()
     start_tmux_session(session)
     steps = []
+    tmpdir = tempfile.mkdtemp(prefix='interface-')
+    home, nethack_dir = create_sandbox(tmpdir, os.path.dirname(NETHACK_BINARY))
 
     try:
-        nethack_dir = os.path.dirname(NETHACK_BINARY)
-
         # Clear screen
         subprocess.run(['tmux', 'send-keys', '-t', session, 'clear', 'Enter'], check=True)
         time.sleep(0.2)
@@ -84,6 +84,7 @@ def capture_startup_sequence():
         cmd = (
             f'{fixed_datetime_env()}'
             f'NETHACKDIR={nethack_dir} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY}'
         )
@@ -130,6 +131,7 @@ def capture_startup_sequence():
 
     finally:
         kill_tmux_session(session)
+        shutil.rmtree(tmpdir, ignore_errors=True)
 
     return {
         'version': 3,
@@ -175,16 +177,17 @@ def capture_complete_chargen():
     session = tmux_session_name()
     start_tmux_session(session)
     steps = []
+    tmpdir = tempfile.mkdtemp(prefix='interface-')
+    home, nethack_dir = create_sandbox(tmpdir, os.path.dirname(NETHACK_BINARY))
 
     try:
-        nethack_dir = os.path.dirname(NETHACK_BINARY)
-
         subprocess.run(['tmux', 'send-keys', '-t', session, 'clear', 'Enter'], check=True)
         time.sleep(0.2)
 
         cmd = (
             f'{fixed_datetime_env()}'
             f'NETHACKDIR={nethack_dir} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY}'
         )
@@ -255,6 +258,7 @@ def capture_complete_chargen():
 
     finally:
         kill_tmux_session(session)
+        shutil.rmtree(tmpdir, ignore_errors=True)
 
     return {
         'version': 3,
@@ -293,9 +297,9 @@ def capture_tutorial_prompt_flow(seed=1):
     steps = []
     tmpdir = tempfile.mkdtemp(prefix='interface-tutorial-')
     rng_log_file = os.path.join(tmpdir, 'rnglog.txt')
+    home, nethack_dir = create_sandbox(tmpdir, os.path.dirname(NETHACK_BINARY))
 
     try:
-        nethack_dir = os.path.dirname(NETHACK_BINARY)
         subprocess.run(['tmux', 'send-keys', '-t', session, 'clear', 'Enter'], check=True)
         time.sleep(0.2)
 
@@ -304,7 +308,7 @@ def capture_tutorial_prompt_flow(seed=1):
             f'{fixed_datetime_env()}'
             f'NETHACK_SEED={seed} '
             f'NETHACK_RNGLOG={rng_log_file} '
-            f'HOME={tmpdir} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u Wizard -D'
         )
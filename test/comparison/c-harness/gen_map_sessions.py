@@ -3,8 +3,8 @@
 
 Usage:
     python3 gen_map_sessions.py <seed> [max_depth] [--with-rng]
-    python3 gen_map_sessions.py --from-config
-    python3 gen_map_sessions.py --c-golden
+    python3 gen_map_sessions.py --from-config [--jobs N]
+    python3 gen_map_sessions.py --c-golden [--jobs N]
 
 Single-seed mode: generates levels 1→max_depth sequentially (via wizard
 mode level teleport) and captures typGrid at each depth using #dumpmap.
@@ -18,6 +18,11 @@ config and generates grid-only (no RNG traces) C map sessions for all
 seeds at depths 1→max_depth. Faster than --from-config since no RNG
 log is written. Output: test/comparison/maps/seed<N>_maps_c_golden.session.json
 
+--jobs N generates up to N seeds at once in the config modes.  Each seed
+runs in its own worker process with its own tmux session, temp directory
+and HOME/playground sandbox, and writes its own session file; failed seeds
+are listed at the end.
+
 Output: test/comparison/maps/seed<N>_maps_c.session.json
 
 Requires the C binary to be built with setup.sh first.
@@ -29,6 +34,8 @@ import json
 import time
 import tempfile
 import subprocess
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
@@ -52,17 +59,20 @@ quit_game = _dumpmap.quit_game
 tmux_send = _dumpmap.tmux_send
 tmux_send_special = _dumpmap.tmux_send_special
 tmux_capture = _dumpmap.tmux_capture
+tmux_kill_session = _dumpmap.tmux_kill_session
 fixed_datetime_env = _dumpmap.fixed_datetime_env
 
+_session_spec = importlib.util.spec_from_file_location('run_session', os.path.join(SCRIPT_DIR, 'run_session.py'))
+_session = importlib.util.module_from_spec(_session_spec)
+_session_spec.loader.exec_module(_session)
 
-def read_rng_log(rng_log_file):
-    """Read the RNG log file and return (count, lines)."""
-    try:
-        with open(rng_log_file) as f:
-            lines = f.readlines()
-        return len(lines), lines
-    except FileNotFoundError:
-        return 0, []
+RngLogTailer = _session.RngLogTailer
+
+_tg_spec = importlib.util.spec_from_file_location('typgrid', os.path.join(SCRIPT_DIR, 'typgrid.py'))
+_typgrid = importlib.util.module_from_spec(_tg_spec)
+_tg_spec.loader.exec_module(_typgrid)
+
+parse_dumpmap = _typgrid.parse_dumpmap
 
 
 def parse_rng_lines(lines):
@@ -98,16 +108,6 @@ def parse_rng_lines(lines):
     return entries
 
 
-def parse_dumpmap(dumpmap_file):
-    """Parse a dumpmap output file into a typGrid (list of lists of ints)."""
-    with open(dumpmap_file) as f:
-        lines = f.readlines()
-    grid = []
-    for line in lines:
-        row = [int(x) for x in line.strip().split()]
-        grid.append(row)
-    return grid
-
 
 def generate_one(seed, max_depth, with_rng, output_filename=None, debug_themerm=True):
     """Generate a single C map session for the given seed.
@@ -127,11 +127,11 @@ def generate_one(seed, max_depth, with_rng, output_filename=None, debug_themerm=
         sys.exit(1)
 
     verbose = os.environ.get('WEBHACK_DEBUG', '')
-    setup_home()
     os.makedirs(SESSIONS_DIR, exist_ok=True)
 
-    # Create temp files for dumpmap output and RNG log
+    # Create temp files for dumpmap output and RNG log, and the sandbox
     tmpdir = tempfile.mkdtemp(prefix='webhack-gen-')
+    home, nethackdir = setup_home(tmpdir)
     dumpmap_file = os.path.join(tmpdir, 'dumpmap.txt')
     rng_log_file = os.path.join(tmpdir, 'rnglog.txt') if with_rng else ''
 
@@ -155,11 +155,11 @@ def generate_one(seed, max_depth, with_rng, output_filename=None, debug_themerm=
             f'{themerm_cmd}'
             f'{env_check}'
             f'{fixed_datetime_env()}'
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'NETHACK_SEED={seed} '
             f'NETHACK_DUMPMAP={dumpmap_file} '
             f'{rnglog_env}'
-            f'HOME={RESULTS_DIR} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u Wizard -D; '
             f'sleep 999'
@@ -174,7 +174,7 @@ def generate_one(seed, max_depth, with_rng, output_filename=None, debug_themerm=
         time.sleep(0.1)
 
         levels = []
-        prev_rng_count = 0
+        rng_tail = RngLogTailer(rng_log_file) if rng_log_file else None
 
         for depth in range(1, max_depth + 1):
             # Teleport to the target depth (skip for depth 1, we're already there)
@@ -201,20 +201,16 @@ def generate_one(seed, max_depth, with_rng, output_filename=None, debug_themerm=
 
             # Read RNG log delta for this depth
             if with_rng:
-                rng_count, rng_lines = read_rng_log(rng_log_file)
-                delta_lines = rng_lines[prev_rng_count:rng_count]
+                delta_lines = rng_tail.read_new()
                 rng_entries = parse_rng_lines(delta_lines)
                 level_data['rngCalls'] = sum(1 for e in rng_entries if e[0] not in ('>', '<'))
                 level_data['rng'] = rng_entries
-                prev_rng_count = rng_count
             else:
                 # Even without full traces, capture the count
-                if rng_log_file and os.path.exists(rng_log_file):
-                    rng_count, rng_lines_raw = read_rng_log(rng_log_file)
-                    delta_lines = rng_lines_raw[prev_rng_count:rng_count]
+                if rng_tail and os.path.exists(rng_log_file):
+                    delta_lines = rng_tail.read_new()
                     actual_rng = sum(1 for l in delta_lines if l.strip() and l.strip()[0] not in ('>', '<'))
                     level_data['rngCalls'] = actual_rng
-                    prev_rng_count = rng_count
 
             levels.append(level_data)
             if verbose:
@@ -225,16 +221,9 @@ def generate_one(seed, max_depth, with_rng, output_filename=None, debug_themerm=
         quit_game(session_name)
 
     finally:
-        subprocess.run(['tmux', 'kill-session', '-t', session_name],
-                       capture_output=True)
-        # Clean up temp files
-        for f in [dumpmap_file, rng_log_file]:
-            if f and os.path.exists(f):
-                os.unlink(f)
-        try:
-            os.rmdir(tmpdir)
-        except OSError:
-            pass
+        tmux_kill_session(session_name)
+        # Clean up temp files and the sandbox
+        shutil.rmtree(tmpdir, ignore_errors=True)
 
     # Build the session JSON
     session = {
@@ -281,6 +270,34 @@ def generate_one(seed, max_depth, with_rng, output_filename=None, debug_themerm=
         f.write('\n'.join(result) + '\n')
 
     print(f"Wrote {filepath} ({len(levels)} levels)")
+    return filepath
+
+
+def generate_many(tasks, jobs=1):
+    """Run generate_one(**task) for every task, up to jobs seeds at a time.
+
+    Returns the seeds that failed.  With one job, a failure stops the run
+    as before; with several, the other seeds still finish.
+    """
+    failures = []
+    if jobs <= 1:
+        for i, task in enumerate(tasks):
+            print(f"[{i+1}/{len(tasks)}] seed={task['seed']}")
+            generate_one(**task)
+        return failures
+
+    print(f"Running {len(tasks)} seeds with {jobs} workers")
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(generate_one, **task): task['seed'] for task in tasks}
+        for n, future in enumerate(as_completed(futures), 1):
+            seed = futures[future]
+            try:
+                future.result()
+                print(f"[{n}/{len(tasks)}] seed={seed} done")
+            except (Exception, SystemExit) as e:
+                failures.append(seed)
+                print(f"[{n}/{len(tasks)}] seed={seed} FAILED: {e!r}")
+    return failures
 
 
 def load_seeds_config():
@@ -293,12 +310,21 @@ def load_seeds_config():
 def main():
     args = sys.argv[1:]
 
+    jobs = 1
+    if '--jobs' in args:
+        idx = args.index('--jobs')
+        jobs = int(args[idx + 1])
+        args = args[:idx] + args[idx + 2:]
+
     if '--from-config' in args:
         config = load_seeds_config()
         c_rng_seeds = config['map_seeds']['with_rng']['c']
         print(f"Generating C map sessions with RNG for seeds: {c_rng_seeds}")
-        for seed in c_rng_seeds:
-            generate_one(str(seed), max_depth=5, with_rng=True)
+        tasks = [{'seed': str(seed), 'max_depth': 5, 'with_rng': True} for seed in c_rng_seeds]
+        failures = generate_many(tasks, jobs)
+        if failures:
+            print(f"FAILED seeds: {', '.join(failures)}")
+            sys.exit(1)
         return
 
     if '--c-golden' in args or '--c-golden-depth1' in args:
@@ -308,12 +334,14 @@ def main():
         seeds = c_golden['seeds']
         max_depth = 1 if depth1_only else c_golden['max_depth']
         print(f"Generating C golden map sessions (grid-only, no RNG) for {len(seeds)} seeds, depths 1-{max_depth}")
-        for i, seed in enumerate(seeds):
-            print(f"[{i+1}/{len(seeds)}] seed={seed}")
-            filename = f'seed{seed}_maps_c_golden.session.json'
-            generate_one(str(seed), max_depth=max_depth, with_rng=False,
-                         output_filename=filename)
-        print(f"Done: {len(seeds)} seeds × {max_depth} depths")
+        tasks = [{'seed': str(seed), 'max_depth': max_depth, 'with_rng': False,
+                  'output_filename': f'seed{seed}_maps_c_golden.session.json'}
+                 for seed in seeds]
+        failures = generate_many(tasks, jobs)
+        print(f"Done: {len(seeds) - len(failures)} seeds × {max_depth} depths")
+        if failures:
+            print(f"FAILED seeds: {', '.join(failures)}")
+            sys.exit(1)
         return
 
     with_rng = '--with-rng' in args
@@ -322,13 +350,14 @@ def main():
 
     if len(args) < 1:
         print(f"Usage: {sys.argv[0]} <seed> [max_depth] [--with-rng] [--normal-mode]")
-        print(f"       {sys.argv[0]} --from-config")
-        print(f"       {sys.argv[0]} --c-golden")
+        print(f"       {sys.argv[0]} --from-config [--jobs N]")
+        print(f"       {sys.argv[0]} --c-golden [--jobs N]")
         print(f"")
         print(f"Options:")
         print(f"  --with-rng      Include RNG traces in output")
         print(f"  --normal-mode   Disable THEMERM debug mode (use normal reservoir sampling)")
         print(f"                  Default is debug mode for backward compatibility")
+        print(f"  --jobs N        Config modes: generate up to N seeds in parallel")
         sys.exit(1)
 
     seed = args[0]
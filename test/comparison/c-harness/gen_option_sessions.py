@@ -18,7 +18,6 @@ import time
 import subprocess
 import tempfile
 import shutil
-import glob
 import importlib.util
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -35,36 +34,27 @@ _spec.loader.exec_module(_session)
 
 tmux_send = _session.tmux_send
 tmux_send_special = _session.tmux_send_special
+tmux_kill_session = _session.tmux_kill_session
 capture_screen_compressed = _session.capture_screen_compressed
 parse_rng_lines = _session.parse_rng_lines
 compact_session_json = _session.compact_session_json
-read_rng_log = _session.read_rng_log
+RngLogTailer = _session.RngLogTailer
 clear_more_prompts = _session.clear_more_prompts
 wait_for_game_ready = _session.wait_for_game_ready
 quit_game = _session.quit_game
 fixed_datetime_env = _session.fixed_datetime_env
+create_sandbox = _session.create_sandbox
 
 
-def setup_option_home(option_lines):
-    """Set up HOME with .nethackrc containing specific option values."""
-    os.makedirs(RESULTS_DIR, exist_ok=True)
-
-    # Clean up stale game state
-    save_dir = os.path.join(INSTALL_DIR, 'save')
-    if os.path.isdir(save_dir):
-        for f in glob.glob(os.path.join(save_dir, '*')):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, '*wizard*')):
-        if not f.endswith('.lua'):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, '*Wizard*')):
-        if not f.endswith('.lua'):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, 'bon*')):
-        os.unlink(f)
+def setup_option_home(tmpdir, option_lines):
+    """Set up a sandbox HOME with .nethackrc containing specific option values.
+
+    Returns (home, nethackdir), the HOME and NETHACKDIR to launch with.
+    """
+    home, nethackdir = create_sandbox(tmpdir, INSTALL_DIR)
 
     # Write .nethackrc
-    nethackrc = os.path.join(RESULTS_DIR, '.nethackrc')
+    nethackrc = os.path.join(home, '.nethackrc')
     with open(nethackrc, 'w') as f:
         f.write('OPTIONS=name:Wizard\n')
         f.write('OPTIONS=race:elf\n')
@@ -74,6 +64,7 @@ def setup_option_home(option_lines):
         f.write('OPTIONS=suppress_alert:3.4.3\n')
         for line in option_lines:
             f.write(f'OPTIONS={line}\n')
+    return home, nethackdir
 
 
 def generate_option_session(seed, option_name, option_value, option_lines, keys, description, output_override=None):
@@ -93,14 +84,14 @@ def generate_option_session(seed, option_name, option_value, option_lines, keys,
     rng_log_file = os.path.join(tmpdir, 'rnglog.txt')
 
     try:
-        setup_option_home(option_lines)
+        home, nethackdir = setup_option_home(tmpdir, option_lines)
 
         cmd = (
             f'{fixed_datetime_env()}'
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'NETHACK_SEED={seed} '
             f'NETHACK_RNGLOG={rng_log_file} '
-            f'HOME={RESULTS_DIR} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u Wizard -D; '
             f'sleep 999'
@@ -118,13 +109,12 @@ def generate_option_session(seed, option_name, option_value, option_lines, keys,
 
         # Capture startup
         startup_screen = capture_screen_compressed(session_name)
-        startup_rng_count, startup_rng_lines = read_rng_log(rng_log_file)
-        startup_rng_entries = parse_rng_lines(startup_rng_lines)
+        rng_tail = RngLogTailer(rng_log_file)
+        startup_rng_entries = rng_tail.read_new_entries()
         startup_actual_rng = sum(1 for e in startup_rng_entries if e[0] not in ('>', '<'))
 
         # Execute steps
         steps = []
-        prev_rng_count = startup_rng_count
         for key, action in keys:
             if key == ' ':
                 tmux_send_special(session_name, 'Space', 0.1)
@@ -134,8 +124,7 @@ def generate_option_session(seed, option_name, option_value, option_lines, keys,
             clear_more_prompts(session_name)
 
             screen = capture_screen_compressed(session_name)
-            rng_count, rng_lines = read_rng_log(rng_log_file)
-            rng_entries = parse_rng_lines(rng_lines[prev_rng_count:rng_count])
+            rng_entries = rng_tail.read_new_entries()
 
             steps.append({
                 'key': key,
@@ -143,7 +132,6 @@ def generate_option_session(seed, option_name, option_value, option_lines, keys,
                 'rng': rng_entries,
                 'screen': screen,
             })
-            prev_rng_count = rng_count
 
         # Build startup step (first step with no key)
         startup_step = {
@@ -190,7 +178,7 @@ def generate_option_session(seed, option_name, option_value, option_lines, keys,
         print(f"Generated {output_path}")
 
     finally:
-        subprocess.run(['tmux', 'kill-session', '-t', session_name], capture_output=True)
+        tmux_kill_session(session_name)
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
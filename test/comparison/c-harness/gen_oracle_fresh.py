@@ -6,6 +6,7 @@ import os
 import time
 import tempfile
 import subprocess
+import importlib.util
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
@@ -13,6 +14,11 @@ INSTALL_DIR = os.path.join(PROJECT_ROOT, 'nethack-c', 'install', 'games', 'lib',
 NETHACK_BINARY = os.path.join(INSTALL_DIR, 'nethack')
 DEFAULT_FIXED_DATETIME = '20000110090000'
 
+# Private HOME and playground per capture (see capture_sandbox.py).
+_cs_spec = importlib.util.spec_from_file_location('capture_sandbox', os.path.join(SCRIPT_DIR, 'capture_sandbox.py'))
+_capture_sandbox = importlib.util.module_from_spec(_cs_spec)
+_cs_spec.loader.exec_module(_capture_sandbox)
+
 
 def fixed_datetime_env():
     dt = os.environ.get('NETHACK_FIXED_DATETIME')
@@ -26,6 +32,7 @@ def run_wizloaddes(seed):
 
     tmpdir = tempfile.mkdtemp(prefix=f'oracle-wizload-{seed}-')
     rnglog_file = os.path.join(tmpdir, 'rnglog.txt')
+    home, nethackdir = _capture_sandbox.create_sandbox(tmpdir, INSTALL_DIR)
 
     # Use expect/pexpect would be ideal, but let's use tmux
     session_name = f'oracle-wizload-{seed}-{os.getpid()}'
@@ -33,10 +40,10 @@ def run_wizloaddes(seed):
     try:
         cmd = (
             f'{fixed_datetime_env()}'
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'NETHACK_SEED={seed} '
             f'NETHACK_RNGLOG={rnglog_file} '
-            f'HOME={tmpdir} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u Wizard -D'
         )
@@ -28,6 +28,7 @@ import json
 import time
 import tempfile
 import subprocess
+import shutil
 import re
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -50,8 +51,19 @@ quit_game = _dumpmap.quit_game
 tmux_send = _dumpmap.tmux_send
 tmux_send_special = _dumpmap.tmux_send_special
 tmux_capture = _dumpmap.tmux_capture
+tmux_kill_session = _dumpmap.tmux_kill_session
 fixed_datetime_env = _dumpmap.fixed_datetime_env
 
+_rb_spec = importlib.util.spec_from_file_location('rng_log_binary', os.path.join(SCRIPT_DIR, 'rng_log_binary.py'))
+_rng_log_binary = importlib.util.module_from_spec(_rb_spec)
+_rb_spec.loader.exec_module(_rng_log_binary)
+
+_tg_spec = importlib.util.spec_from_file_location('typgrid', os.path.join(SCRIPT_DIR, 'typgrid.py'))
+_typgrid = importlib.util.module_from_spec(_tg_spec)
+_tg_spec.loader.exec_module(_typgrid)
+
+parse_dumpmap = _typgrid.parse_dumpmap
+
 
 def wizard_teleport_to_oracle(session, verbose):
     """Teleport to oracle level in wizard mode."""
@@ -157,16 +169,6 @@ def wizard_teleport_to_oracle(session, verbose):
     return True
 
 
-def parse_dumpmap(dumpmap_file):
-    """Parse a dumpmap output file into a typGrid."""
-    with open(dumpmap_file) as f:
-        lines = f.readlines()
-    grid = []
-    for line in lines:
-        row = [int(x) for x in line.strip().split()]
-        grid.append(row)
-    return grid
-
 
 def parse_rng_log(rnglog_file):
     """Parse NETHACK_RNGLOG output into structured format.
@@ -176,7 +178,16 @@ def parse_rng_log(rnglog_file):
         2 rnd(6) = 4 @ baz(qux.c:456)
         >funcname @ caller(file:line)
         <funcname=result #start-end @ caller(file:line)
+
+    A binary log (017-rnglog-binary.patch) is decoded without going
+    through text.
     """
+    if _rng_log_binary.is_binary_rng_log(rnglog_file):
+        return [
+            {'call': call, 'func': func, 'args': args, 'result': result, 'caller': caller}
+            for call, func, args, result, caller
+            in _rng_log_binary.BinaryRngLog(rnglog_file).calls()
+        ]
     rng_calls = []
     with open(rnglog_file) as f:
         for line in f:
@@ -217,10 +228,10 @@ def generate_oracle_trace(seed, verbose=False):
         print("Run setup.sh first.")
         sys.exit(1)
 
-    setup_home()
     os.makedirs(TRACES_DIR, exist_ok=True)
 
     tmpdir = tempfile.mkdtemp(prefix=f'oracle-trace-{seed}-')
+    home, nethackdir = setup_home(tmpdir)
     dumpmap_file = os.path.join(tmpdir, 'dumpmap.txt')
     rnglog_file = os.path.join(tmpdir, 'rnglog.txt')
     rectlog_file = os.path.join(tmpdir, 'rectlog.txt')
@@ -230,12 +241,13 @@ def generate_oracle_trace(seed, verbose=False):
         # Run NetHack with RNGLOG, DUMPMAP, and RECTLOG enabled
         cmd = (
             f'{fixed_datetime_env()}'
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'NETHACK_SEED={seed} '
             f'NETHACK_DUMPMAP={dumpmap_file} '
             f'NETHACK_RNGLOG={rnglog_file} '
+            f'{_rng_log_binary.rng_log_format_env()}'
             f'NETHACK_RECTLOG={rectlog_file} '
-            f'HOME={RESULTS_DIR} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u Wizard -D; '
             f'sleep 999'
@@ -315,18 +327,10 @@ def generate_oracle_trace(seed, verbose=False):
         return filepath
 
     finally:
-        subprocess.run(['tmux', 'kill-session', '-t', session_name],
-                      capture_output=True)
+        tmux_kill_session(session_name)
         # Keep temp files for debugging if verbose
         if not verbose:
-            if os.path.exists(dumpmap_file):
-                os.unlink(dumpmap_file)
-            if os.path.exists(rnglog_file):
-                os.unlink(rnglog_file)
-            try:
-                os.rmdir(tmpdir)
-            except OSError:
-                pass
+            shutil.rmtree(tmpdir, ignore_errors=True)
 
 
 def main():
@@ -25,12 +25,12 @@ import sys
 import json
 import time
 import subprocess
-import glob
+import shutil
+import tempfile
 import importlib.util
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.normpath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
-RESULTS_DIR = os.path.join(SCRIPT_DIR, 'results')
 SESSIONS_DIR = os.path.join(PROJECT_ROOT, 'test', 'comparison', 'sessions')
 INSTALL_DIR = os.path.join(PROJECT_ROOT, 'nethack-c', 'install', 'games', 'lib', 'nethackdir')
 NETHACK_BINARY = os.path.join(INSTALL_DIR, 'nethack')
@@ -43,37 +43,28 @@ _spec.loader.exec_module(_session)
 tmux_send = _session.tmux_send
 tmux_send_special = _session.tmux_send_special
 tmux_capture = _session.tmux_capture
+tmux_kill_session = _session.tmux_kill_session
 capture_screen_lines = _session.capture_screen_lines
 clear_more_prompts = _session.clear_more_prompts
 wait_for_game_ready = _session.wait_for_game_ready
 quit_game = _session.quit_game
 fixed_datetime_env = _session.fixed_datetime_env
+create_sandbox = _session.create_sandbox
 
 
-def setup_pickup_types_home(pickup_types_value):
-    """Set up HOME with .nethackrc containing pickup_types option.
+def setup_pickup_types_home(tmpdir, pickup_types_value):
+    """Set up a sandbox HOME with .nethackrc containing pickup_types option.
 
     Args:
+        tmpdir: directory to create the sandbox in
         pickup_types_value: string value for pickup_types (e.g., "$", "!?", "$/!?=+")
+
+    Returns (home, nethackdir), the HOME and NETHACKDIR to launch with.
     """
-    os.makedirs(RESULTS_DIR, exist_ok=True)
-
-    # Clean up stale game state
-    save_dir = os.path.join(INSTALL_DIR, 'save')
-    if os.path.isdir(save_dir):
-        for f in glob.glob(os.path.join(save_dir, '*')):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, '*wizard*')):
-        if not f.endswith('.lua'):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, '*Wizard*')):
-        if not f.endswith('.lua'):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, 'bon*')):
-        os.unlink(f)
+    home, nethackdir = create_sandbox(tmpdir, INSTALL_DIR)
 
     # Write .nethackrc with pickup_types option
-    nethackrc = os.path.join(RESULTS_DIR, '.nethackrc')
+    nethackrc = os.path.join(home, '.nethackrc')
     with open(nethackrc, 'w') as f:
         f.write('OPTIONS=name:Wizard\n')
         f.write('OPTIONS=race:elf\n')
@@ -88,7 +79,7 @@ def setup_pickup_types_home(pickup_types_value):
             f.write(f'OPTIONS=pickup_types:{pickup_types_value}\n')
         # Empty string means don't set the option (default behavior)
 
-    return RESULTS_DIR
+    return home, nethackdir
 
 
 def generate_pickup_types_session(session_name, seed, pickup_types_value, pickup_types_label):
@@ -102,7 +93,8 @@ def generate_pickup_types_session(session_name, seed, pickup_types_value, pickup
     """
     print(f"\nGenerating {session_name} (pickup_types={repr(pickup_types_value)})...")
 
-    home_dir = setup_pickup_types_home(pickup_types_value)
+    tmpdir = tempfile.mkdtemp(prefix='webhack-pickup-types-')
+    home_dir, nethackdir = setup_pickup_types_home(tmpdir, pickup_types_value)
 
     # Start tmux session
     session_id = f'nhtest_{int(time.time())}'
@@ -114,7 +106,7 @@ def generate_pickup_types_session(session_name, seed, pickup_types_value, pickup
     # Build command with proper environment variables (same pattern as gen_option_sessions.py)
     cmd = (
         f'{fixed_datetime_env()}'
-        f'NETHACKDIR={INSTALL_DIR} '
+        f'NETHACKDIR={nethackdir} '
         f'HOME={home_dir} '
         f'NETHACKOPTIONS=!legacy '
         f'TERM=xterm-256color '
@@ -268,9 +260,9 @@ def generate_pickup_types_session(session_name, seed, pickup_types_value, pickup
 
     print(f"  ✓ Saved {session_file}")
 
-    # Clean up tmux
-    subprocess.run(['tmux', 'kill-session', '-t', session_id],
-                   stderr=subprocess.DEVNULL)
+    # Clean up tmux and the sandbox
+    tmux_kill_session(session_id)
+    shutil.rmtree(tmpdir, ignore_errors=True)
 
 
 def main():
@@ -15,28 +15,47 @@ import json
 import time
 import tempfile
 import subprocess
+import shutil
 import re
 
 # Import shared harness helpers
 sys.path.insert(0, os.path.dirname(__file__))
 from run_dumpmap import (
     setup_home, wait_for_game_ready, execute_dumpmap, quit_game,
-    tmux_send, tmux_send_special, tmux_capture,
-    NETHACK_BINARY, INSTALL_DIR, RESULTS_DIR,
+    tmux_send, tmux_send_special, tmux_capture, tmux_kill_session,
+    NETHACK_BINARY,
     fixed_datetime_env,
 )
 from run_session import parse_rng_lines, get_rng_call_count
+from rng_log_binary import BinaryRngLog, is_binary_rng_log, rng_log_format_env
+from typgrid import parse_dumpmap
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
 MAPS_DIR = os.path.join(PROJECT_ROOT, 'test', 'comparison', 'maps')
 
 
+def _rng_log_lines(rng_log_file):
+    """Text-log lines of an RNG log, decoding a binary log if need be."""
+    if is_binary_rng_log(rng_log_file):
+        return BinaryRngLog(rng_log_file).lines()
+    with open(rng_log_file, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.readlines()
+
+
 def get_rng_raw_draw_count(rng_log_file, rng_call_start):
     """Approximate raw draw count at rng_call_start for metadata continuity."""
     if not rng_log_file or not os.path.exists(rng_log_file):
         return None
     raw = 0
+    if is_binary_rng_log(rng_log_file):
+        # rn1 is a macro over rn2, so it never shows up in a binary log.
+        for call, fn, _, _, _ in BinaryRngLog(rng_log_file).calls():
+            if call > int(rng_call_start):
+                break
+            if fn in ('rn2', 'rnd', 'd'):
+                raw += 1
+        return raw
     with open(rng_log_file, 'r', encoding='utf-8', errors='ignore') as f:
         for line in f:
             m = re.match(r'^\s*(\d+)\s+([a-z0-9_]+)\(', line)
@@ -56,23 +75,22 @@ def extract_rng_prelude_calls(rng_log_file, rng_call_start, max_calls=32):
     if not rng_log_file or not os.path.exists(rng_log_file):
         return []
     collected = []
-    with open(rng_log_file, 'r', encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            line = line.rstrip('\n')
-            if not line:
-                continue
-            if line[0] in ('>', '<'):
-                if collected:
-                    break
-                continue
-            m = re.match(r'^\s*(\d+)\s+', line)
-            if not m:
-                continue
-            if int(m.group(1)) <= int(rng_call_start):
-                continue
-            collected.append(line)
-            if len(collected) >= max_calls:
+    for line in _rng_log_lines(rng_log_file):
+        line = line.rstrip('\n')
+        if not line:
+            continue
+        if line[0] in ('>', '<'):
+            if collected:
                 break
+            continue
+        m = re.match(r'^\s*(\d+)\s+', line)
+        if not m:
+            continue
+        if int(m.group(1)) <= int(rng_call_start):
+            continue
+        collected.append(line)
+        if len(collected) >= max_calls:
+            break
     return parse_rng_lines(collected)
 
 
@@ -82,21 +100,20 @@ def extract_full_rng_log(rng_log_file, rng_call_start):
         return []
     selected = []
     started = False
-    with open(rng_log_file, 'r', encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            line = line.rstrip('\n')
-            if not line:
+    for line in _rng_log_lines(rng_log_file):
+        line = line.rstrip('\n')
+        if not line:
+            continue
+        if not started:
+            if line[0] in ('>', '<'):
                 continue
-            if not started:
-                if line[0] in ('>', '<'):
-                    continue
-                m = re.match(r'^\s*(\d+)\s+', line)
-                if not m:
-                    continue
-                if int(m.group(1)) <= int(rng_call_start):
-                    continue
-                started = True
-            selected.append(line)
+            m = re.match(r'^\s*(\d+)\s+', line)
+            if not m:
+                continue
+            if int(m.group(1)) <= int(rng_call_start):
+                continue
+            started = True
+        selected.append(line)
     return parse_rng_lines(selected)
 
 def wizard_wish_amulet(session, verbose=False):
@@ -288,15 +305,6 @@ def wizard_teleport_to_plane(session, plane_name, verbose=False):
     time.sleep(0.3)
     return True
 
-def parse_dumpmap(dumpmap_file):
-    """Parse a dumpmap output file into a typGrid."""
-    with open(dumpmap_file) as f:
-        lines = f.readlines()
-    grid = []
-    for line in lines:
-        row = [int(x) for x in line.strip().split()]
-        grid.append(row)
-    return grid
 
 def main():
     args = sys.argv[1:]
@@ -317,7 +325,6 @@ def main():
         print(f"Error: nethack binary not found at {NETHACK_BINARY}")
         sys.exit(1)
 
-    setup_home()
     os.makedirs(MAPS_DIR, exist_ok=True)
 
     planes = ['astral', 'water', 'fire', 'air', 'earth']
@@ -328,6 +335,7 @@ def main():
         tmpdir = tempfile.mkdtemp(prefix=f'webhack-planes-{seed}-')
         dumpmap_file = os.path.join(tmpdir, 'dumpmap.txt')
         rnglog_file = os.path.join(tmpdir, 'rng.log')
+        home, nethackdir = setup_home(tmpdir)
         session_name = f'webhack-planes-{seed}-{os.getpid()}'
 
         levels = []
@@ -335,11 +343,12 @@ def main():
         try:
             cmd = (
                 f'{fixed_datetime_env()}'
-                f'NETHACKDIR={INSTALL_DIR} '
+                f'NETHACKDIR={nethackdir} '
                 f'NETHACK_SEED={seed} '
                 f'NETHACK_DUMPMAP={dumpmap_file} '
                 f'NETHACK_RNGLOG={rnglog_file} '
-                f'HOME={RESULTS_DIR} '
+                f'{rng_log_format_env()}'
+                f'HOME={home} '
                 f'TERM=xterm-256color '
                 f'{NETHACK_BINARY} -u Wizard -D; '
                 f'sleep 999'
@@ -428,16 +437,8 @@ def main():
             quit_game(session_name)
 
         finally:
-            subprocess.run(['tmux', 'kill-session', '-t', session_name],
-                           capture_output=True)
-            if os.path.exists(dumpmap_file):
-                os.unlink(dumpmap_file)
-            if os.path.exists(rnglog_file):
-                os.unlink(rnglog_file)
-            try:
-                os.rmdir(tmpdir)
-            except OSError:
-                pass
+            tmux_kill_session(session_name)
+            shutil.rmtree(tmpdir, ignore_errors=True)
 
         # Build session JSON
         session = {
@@ -33,7 +33,6 @@ import importlib.util
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.normpath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
-RESULTS_DIR = os.path.join(SCRIPT_DIR, 'results')
 SESSIONS_DIR = os.path.join(PROJECT_ROOT, 'test', 'comparison', 'sessions')
 INSTALL_DIR = os.path.join(PROJECT_ROOT, 'nethack-c', 'install', 'games', 'lib', 'nethackdir')
 NETHACK_BINARY = os.path.join(INSTALL_DIR, 'nethack')
@@ -45,9 +44,11 @@ _spec.loader.exec_module(_session)
 
 tmux_send = _session.tmux_send
 tmux_send_special = _session.tmux_send_special
+tmux_capture = _session.tmux_capture
+tmux_kill_session = _session.tmux_kill_session
 parse_rng_lines = _session.parse_rng_lines
 compact_session_json = _session.compact_session_json
-read_rng_log = _session.read_rng_log
+RngLogTailer = _session.RngLogTailer
 capture_screen_lines = _session.capture_screen_lines
 read_typ_grid = _session.read_typ_grid
 execute_dumpmap = _session.execute_dumpmap
@@ -55,6 +56,7 @@ clear_more_prompts = _session.clear_more_prompts
 quit_game = _session.quit_game
 detect_depth = _session.detect_depth
 fixed_datetime_env = _session.fixed_datetime_env
+create_sandbox = _session.create_sandbox
 
 # Character configuration
 ROLE_KEYS = {
@@ -63,52 +65,32 @@ ROLE_KEYS = {
     'Samurai': 's', 'Tourist': 't', 'Archeologist': 'a', 'Caveman': 'c', 'Healer': 'h'
 }
 
-def setup_home():
-    """Set up HOME with minimal .nethackrc for interactive character creation."""
-    os.makedirs(RESULTS_DIR, exist_ok=True)
+def setup_home(tmpdir):
+    """Create a capture sandbox in tmpdir with a minimal .nethackrc.
 
-    # Minimal .nethackrc WITHOUT role/race/gender/align to force prompts
-    nethackrc = os.path.join(RESULTS_DIR, '.nethackrc')
+    The .nethackrc leaves out role/race/gender/align so the game asks for
+    them.  Returns (home, nethackdir), the HOME and NETHACKDIR to launch with.
+    """
+    home, nethackdir = create_sandbox(tmpdir, INSTALL_DIR)
+    nethackrc = os.path.join(home, '.nethackrc')
     with open(nethackrc, 'w') as f:
         f.write('OPTIONS=name:Wizard\n')
         f.write('OPTIONS=!autopickup\n')
         f.write('OPTIONS=suppress_alert:3.4.3\n')
         f.write('OPTIONS=symset:DECgraphics\n')
+    return home, nethackdir
+
 
-    # Clean up stale game state
-    import glob
-    save_dir = os.path.join(INSTALL_DIR, 'save')
-    if os.path.isdir(save_dir):
-        for f in glob.glob(os.path.join(save_dir, '*')):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, '*wizard*')):
-        if not f.endswith('.lua'):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, '*Wizard*')):
-        if not f.endswith('.lua'):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, 'bon*')):
-        os.unlink(f)
-
-
-def tmux_capture(session):
-    """Capture the current tmux pane content."""
-    result = subprocess.run(
-        ['tmux', 'capture-pane', '-t', session, '-p', '-S', '0', '-E', '30'],
-        capture_output=True, text=True, check=True
-    )
-    return result.stdout
-
-
-def wait_for_game_ready_with_chargen(session, rng_log_file, role='Valkyrie'):
+def wait_for_game_ready_with_chargen(session, rng_tail, role='Valkyrie'):
     """Navigate startup prompts AND character creation until game is ready.
 
     Returns:
-        List of chargen steps (key, action, rng, screen)
+        (chargen steps (key, action, rng, screen), RNG log lines consumed
+        by chargen)
     """
     role_key = ROLE_KEYS.get(role, 'v')
     chargen_steps = []
-    prev_rng_count = 0
+    chargen_rng_lines = []
 
     for attempt in range(80):
         try:
@@ -117,8 +99,6 @@ def wait_for_game_ready_with_chargen(session, rng_log_file, role='Valkyrie'):
             print(f'  [attempt {attempt}] tmux session died')
             break
 
-        rng_count, rng_lines = read_rng_log(rng_log_file)
-
         # Determine key to send based on screen content
         key = None
         action = None
@@ -165,8 +145,8 @@ def wait_for_game_ready_with_chargen(session, rng_log_file, role='Valkyrie'):
         # Wait for screen update, then capture state
         time.sleep(0.1)
         screen = capture_screen_lines(session)
-        rng_count, rng_lines = read_rng_log(rng_log_file)
-        delta_lines = rng_lines[prev_rng_count:rng_count]
+        delta_lines = rng_tail.read_new()
+        chargen_rng_lines.extend(delta_lines)
         rng_entries = parse_rng_lines(delta_lines)
 
         step = {
@@ -177,11 +157,9 @@ def wait_for_game_ready_with_chargen(session, rng_log_file, role='Valkyrie'):
         }
         chargen_steps.append(step)
 
-        delta = rng_count - prev_rng_count
-        print(f'  [{len(chargen_steps):02d}] key={key!r:3s} ({action:20s}) +{delta} RNG')
-        prev_rng_count = rng_count
+        print(f'  [{len(chargen_steps):02d}] key={key!r:3s} ({action:20s}) +{len(delta_lines)} RNG')
 
-    return chargen_steps, prev_rng_count
+    return chargen_steps, chargen_rng_lines
 
 
 def get_agent_move(session_name, screen_lines, turn):
@@ -204,10 +182,10 @@ def generate_trace(seed, max_turns=100, role='Valkyrie'):
         print(f"Run setup.sh first: bash {os.path.join(SCRIPT_DIR, 'setup.sh')}")
         sys.exit(1)
 
-    setup_home()
     os.makedirs(SESSIONS_DIR, exist_ok=True)
 
     tmpdir = tempfile.mkdtemp(prefix='webhack-selfplay-')
+    home, nethackdir = setup_home(tmpdir)
     rng_log_file = os.path.join(tmpdir, 'rnglog.txt')
     dumpmap_file = os.path.join(tmpdir, 'dumpmap.txt')
 
@@ -216,11 +194,11 @@ def generate_trace(seed, max_turns=100, role='Valkyrie'):
     try:
         cmd = (
             f'{fixed_datetime_env()}'
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'NETHACK_SEED={seed} '
             f'NETHACK_RNGLOG={rng_log_file} '
             f'NETHACK_DUMPMAP={dumpmap_file} '
-            f'HOME={RESULTS_DIR} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u Wizard -D; '
             f'sleep 999'
@@ -236,14 +214,15 @@ def generate_trace(seed, max_turns=100, role='Valkyrie'):
         print(f'\n=== CHARACTER CREATION ===')
 
         # Navigate character creation and capture steps
-        chargen_steps, prev_rng_count = wait_for_game_ready_with_chargen(
-            session_name, rng_log_file, role
+        rng_tail = RngLogTailer(rng_log_file)
+        chargen_steps, chargen_rng_lines = wait_for_game_ready_with_chargen(
+            session_name, rng_tail, role
         )
+        prev_rng_count = rng_tail.count
 
         # Capture startup state (after chargen)
         startup_screen = capture_screen_lines(session_name)
-        startup_rng_count, startup_rng_lines = read_rng_log(rng_log_file)
-        startup_rng_entries = parse_rng_lines(startup_rng_lines[:prev_rng_count])
+        startup_rng_entries = parse_rng_lines(chargen_rng_lines)
 
         print(f'\nChargen complete: {len(chargen_steps)} steps, {prev_rng_count} RNG calls')
 
@@ -308,8 +287,8 @@ def generate_trace(seed, max_turns=100, role='Valkyrie'):
 
             # Capture state after move
             screen = capture_screen_lines(session_name)
-            rng_count, rng_lines = read_rng_log(rng_log_file)
-            delta_lines = rng_lines[prev_rng_count:rng_count]
+            delta_lines = rng_tail.read_new()
+            rng_count = rng_tail.count
             rng_entries = parse_rng_lines(delta_lines)
 
             # Detect depth
@@ -362,7 +341,7 @@ def generate_trace(seed, max_turns=100, role='Valkyrie'):
         return filepath
 
     finally:
-        subprocess.run(['tmux', 'kill-session', '-t', session_name], capture_output=True)
+        tmux_kill_session(session_name)
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
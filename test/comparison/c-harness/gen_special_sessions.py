@@ -2,15 +2,19 @@
 """Generate C session files for special levels across all dungeon branches.
 
 Usage:
-    python3 gen_special_sessions.py <group> [--seeds 42,1,100] [--verbose]
+    python3 gen_special_sessions.py <group> [--seeds 42,1,100] [--verbose] [--jobs N]
     python3 gen_special_sessions.py --list-groups
-    python3 gen_special_sessions.py --all [--seeds 42,1,100] [--verbose]
+    python3 gen_special_sessions.py --all [--seeds 42,1,100] [--verbose] [--jobs N]
 
 Groups: sokoban, mines, vlad, knox, oracle, castle, medusa, valley,
         gehennom, wizard, quest, planes, rogue, bigroom, filler, tutorial
 
 Delegates to run_session.py --wizload for each level, producing unified v3
-session files with RNG logs, screens, typGrids, and checkpoints.
+session files with RNG logs, screens, typGrids, and checkpoints.  Every
+level is loaded in a fresh game; --jobs N runs up to N of those games at
+once (default: one per core; --jobs 1 runs them one after another).  Each
+run_session.py uses its own tmux session and game directory, so the files
+are the same whatever N is.
 
 Output: test/comparison/sessions/seed<N>_<levelname>.session.json
 """
@@ -18,6 +22,7 @@ Output: test/comparison/sessions/seed<N>_<levelname>.session.json
 import sys
 import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
@@ -211,11 +216,41 @@ QUEST_ROLE_BY_PREFIX = {
 }
 
 
-def generate_group(group_name, seeds, verbose=False):
+def level_commands(group_name, group, seeds, verbose=False):
+    """Return (seed, label, cmd) for every run_session.py --wizload call of a group."""
+    run_session_py = os.path.join(SCRIPT_DIR, 'run_session.py')
+    commands = []
+    for seed in seeds:
+        for level_def in group['levels']:
+            level_name = level_def['name']
+            output_file = os.path.join(SESSIONS_DIR, f'seed{seed}_{level_name}.session.json')
+            cmd = [
+                sys.executable, run_session_py,
+                str(seed), output_file,
+                '--wizload', level_name,
+            ]
+            label = level_name
+            if group_name == 'quest':
+                # Quest levels need a character of the quest's role
+                prefix = level_name.split('-')[0]
+                role_name = QUEST_ROLE_BY_PREFIX.get(prefix)
+                if not role_name:
+                    print(f"  WARNING: unknown quest role prefix for {level_name}, skipping")
+                    continue
+                cmd += ['--character', role_name.lower()]
+                label = f"{level_name} (role={role_name})"
+            if verbose:
+                cmd.append('--verbose')
+            commands.append((seed, label, cmd))
+    return commands
+
+
+def generate_group(group_name, seeds, verbose=False, jobs=1):
     """Generate special-level sessions for one group across all requested seeds.
 
     Delegates to run_session.py --wizload for each level, producing
-    one unified v3 session file per level.
+    one unified v3 session file per level, up to jobs levels at a time.
+    Exits 1 after the other levels finish if any of them failed.
     """
     if group_name not in LEVEL_GROUPS:
         print(f"Error: unknown group '{group_name}'")
@@ -239,48 +274,45 @@ def generate_group(group_name, seeds, verbose=False):
     print(f"\n=== {group['description']} ===")
     print(f"Seeds: {seeds}")
 
-    run_session_py = os.path.join(SCRIPT_DIR, 'run_session.py')
     os.makedirs(SESSIONS_DIR, exist_ok=True)
+    commands = level_commands(group_name, group, seeds, verbose)
 
-    for seed in seeds:
-        print(f"\n--- Seed {seed} ---")
-
-        if group_name == 'quest':
-            # Quest levels need role-specific handling
-            for level_def in group['levels']:
-                level_name = level_def['name']
-                prefix = level_name.split('-')[0]
-                role_name = QUEST_ROLE_BY_PREFIX.get(prefix)
-                if not role_name:
-                    print(f"  WARNING: unknown quest role prefix for {level_name}, skipping")
-                    continue
+    if jobs <= 1:
+        last_seed = None
+        for seed, label, cmd in commands:
+            if seed != last_seed:
+                print(f"\n--- Seed {seed} ---")
+                last_seed = seed
+            print(f"  Generating {label}...")
+            subprocess.run(cmd, check=True)
+        print(f"\n=== Done: {group_name} ===")
+        return
 
-                output_file = os.path.join(SESSIONS_DIR, f'seed{seed}_{level_name}.session.json')
-                cmd = [
-                    sys.executable, run_session_py,
-                    str(seed), output_file,
-                    '--wizload', level_name,
-                    '--character', role_name.lower(),
-                ]
-                if verbose:
-                    cmd.append('--verbose')
-                print(f"  Generating {level_name} (role={role_name})...")
-                subprocess.run(cmd, check=True)
-        else:
-            # Non-quest levels
-            for level_def in group['levels']:
-                level_name = level_def['name']
-                output_file = os.path.join(SESSIONS_DIR, f'seed{seed}_{level_name}.session.json')
-                cmd = [
-                    sys.executable, run_session_py,
-                    str(seed), output_file,
-                    '--wizload', level_name,
-                ]
-                if verbose:
-                    cmd.append('--verbose')
-                print(f"  Generating {level_name}...")
-                subprocess.run(cmd, check=True)
+    # Parallel runs: collect each child's output and print it in one piece
+    # when it finishes, so the logs of different levels do not interleave.
+    print(f"Generating {len(commands)} level(s) with {jobs} workers")
+    failures = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(subprocess.run, cmd, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True): (seed, label)
+            for seed, label, cmd in commands
+        }
+        for n, future in enumerate(as_completed(futures), 1):
+            seed, label = futures[future]
+            proc = future.result()
+            status = 'done' if proc.returncode == 0 else f'FAILED (exit {proc.returncode})'
+            print(f"  [{n}/{len(commands)}] seed {seed} {label}: {status}")
+            if proc.returncode != 0 or verbose:
+                sys.stdout.write(proc.stdout)
+            if proc.returncode != 0:
+                failures.append(f"seed {seed} {label}")
 
+    if failures:
+        print(f"\n=== {group_name}: {len(failures)} level(s) failed ===")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
     print(f"\n=== Done: {group_name} ===")
 
 
@@ -302,22 +334,29 @@ def main():
             args = args[:i] + args[i + 2:]
             break
 
+    # Parse --jobs (default: one game per core)
+    jobs = os.cpu_count() or 1
+    if '--jobs' in args:
+        idx = args.index('--jobs')
+        jobs = int(args[idx + 1])
+        args = args[:idx] + args[idx + 2:]
+
     verbose = '--verbose' in args or os.environ.get('WEBHACK_DEBUG', '')
     args = [a for a in args if a != '--verbose']
 
     if '--all' in args:
         for group_name in LEVEL_GROUPS:
-            generate_group(group_name, seeds, verbose)
+            generate_group(group_name, seeds, verbose, jobs)
         return
 
     if not args:
-        print(f"Usage: {sys.argv[0]} <group> [--seeds 42,1,100]")
-        print(f"       {sys.argv[0]} --all [--seeds 42,1,100]")
+        print(f"Usage: {sys.argv[0]} <group> [--seeds 42,1,100] [--jobs N]")
+        print(f"       {sys.argv[0]} --all [--seeds 42,1,100] [--jobs N]")
         print(f"       {sys.argv[0]} --list-groups")
         sys.exit(1)
 
     group_name = args[0]
-    generate_group(group_name, seeds, verbose)
+    generate_group(group_name, seeds, verbose, jobs)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Wait for the C game to block on input instead of sleeping.
+
+With 015-input-wait-marker.patch, C NetHack writes one line
+
+    <seq> <rng_call_count>
+
+to $NETHACK_INPUTWAIT every time its tty key-read routine is about to block,
+after flushing the screen.  InputWaiter creates that path as a FIFO and
+reads the markers with select(), so the harness wakes up exactly when the
+game is ready for the next key.
+
+Every key read consumes one key and is preceded by one marker, so after the
+harness has sent N keys the game has caught up (and is idle) once it has
+written N + 1 markers.  If the game exits, the FIFO reports EOF and waits
+return immediately.
+
+Set WEBHACK_INPUT_WAIT=0 to disable markers and fall back to fixed sleeps.
+WEBHACK_INPUT_WAIT_TIMEOUT (seconds, default 10) bounds each wait.
+"""
+
+import os
+import select
+import time
+
+ENV_VAR = 'NETHACK_INPUTWAIT'
+
+_binary_support = {}
+
+
+def input_wait_enabled():
+    return os.environ.get('WEBHACK_INPUT_WAIT', '1') not in ('0', 'false', 'no', '')
+
+
+def input_wait_timeout():
+    return float(os.environ.get('WEBHACK_INPUT_WAIT_TIMEOUT', '10'))
+
+
+def binary_supports_input_wait(binary):
+    """True if the C binary was built with the input-wait marker patch."""
+    if binary not in _binary_support:
+        try:
+            with open(binary, 'rb') as f:
+                _binary_support[binary] = ENV_VAR.encode('ascii') in f.read()
+        except OSError:
+            _binary_support[binary] = False
+    return _binary_support[binary]
+
+
+class InputWaiter:
+    """Reads input-wait markers from a FIFO the game writes to."""
+
+    def __init__(self, path):
+        if os.path.lexists(path):
+            os.unlink(path)
+        os.mkfifo(path)
+        self.path = path
+        # Non-blocking so opening does not wait for the game to start.
+        self.fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        self.buf = b''
+        self.seq = 0
+        self.rng_calls = None
+        self.keys_sent = 0
+        self.eof = False
+
+    def _drain(self, timeout):
+        """Read whatever is available, waiting up to timeout for the first byte."""
+        if self.fd is None or self.eof:
+            return
+        while True:
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+            if not ready:
+                return
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            if not data:
+                # Readable with no data: the game closed its end.
+                self.eof = True
+                return
+            self.buf += data
+            *lines, self.buf = self.buf.split(b'\n')
+            for line in lines:
+                parts = line.split()
+                if len(parts) == 2:
+                    self.seq = int(parts[0])
+                    self.rng_calls = int(parts[1])
+            timeout = 0
+
+    def note_sent(self, nkeys=1):
+        self.keys_sent += nkeys
+
+    def idle(self):
+        return self.eof or self.seq > self.keys_sent
+
+    def wait_idle(self, timeout):
+        """Block until the game has consumed every key sent and is waiting.
+
+        Returns False on timeout.  The key count is then resynchronised to
+        the markers seen, so a key the game discarded does not make every
+        later wait time out as well.
+        """
+        deadline = time.monotonic() + timeout
+        self._drain(0)
+        while not self.idle():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.keys_sent = max(0, self.seq - 1)
+                return False
+            self._drain(remaining)
+        return True
+
+    def close(self):
+        fd, self.fd = self.fd, None
+        if fd is not None:
+            os.close(fd)
@@ -8,7 +8,9 @@ This script replays recorded keycodes into C NetHack with the same seed and
 captures:
   - startup RNG + screen + typGrid
   - per-step RNG deltas + screen + depth
-  - typGrid snapshots when terrain changes
+  - typGrid snapshots when terrain changes (every change with the C
+    typGrid autodump patch, see typgrid_log.py; otherwise via #dumpmap on
+    depth changes)
 
 It emits the same session structure used by run_session.py.
 """
@@ -16,9 +18,7 @@ It emits the same session structure used by run_session.py.
 import argparse
 import json
 import os
-import subprocess
 import tempfile
-import time
 import importlib.util
 import shutil
 
@@ -34,17 +34,28 @@ _spec.loader.exec_module(_session)
 
 tmux_send = _session.tmux_send
 tmux_send_special = _session.tmux_send_special
+tmux_kill_session = _session.tmux_kill_session
+start_game_session = _session.start_game_session
+input_wait_env = _session.input_wait_env
+typgrid_log_env = _session.typgrid_log_env
+typgrid_log_active = _session.typgrid_log_active
+read_new_typ_grids = _session.read_new_typ_grids
+latest_typ_grid = _session.latest_typ_grid
+wait_for_input = _session.wait_for_input
 capture_screen_lines = _session.capture_screen_lines
 capture_screen_ansi_lines = _session.capture_screen_ansi_lines
+capture_screen_views = _session.capture_screen_views
 clear_more_prompts = _session.clear_more_prompts
 wait_for_game_ready = _session.wait_for_game_ready
-read_rng_log = _session.read_rng_log
+RngLogTailer = _session.RngLogTailer
 parse_rng_lines = _session.parse_rng_lines
 execute_dumpmap = _session.execute_dumpmap
 quit_game = _session.quit_game
-compact_session_json = _session.compact_session_json
+SessionWriter = _session.SessionWriter
+profiler = _session.profiler
 fixed_datetime_env = _session.fixed_datetime_env
 detect_depth = _session.detect_depth
+create_sandbox = _session.create_sandbox
 
 
 def parse_args():
@@ -83,6 +94,12 @@ def parse_args():
         choices=['auto', 'ready', 'from-keylog'],
         help='Startup handling: ready=auto-advance to map before replay, from-keylog=replay startup keys exactly, auto=detect from keylog in_moveloop'
     )
+    p.add_argument(
+        '--backend',
+        default=_session.GAME_BACKEND,
+        choices=list(_session.GAME_BACKENDS),
+        help='Terminal backend: tmux, or pty for an in-process pty + pyte screen (no tmux server)'
+    )
     args = p.parse_args()
     if not args.from_config and (not args.input_jsonl or not args.output_json):
         p.error('--in and --out are required unless --from-config is used')
@@ -95,9 +112,9 @@ def load_seeds_config():
         return json.load(f)
 
 
-def setup_home(character, symset, tutorial_enabled=False):
-    os.makedirs(RESULTS_DIR, exist_ok=True)
-    nethackrc = os.path.join(RESULTS_DIR, '.nethackrc')
+def setup_home(tmpdir, character, symset, tutorial_enabled=False):
+    home, nethackdir = create_sandbox(tmpdir, INSTALL_DIR)
+    nethackrc = os.path.join(home, '.nethackrc')
     with open(nethackrc, 'w') as f:
         f.write(f'OPTIONS=name:{character["name"]}\n')
         f.write(f'OPTIONS=race:{character["race"]}\n')
@@ -111,23 +128,7 @@ def setup_home(character, symset, tutorial_enabled=False):
             f.write('OPTIONS=symset:DECgraphics\n')
         else:
             f.write('OPTIONS=symset:ASCII\n')
-
-    import glob
-    save_dir = os.path.join(INSTALL_DIR, 'save')
-    if os.path.isdir(save_dir):
-        for fn in glob.glob(os.path.join(save_dir, '*')):
-            os.unlink(fn)
-    for fn in glob.glob(os.path.join(INSTALL_DIR, '*wizard*')):
-        if not fn.endswith('.lua'):
-            os.unlink(fn)
-    for fn in glob.glob(os.path.join(INSTALL_DIR, '*Wizard*')):
-        if not fn.endswith('.lua'):
-            os.unlink(fn)
-    for fn in glob.glob(os.path.join(INSTALL_DIR, f'*{character["name"]}*')):
-        if not fn.endswith('.lua'):
-            os.unlink(fn)
-    for fn in glob.glob(os.path.join(INSTALL_DIR, 'bon*')):
-        os.unlink(fn)
+    return home, nethackdir
 
 
 def read_keylog(path):
@@ -227,12 +228,13 @@ def drop_leading_space_events(events, drop_count):
 
 def capture_screens(session_name, mode):
     """Capture screen fields according to mode and return dict."""
-    out = {}
-    if mode in ('plain', 'both'):
-        out['screen'] = capture_screen_lines(session_name)
-    if mode in ('ansi', 'both'):
-        out['screenAnsi'] = capture_screen_ansi_lines(session_name)
-    return out
+    if mode == 'both':
+        # One ANSI capture; the plain view is derived from it.
+        screen, screen_ansi = capture_screen_views(session_name)
+        return {'screen': screen, 'screenAnsi': screen_ansi}
+    if mode == 'ansi':
+        return {'screenAnsi': capture_screen_ansi_lines(session_name)}
+    return {'screen': capture_screen_lines(session_name)}
 
 
 def run_from_keylog(
@@ -246,32 +248,33 @@ def run_from_keylog(
     tutorial_enabled,
     regen=None
 ):
-    setup_home(character, symset, tutorial_enabled)
     output_json = os.path.abspath(output_json)
 
     tmpdir = tempfile.mkdtemp(prefix='webhack-keylog-session-')
+    home, nethackdir = setup_home(tmpdir, character, symset, tutorial_enabled)
     rng_log_file = os.path.join(tmpdir, 'rnglog.txt')
     dumpmap_file = os.path.join(tmpdir, 'dumpmap.txt')
     session_name = f'webhack-keylog-{seed}-{os.getpid()}'
     keylog_moves_base = int(events[0].get('moves', 0))
+    writer = None
+    profiler.start(output_json)
 
     try:
         cmd = (
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'{fixed_datetime_env()}'
             f'NETHACK_SEED={seed} '
             f'NETHACK_RNGLOG={rng_log_file} '
             f'NETHACK_DUMPMAP={dumpmap_file} '
-            f'HOME={RESULTS_DIR} '
+            f'{input_wait_env(session_name, tmpdir)}'
+            f'{typgrid_log_env(session_name, tmpdir)}'
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u {character["name"]} -D; '
             f'sleep 999'
         )
-        subprocess.run(
-            ['tmux', 'new-session', '-d', '-s', session_name, '-x', '80', '-y', '24', cmd],
-            check=True
-        )
-        time.sleep(1.0)
+        start_game_session(session_name, cmd)
+        wait_for_input(session_name, 1.0)
 
         keylog_has_startup = any(int(e.get('in_moveloop', 1)) == 0 for e in events[:64])
         replay_startup_from_keylog = (
@@ -281,20 +284,24 @@ def run_from_keylog(
         if replay_startup_from_keylog:
             # Keylog traces captured via c_manual_record already include startup/chargen keys.
             # Do not auto-advance prompts here or we will double-apply startup.
-            time.sleep(0.5)
+            wait_for_input(session_name, 0.5)
         else:
             wait_for_game_ready(session_name, rng_log_file)
-            time.sleep(0.1)
+            wait_for_input(session_name, 0.1)
             clear_more_prompts(session_name)
-            time.sleep(0.1)
+            wait_for_input(session_name, 0.1)
 
         startup_screens = capture_screens(session_name, screen_capture_mode)
-        startup_rng_count, startup_rng_lines = read_rng_log(rng_log_file)
-        startup_rng_entries = parse_rng_lines(startup_rng_lines)
+        rng_tail = RngLogTailer(rng_log_file)
+        startup_rng_entries = rng_tail.read_new_entries()
         startup_actual_rng = sum(1 for e in startup_rng_entries if e[0] not in ('>', '<'))
-        startup_typ_grid = execute_dumpmap(session_name, dumpmap_file)
-        if not replay_startup_from_keylog:
-            clear_more_prompts(session_name)
+        auto_typ_grids = typgrid_log_active(session_name)
+        if auto_typ_grids:
+            startup_typ_grid = latest_typ_grid(session_name)
+        else:
+            startup_typ_grid = execute_dumpmap(session_name, dumpmap_file)
+            if not replay_startup_from_keylog:
+                clear_more_prompts(session_name)
 
         session_data = {
             'version': 1,
@@ -315,8 +322,9 @@ def run_from_keylog(
         }
         if regen:
             session_data['regen'] = regen
+        writer = SessionWriter(output_json, session_data)
+        profiler.end_step('startup')
 
-        prev_rng_count = startup_rng_count
         startup_depth_lines = startup_screens.get('screen') or startup_screens.get('screenAnsi') or []
         prev_depth = detect_depth(startup_depth_lines)
         prev_typ_grid = startup_typ_grid
@@ -329,15 +337,13 @@ def run_from_keylog(
         for i, e in enumerate(events):
             code = int(e['key'])
             send_keycode(session_name, code)
-            time.sleep(0.05)
+            wait_for_input(session_name, 0.05)
             if not replay_startup_from_keylog:
                 clear_more_prompts(session_name)
-                time.sleep(0.05)
+                wait_for_input(session_name, 0.05)
 
             screens = capture_screens(session_name, screen_capture_mode)
-            rng_count, rng_lines = read_rng_log(rng_log_file)
-            delta_lines = rng_lines[prev_rng_count:rng_count]
-            rng_entries = parse_rng_lines(delta_lines)
+            rng_entries = rng_tail.read_new_entries()
 
             depth_lines = screens.get('screen') or screens.get('screenAnsi') or []
             depth = int(e.get('dlevel', detect_depth(depth_lines)))
@@ -371,9 +377,16 @@ def run_from_keylog(
                 **screens,
             }
 
+            if auto_typ_grids:
+                # The game wrote one if this key changed level or terrain.
+                new_grids = read_new_typ_grids(session_name)
+                if new_grids:
+                    step['typGrid'] = new_grids[-1]
+                    prev_typ_grid = new_grids[-1]
+                prev_depth = depth
             # For long manual traces, #dumpmap on every key is too expensive.
             # Capture typGrid when depth changes, matching level-transition points.
-            if depth != prev_depth:
+            elif depth != prev_depth:
                 current_grid = execute_dumpmap(session_name, dumpmap_file)
                 clear_more_prompts(session_name)
                 if current_grid:
@@ -381,20 +394,22 @@ def run_from_keylog(
                     prev_typ_grid = current_grid
                 prev_depth = depth
 
-            session_data['steps'].append(step)
-            prev_rng_count = rng_count
+            writer.append_step(step)
+            profiler.end_step(step['key'])
             if (i + 1) % 200 == 0:
                 print(f'  replayed {i + 1}/{len(events)} events')
 
         quit_game(session_name)
 
-        os.makedirs(os.path.dirname(output_json), exist_ok=True)
-        with open(output_json, 'w') as f:
-            f.write(compact_session_json(session_data))
+        writer.finalize()
         print(f'Wrote {output_json}')
+        profiler.finish('quit')
 
     finally:
-        subprocess.run(['tmux', 'kill-session', '-t', session_name], capture_output=True)
+        if writer is not None:
+            writer.close()
+        profiler.close()
+        tmux_kill_session(session_name)
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
@@ -502,6 +517,7 @@ def run_from_config():
 
 def main():
     args = parse_args()
+    _session.set_game_backend(args.backend)
     if args.from_config:
         run_from_config()
         return
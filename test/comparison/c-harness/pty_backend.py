@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""In-process pty + virtual-terminal backend for the C capture harness.
+
+The default harness runs NetHack inside a tmux server and reads screens back
+with `tmux capture-pane`.  PtySession removes tmux from the loop: the harness
+owns the pty (via pexpect, as capture_chargen.py does), a reader thread feeds
+every byte the game writes into a pyte screen model, and captures are read
+straight from that in-memory screen.
+
+PtySession exposes the same send_literal / send_special / capture(ansi=...)
+methods as tmux_control.TmuxControl, so run_session.py can route its tmux_*
+helpers to either backend by session name.
+
+ANSI captures are rendered the way `tmux capture-pane -e` renders them:
+one SGR sequence per changed attribute or colour, a reset (0) followed by
+both colours whenever an attribute is removed, and SO/SI around DEC
+line-drawing cells.  Attribute state carries across lines, as in tmux.
+The one difference: pyte cannot tell explicitly written trailing spaces from
+untouched cells, so trailing default blanks are always trimmed (the v3 ANSI
+RLE screen encoding strips them anyway).
+
+Requires: pip install pexpect pyte
+"""
+
+import select
+import subprocess
+import threading
+
+import pexpect
+import pyte
+from pyte import charsets, graphics
+
+# tmux key names used by the harness -> bytes the terminal would send.
+SPECIAL_KEYS = {
+    'Enter': b'\r',
+    'Space': b' ',
+    'Escape': b'\x1b',
+    'BSpace': b'\x7f',
+    'Tab': b'\t',
+    'Up': b'\x1b[A',
+    'Down': b'\x1b[B',
+    'Right': b'\x1b[C',
+    'Left': b'\x1b[D',
+}
+
+# pyte stores DEC special graphics as Unicode; map back to the ACS letters
+# tmux reports (e.g. '─' -> 'q').
+_ACS_FROM_UNICODE = {
+    ch: chr(i) for i, ch in enumerate(charsets.VT100_MAP) if ch != chr(i)
+}
+
+# pyte colour names -> SGR parameters for foreground / background.
+_FG_CODES = {name: str(code) for code, name in graphics.FG_ANSI.items()}
+_FG_CODES.update({name: str(code) for code, name in graphics.FG_AIXTERM.items()})
+_BG_CODES = {name: str(code) for code, name in graphics.BG_ANSI.items()}
+_BG_CODES.update({name: str(code) for code, name in graphics.BG_AIXTERM.items()})
+# Cube/grey entries win over the duplicate hex values of the first 16.
+_COLOR_256 = {_hex: _idx for _idx, _hex in enumerate(graphics.FG_BG_256)}
+
+# pyte attribute -> SGR code, in tmux's emission order.
+_ATTR_CODES = (
+    ('bold', 1),
+    ('italics', 3),
+    ('underscore', 4),
+    ('blink', 5),
+    ('reverse', 7),
+    ('strikethrough', 9),
+)
+
+_DEFAULT_CELL = (frozenset(), 'default', 'default', False)
+
+
+def special_key_bytes(key):
+    """Translate a tmux key name (Enter, C-v, ...) to terminal input bytes."""
+    if key in SPECIAL_KEYS:
+        return SPECIAL_KEYS[key]
+    if key.startswith('C-') and len(key) == 3:
+        return bytes([ord(key[2]) & 0x1f])
+    return key.encode('utf-8')
+
+
+def _color_code(color, table, extended):
+    if color in table:
+        return table[color]
+    if color in _COLOR_256:
+        return f'{extended};5;{_COLOR_256[color]}'
+    try:
+        r, g, b = (int(color[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return table['default']
+    return f'{extended};2;{r};{g};{b}'
+
+
+def _cell_state(char):
+    data = char.data
+    acs = data in _ACS_FROM_UNICODE
+    attrs = frozenset(name for name, _ in _ATTR_CODES if getattr(char, name))
+    return (attrs, char.fg, char.bg, acs), (_ACS_FROM_UNICODE[data] if acs else data)
+
+
+def _sgr_transition(prev, cur):
+    """Escape codes taking the terminal from cell state prev to cur."""
+    prev_attrs, prev_fg, prev_bg, prev_acs = prev
+    attrs, fg, bg, acs = cur
+    out = []
+    reset = bool(prev_attrs - attrs)
+    if reset:
+        out.append('\x1b[0m')
+        prev_attrs = frozenset()
+    for name, code in _ATTR_CODES:
+        if name in attrs and name not in prev_attrs:
+            out.append(f'\x1b[{code}m')
+    if reset or fg != prev_fg:
+        out.append(f'\x1b[{_color_code(fg, _FG_CODES, 38)}m')
+    if reset or bg != prev_bg:
+        out.append(f'\x1b[{_color_code(bg, _BG_CODES, 48)}m')
+    if acs and not prev_acs:
+        out.append('\x0e')
+    elif prev_acs and not acs:
+        out.append('\x0f')
+    return ''.join(out)
+
+
+def render_plain_lines(screen):
+    """Screen rows as plain text with trailing blanks trimmed."""
+    lines = []
+    for y in range(screen.lines):
+        row = screen.buffer[y]
+        text = ''.join(
+            _ACS_FROM_UNICODE.get(row[x].data, row[x].data) for x in range(screen.columns)
+        )
+        lines.append(text.rstrip(' '))
+    return lines
+
+
+def render_ansi_lines(screen):
+    """Screen rows with SGR/SO/SI codes, matching `tmux capture-pane -e`."""
+    lines = []
+    state = _DEFAULT_CELL
+    for y in range(screen.lines):
+        row = screen.buffer[y]
+        cells = [_cell_state(row[x]) for x in range(screen.columns)]
+        # Trailing default blanks are not part of the line.
+        end = len(cells)
+        while end > 0 and cells[end - 1][1] == ' ' and cells[end - 1][0] == _DEFAULT_CELL:
+            end -= 1
+        parts = []
+        for cell, data in cells[:end]:
+            if cell != state:
+                parts.append(_sgr_transition(state, cell))
+                state = cell
+            parts.append(data)
+        lines.append(''.join(parts))
+    return lines
+
+
+class PtySession:
+    """A game process on a harness-owned pty, rendered into a pyte screen."""
+
+    def __init__(self, cmd, width=80, height=24):
+        self.screen = pyte.Screen(width, height)
+        self.stream = pyte.ByteStream(self.screen)
+        # pyte ignores charset designation (ESC ( 0) and SO/SI in UTF-8
+        # mode; DECgraphics needs them, and the game's output is ASCII.
+        self.stream.use_utf8 = False
+        self.lock = threading.Lock()
+        self.child = pexpect.spawn(
+            '/bin/sh', ['-c', cmd],
+            dimensions=(height, width),
+            encoding=None,
+            timeout=None,
+        )
+        # pexpect pauses 50ms before every send by default.
+        self.child.delaybeforesend = None
+        self.reader = threading.Thread(target=self._pump, daemon=True)
+        self.reader.start()
+
+    def _feed_pending(self):
+        """Feed output that is ready right now; caller holds self.lock.
+
+        Raises pexpect.TIMEOUT when nothing is pending.
+        """
+        data = self.child.read_nonblocking(size=65536, timeout=0)
+        if data:
+            self.stream.feed(data)
+
+    def _pump(self):
+        # Reads happen under the lock so sync() can tell "nothing pending"
+        # from "read but not yet fed".
+        while True:
+            try:
+                select.select([self.child.child_fd], [], [])
+                with self.lock:
+                    self._feed_pending()
+            except pexpect.TIMEOUT:
+                continue
+            except (pexpect.EOF, OSError, ValueError):
+                return
+
+    def alive(self):
+        return self.child.isalive()
+
+    def _send(self, data):
+        if not self.alive():
+            raise subprocess.CalledProcessError(1, ['pty-send', data])
+        self.child.send(data)
+
+    def send_literal(self, keys):
+        self._send(keys.encode('utf-8'))
+
+    def send_special(self, key):
+        self._send(special_key_bytes(key))
+
+    def sync(self):
+        """Return once everything the game has written is on the screen."""
+        with self.lock:
+            while True:
+                try:
+                    self._feed_pending()
+                except (pexpect.TIMEOUT, pexpect.EOF, OSError, ValueError):
+                    return
+
+    def capture(self, ansi=False, start=0, end=30):
+        """Return the screen like `capture-pane -p` (one line per row).
+
+        start/end are accepted for TmuxControl compatibility; the pty screen
+        has no scrollback, so the whole visible screen is returned.
+        """
+        if not self.alive():
+            raise subprocess.CalledProcessError(1, ['pty-capture'])
+        with self.lock:
+            lines = render_ansi_lines(self.screen) if ansi else render_plain_lines(self.screen)
+        return '\n'.join(lines) + '\n'
+
+    def close(self):
+        try:
+            self.child.close(force=True)
+        except (pexpect.ExceptionPexpect, OSError):
+            pass
+        self.reader.join(timeout=1.0)
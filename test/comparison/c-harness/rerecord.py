@@ -6,23 +6,44 @@ Usage:
     python3 rerecord.py --all
     python3 rerecord.py --type gameplay
     python3 rerecord.py --dry-run ...       # show commands without executing
-    python3 rerecord.py --parallel ...      # run up to N in parallel (default 4)
+    python3 rerecord.py --parallel ...      # one worker per available core
     python3 rerecord.py --parallel 8 ...    # run up to 8 in parallel
+    python3 rerecord.py --force ...         # re-record even if unchanged
 
 Reads the `regen` metadata from each session JSON and dispatches the
 appropriate recording command (run_session.py, gen_option_sessions.py,
 gen_interface_sessions.py, gen_discoveries_session.py, or
 keylog_to_session.py).
+
+With --parallel, sessions run longest-first from a shared queue, so a long
+keylog capture starts early instead of becoming the tail of the run.  Cost
+is the session's last recorded wall time (results/rerecord_timings.json),
+or an estimate from its mode and step count.  Each capture's output goes to
+results/rerecord-logs/<session>.log and a progress/ETA line is shown.
+
+A session is skipped when nothing it was recorded from has changed: its
+fingerprint (the C binary, the patch set, the harness scripts, the session's
+regen metadata and options, and for keylog sessions the keylog file) matches
+the one stored in results/rerecord_manifest.json by its last successful
+re-record, and the session file is still the one that re-record wrote (its
+SHA-256 is stored alongside).  --force re-records it anyway.
+
+Sessions are found and filtered through the catalog in
+test/comparison/sessions/index.json (see session_index.py), so only
+new or changed session files are parsed.
 """
 
 import argparse
 import glob
+import hashlib
+import importlib.util
 import json
 import os
 import shlex
 import subprocess
 import sys
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.normpath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
@@ -35,6 +56,30 @@ GEN_OPTION = os.path.join(SCRIPT_DIR, 'gen_option_sessions.py')
 GEN_INTERFACE = os.path.join(SCRIPT_DIR, 'gen_interface_sessions.py')
 GEN_DISCOVERIES = os.path.join(SCRIPT_DIR, 'gen_discoveries_session.py')
 KEYLOG_TO_SESSION = os.path.join(SCRIPT_DIR, 'keylog_to_session.py')
+PATCHES_DIR = os.path.join(SCRIPT_DIR, 'patches')
+NETHACK_BINARY = os.path.join(PROJECT_ROOT, 'nethack-c', 'install', 'games', 'lib', 'nethackdir', 'nethack')
+
+RESULTS_DIR = os.path.join(SCRIPT_DIR, 'results')
+TIMINGS_FILE = os.path.join(RESULTS_DIR, 'rerecord_timings.json')
+LOG_DIR = os.path.join(RESULTS_DIR, 'rerecord-logs')
+MANIFEST_FILE = os.path.join(RESULTS_DIR, 'rerecord_manifest.json')
+
+# Session catalog (see session_index.py).
+_si_spec = importlib.util.spec_from_file_location('session_index', os.path.join(SCRIPT_DIR, 'session_index.py'))
+_session_index = importlib.util.module_from_spec(_si_spec)
+_si_spec.loader.exec_module(_session_index)
+
+# Seconds per capture when a session has no recorded timing yet:
+# (fixed startup/quit cost, cost per step) by regen.mode.
+COST_MODEL = {
+    'gameplay': (6.0, 0.12),
+    'keylog': (8.0, 0.12),
+    'chargen': (6.0, 0.3),
+    'wizload': (10.0, 0.0),
+    'interface': (5.0, 0.25),
+    'option_test': (5.0, 0.25),
+}
+DEFAULT_COST = (10.0, 0.2)
 
 # Character presets — duplicated from run_session.py to avoid heavy import
 CHARACTER_PRESETS = {
@@ -238,15 +283,157 @@ def _build_keylog(output, regen, data):
 
 def discover_sessions():
     """Find all session JSON files."""
-    patterns = [
-        os.path.join(SESSIONS_DIR, '*.session.json'),
-        os.path.join(MAPS_DIR, '*.session.json'),
-        os.path.join(MANUAL_DIR, '*.session.json'),
-    ]
-    files = []
-    for pattern in patterns:
-        files.extend(sorted(glob.glob(pattern)))
-    return files
+    return _session_index.session_files()
+
+
+def timing_key(session_path):
+    """Key for a session in the timings file: its path relative to the project."""
+    return os.path.relpath(os.path.abspath(session_path), PROJECT_ROOT)
+
+
+def load_json_file(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def update_json_file(path, entries):
+    """Merge entries into the JSON object in path (atomic rewrite)."""
+    if not entries:
+        return
+    merged = load_json_file(path)
+    merged.update(entries)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(merged, f, indent=1, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def load_timings():
+    return load_json_file(TIMINGS_FILE)
+
+
+def save_timings(new_timings):
+    """Merge new wall times into the timings file."""
+    update_json_file(TIMINGS_FILE, {key: round(sec, 1) for key, sec in new_timings.items()})
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file's contents, or None if it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def files_sha256(paths):
+    """One hash over the names and contents of several files."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode('utf-8') + b'\0')
+        digest.update((file_sha256(path) or '').encode('ascii') + b'\0')
+    return digest.hexdigest()
+
+
+def recorder_fingerprint():
+    """Hashes of the inputs shared by every recording.
+
+    The harness hash covers every recorder script and the modules they
+    load, but not this file: changing how sessions are scheduled does not
+    change what they record.
+    """
+    harness = [path for path in glob.glob(os.path.join(SCRIPT_DIR, '*.py'))
+               if os.path.basename(path) != os.path.basename(__file__)]
+    return {
+        'binary': file_sha256(NETHACK_BINARY),
+        'patches': files_sha256(glob.glob(os.path.join(PATCHES_DIR, '*.patch'))),
+        'harness': files_sha256(harness),
+    }
+
+
+def session_fingerprint(data, common):
+    """Fingerprint of everything a session is recorded from, or None.
+
+    None (never matches) when the binary is missing.  common is
+    recorder_fingerprint(); the rest comes from the session's own fields
+    that build_command() reads.
+    """
+    if not common.get('binary'):
+        return None
+    regen = data.get('regen') or {}
+    inputs = dict(common)
+    inputs['session'] = {
+        key: data.get(key)
+        for key in ('seed', 'regen', 'options', 'character', 'symset')
+    }
+    if regen.get('mode') == 'keylog' and regen.get('keylog'):
+        keylog_path = regen['keylog']
+        if not os.path.isabs(keylog_path):
+            keylog_path = os.path.join(PROJECT_ROOT, keylog_path)
+        inputs['keylog'] = file_sha256(keylog_path)
+    blob = json.dumps(inputs, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+def save_manifest(jobs, recorded):
+    """Store the fingerprints of the jobs that re-recorded successfully.
+
+    Each entry also holds the hash of the session file that was written,
+    so a session edited or replaced since then is not taken as up to date.
+    """
+    update_json_file(MANIFEST_FILE, {
+        job['key']: {
+            'inputs': job['fingerprint'],
+            'output': file_sha256(os.path.join(PROJECT_ROOT, job['key'])),
+        }
+        for job in jobs
+        if job['key'] in recorded and job['fingerprint']
+    })
+
+
+def is_unchanged(manifest_entry, fingerprint, session_path):
+    """True if a session's inputs and file both match its manifest entry."""
+    if not fingerprint or not isinstance(manifest_entry, dict):
+        return False
+    return (manifest_entry.get('inputs') == fingerprint
+            and manifest_entry.get('output') == file_sha256(session_path))
+
+
+def estimate_cost(session_path, entry, timings):
+    """Expected wall seconds to re-record a session (entry: its catalog entry)."""
+    recorded = timings.get(timing_key(session_path))
+    if recorded:
+        return float(recorded)
+    regen = entry.get('regen') or {}
+    base, per_step = COST_MODEL.get(regen.get('mode'), DEFAULT_COST)
+    steps = entry.get('steps') or 0
+    if not steps:
+        steps = len(regen.get('moves') or regen.get('keys') or '')
+    return base + per_step * steps
+
+
+def default_workers():
+    """One capture per available core (each is a tmux client plus the game)."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 4
+    return max(1, cores)
+
+
+def format_duration(sec):
+    sec = int(max(0, sec))
+    if sec >= 3600:
+        return f'{sec // 3600}h{sec % 3600 // 60:02d}m'
+    return f'{sec // 60}m{sec % 60:02d}s'
 
 
 def run_command(cmd, description, dry_run=False):
@@ -271,11 +458,72 @@ def shell_quote_cmd(cmd):
     return ' '.join(shlex.quote(arg) for arg in cmd)
 
 
-def _run_one(args_tuple):
-    """Worker for parallel execution."""
-    cmd, description = args_tuple
-    result = subprocess.run(cmd, cwd=SCRIPT_DIR)
-    return result.returncode == 0, description
+def run_scheduled(jobs, workers):
+    """Run jobs longest-first on a pool of workers, with a progress/ETA line.
+
+    jobs are dicts with cmd, desc, key and cost (estimated seconds), already
+    sorted by descending cost.  Workers take the next job from the shared
+    queue as soon as they finish one.  Returns (successes, failures,
+    timings), timings mapping each finished job's key to its wall time.
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    started = {}
+    timings = {}
+    interactive = sys.stdout.isatty()
+
+    def run_job(job):
+        log_path = os.path.join(LOG_DIR, os.path.basename(job['key']) + '.log')
+        started[job['key']] = time.monotonic()
+        with open(log_path, 'w') as log:
+            result = subprocess.run(job['cmd'], cwd=SCRIPT_DIR,
+                                    stdout=log, stderr=subprocess.STDOUT)
+        return result.returncode == 0, time.monotonic() - started[job['key']], log_path
+
+    def eta(pending, now):
+        # Scale estimates by how far off they have been so far.
+        est_done = sum(job['cost'] for job in finished)
+        ratio = sum(timings.values()) / est_done if est_done else 1.0
+        running = [max(0.0, job['cost'] * ratio - (now - started[job['key']]))
+                   for job in pending if job['key'] in started]
+        queued = sum(job['cost'] * ratio for job in pending if job['key'] not in started)
+        return max((sum(running) + queued) / workers, max(running, default=0.0))
+
+    successes = 0
+    failures = []
+    finished = []
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, job): job for job in jobs}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = futures[future]
+                ok, elapsed, log_path = future.result()
+                finished.append(job)
+                if ok:
+                    successes += 1
+                    timings[job['key']] = elapsed
+                    status = 'OK'
+                else:
+                    failures.append(job['desc'])
+                    status = f'FAILED (log: {log_path})'
+                if interactive:
+                    print('\r\033[K', end='')
+                print(f'  {status}: {job["desc"]} ({format_duration(elapsed)})')
+            now = time.monotonic()
+            if done or interactive:
+                line = (f'[{len(finished)}/{len(jobs)}] '
+                        f'{sum(1 for f in pending if futures[f]["key"] in started)} running, '
+                        f'{len(failures)} failed, elapsed {format_duration(now - t0)}, '
+                        f'ETA {format_duration(eta([futures[f] for f in pending], now))}')
+                if interactive:
+                    print('\r\033[K' + line, end='', flush=True)
+                else:
+                    print(line, flush=True)
+    if interactive:
+        print()
+    return successes, failures, timings
 
 
 def main():
@@ -284,8 +532,11 @@ def main():
     parser.add_argument('--all', action='store_true', help='Re-record all sessions')
     parser.add_argument('--type', dest='filter_type', help='Only re-record sessions with this regen.mode')
     parser.add_argument('--dry-run', action='store_true', help='Show commands without executing')
-    parser.add_argument('--parallel', nargs='?', const=4, type=int, default=None,
-                        help='Run up to N sessions in parallel (default 4)')
+    parser.add_argument('--parallel', nargs='?', const=0, type=int, default=None,
+                        help='Run up to N sessions in parallel, longest first '
+                             '(default: one per available core)')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-record sessions whose inputs are unchanged since the last re-record')
     args = parser.parse_args()
 
     if not args.sessions and not args.all and not args.filter_type:
@@ -299,16 +550,21 @@ def main():
         session_files = args.sessions
 
     # Build commands
+    index = _session_index.load_index()
+    timings = load_timings()
+    manifest = load_json_file(MANIFEST_FILE)
+    common = recorder_fingerprint()
     commands = []
     skipped = 0
+    unchanged = 0
     warnings = []
     for path in session_files:
         if not os.path.isfile(path):
             print(f'Warning: file not found: {path}')
             continue
 
-        with open(path) as f:
-            data = json.load(f)
+        entry = index.get(timing_key(path)) or _session_index.build_entry(path)
+        data = _session_index.session_header(entry)
 
         regen = data.get('regen', {})
         mode = regen.get('mode', '') if regen else ''
@@ -323,7 +579,19 @@ def main():
             warnings.append(f'  skip: {os.path.basename(path)} — {description}')
             continue
 
-        commands.append((cmd, f'{os.path.basename(path)}: {description}'))
+        key = timing_key(path)
+        fingerprint = session_fingerprint(data, common)
+        if not args.force and is_unchanged(manifest.get(key), fingerprint, path):
+            unchanged += 1
+            continue
+
+        commands.append({
+            'cmd': cmd,
+            'desc': f'{os.path.basename(path)}: {description}',
+            'key': key,
+            'cost': estimate_cost(path, entry, timings),
+            'fingerprint': fingerprint,
+        })
 
     # Print warnings
     if warnings:
@@ -332,6 +600,9 @@ def main():
             print(w)
         print()
 
+    if unchanged:
+        print(f'Unchanged since last re-record: {unchanged} session(s) (--force to re-record)\n')
+
     if not commands:
         print('No sessions to re-record.')
         return
@@ -339,20 +610,19 @@ def main():
     print(f'Re-recording {len(commands)} session(s)...\n')
 
     # Execute
-    if args.parallel and not args.dry_run:
-        successes = 0
-        failures = []
-        print(f'Running with up to {args.parallel} parallel workers\n')
-        with ProcessPoolExecutor(max_workers=args.parallel) as executor:
-            futures = {executor.submit(_run_one, (cmd, desc)): desc for cmd, desc in commands}
-            for future in as_completed(futures):
-                ok, desc = future.result()
-                if ok:
-                    successes += 1
-                    print(f'  OK: {desc}')
-                else:
-                    failures.append(desc)
-                    print(f'  FAILED: {desc}')
+    if args.parallel is not None:
+        # Longest first, so the big captures overlap the many short ones.
+        commands.sort(key=lambda job: -job['cost'])
+        workers = min(args.parallel or default_workers(), len(commands))
+        total = sum(job['cost'] for job in commands)
+        print(f'Running with up to {workers} parallel workers, estimated '
+              f'{format_duration(total)} of work, '
+              f'about {format_duration(max(total / workers, commands[0]["cost"]))} wall\n')
+
+    if args.parallel is not None and not args.dry_run:
+        successes, failures, new_timings = run_scheduled(commands, workers)
+        save_timings(new_timings)
+        save_manifest(commands, new_timings)
         print(f'\nDone: {successes} succeeded, {len(failures)} failed')
         if failures:
             print('Failed:')
@@ -362,14 +632,21 @@ def main():
     else:
         successes = 0
         failures = []
-        for cmd, description in commands:
-            ok, _ = run_command(cmd, description, dry_run=args.dry_run)
+        new_timings = {}
+        for job in commands:
+            t0 = time.monotonic()
+            if args.parallel is not None and args.dry_run:
+                print(f'  [est {format_duration(job["cost"])}]', end='')
+            ok, _ = run_command(job['cmd'], job['desc'], dry_run=args.dry_run)
             if ok:
                 successes += 1
+                new_timings[job['key']] = time.monotonic() - t0
             else:
-                failures.append(description)
+                failures.append(job['desc'])
 
         if not args.dry_run:
+            save_timings(new_timings)
+            save_manifest(commands, new_timings)
             print(f'\nDone: {successes} succeeded, {len(failures)} failed')
             if failures:
                 print('Failed:')
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Decoder for the binary RNG log written by 017-rnglog-binary.patch.
+
+With NETHACK_RNGLOG_FORMAT=binary, C NetHack writes $NETHACK_RNGLOG as a
+16-byte header followed by one fixed-width record per log entry:
+
+    header:  char magic[8] = "NHRNGBIN"; uint32 version; uint32 recsize
+    record:  uint8 kind; 3 pad bytes; int32 arg0, arg1, result; uint32 str
+
+kind 0 is a text line (midlog >/<, event ^) whose text is string `str`;
+kinds 1..6 are rn2, rnd, rnl, d, rne, rnz, with `str` naming the call site.
+d(n,x) keeps n in arg0 and x in arg1; the others only use arg0.  Strings live
+in <log>.str, one per line, string id N being line N (0 means none).
+
+BinaryRngLog turns records back into exactly what the text log would have
+produced: lines() gives text-log lines and entries() gives the compact
+entries of run_session.parse_rng_lines().  Records repeat heavily (same call
+site, same arguments, same result), so formatted entries are memoised per
+distinct record and decoding costs about one dict lookup per record.
+
+Records are in host byte order; the harness only runs on little-endian hosts.
+"""
+
+import mmap
+import os
+import struct
+
+MAGIC = b'NHRNGBIN'
+VERSION = 1
+HEADER = struct.Struct('<8sII')
+RECORD = struct.Struct('<B3xiiiI')
+KIND_TEXT = 0
+FUNC_NAMES = (None, 'rn2', 'rnd', 'rnl', 'd', 'rne', 'rnz')
+ENV_VAR = 'NETHACK_RNGLOG_FORMAT'
+
+
+def rng_log_format():
+    """RNG log format requested for new captures: 'text' or 'binary'."""
+    return os.environ.get('WEBHACK_RNGLOG_FORMAT', 'text')
+
+
+def rng_log_format_env():
+    """Env prefix selecting the RNG log format for a C command line.
+
+    Readers sniff the format from the file itself, so a binary built
+    without 017-rnglog-binary.patch simply keeps writing text.
+    """
+    if rng_log_format() != 'binary':
+        return ''
+    return f'{ENV_VAR}=binary '
+
+
+def is_binary_rng_log(path):
+    """True if path holds a binary RNG log (checked by its magic)."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class _Formatted(dict):
+    """Memo of record tuple -> formatted text, filled on first use.
+
+    Text naming a string the .str file does not hold yet gets the ?str<id>
+    placeholder but is not stored, so a later read resolves the string.
+    """
+
+    def __init__(self, log, compact):
+        super().__init__()
+        self.log = log
+        self.compact = compact
+
+    def __missing__(self, rec):
+        kind, arg0, arg1, result, sid = rec
+        if kind == KIND_TEXT:
+            text = self.log.string(sid)
+        else:
+            func = FUNC_NAMES[kind]
+            args = f'{arg0},{arg1}' if func == 'd' else str(arg0)
+            eq = '=' if self.compact else ' = '
+            text = f'{func}({args}){eq}{result}'
+            if sid:
+                text += f' @ {self.log.string(sid)}'
+        if sid < len(self.log.strings):
+            self[rec] = text
+        return text
+
+
+class BinaryRngLog:
+    """Random access to a binary RNG log the game may still be appending to.
+
+    Record indices count every record, text records included, the same way
+    line numbers count every line of a text log.  Only complete records are
+    ever returned.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.str_path = path + '.str'
+        self.strings = ['']
+        self._str_offset = 0
+        self._compact = _Formatted(self, compact=True)
+        self._text = _Formatted(self, compact=False)
+        self._check_header()
+
+    def _check_header(self):
+        with open(self.path, 'rb') as f:
+            data = f.read(HEADER.size)
+        if len(data) < HEADER.size:
+            raise ValueError(f'{self.path}: truncated binary RNG log header')
+        magic, version, recsize = HEADER.unpack(data)
+        if magic != MAGIC:
+            raise ValueError(f'{self.path}: not a binary RNG log')
+        if version != VERSION or recsize != RECORD.size:
+            raise ValueError(f'{self.path}: unsupported binary RNG log '
+                             f'(version {version}, record size {recsize})')
+
+    def _load_strings(self):
+        """Read string-table lines appended since the last call."""
+        try:
+            with open(self.str_path, 'rb') as f:
+                f.seek(self._str_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return
+        self._str_offset += end
+        self.strings.extend(
+            data[:end - 1].decode('utf-8', errors='replace').split('\n'))
+
+    def string(self, sid):
+        if sid >= len(self.strings):
+            self._load_strings()
+        try:
+            return self.strings[sid]
+        except IndexError:
+            return f'?str{sid}'
+
+    def record_count(self):
+        """Number of complete records in the log."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+        return max(0, size - HEADER.size) // RECORD.size
+
+    def _span(self, start, end):
+        total = self.record_count()
+        end = total if end is None else min(end, total)
+        return start, max(start, end)
+
+    def _map(self):
+        f = open(self.path, 'rb')
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+
+    def _data(self, start, end):
+        start, end = self._span(start, end)
+        if start == end:
+            return b''
+        with self._map() as mm:
+            return mm[HEADER.size + start * RECORD.size:
+                      HEADER.size + end * RECORD.size]
+
+    def records(self, start=0, end=None):
+        """Raw record tuples (kind, arg0, arg1, result, str) in [start, end)."""
+        return RECORD.iter_unpack(self._data(start, end))
+
+    def call_count(self, start=0, end=None):
+        """Number of RNG call records (not text records) in [start, end)."""
+        start, end = self._span(start, end)
+        if start == end:
+            return 0
+        with self._map() as mm:
+            a = HEADER.size + start * RECORD.size
+            b = HEADER.size + end * RECORD.size
+            kinds = mm[a:b:RECORD.size]
+        return len(kinds) - kinds.count(KIND_TEXT)
+
+    def entries(self, start=0, end=None):
+        """Compact entries, identical to parse_rng_lines() on the text log."""
+        return list(map(self._compact.__getitem__, self.records(start, end)))
+
+    def lines(self, start=0, end=None, call_base=None):
+        """Text-log lines (newline-terminated) for records [start, end).
+
+        call_base is the number of RNG calls before `start`; it is counted
+        from the log when not given.
+        """
+        if call_base is None:
+            call_base = self.call_count(0, start)
+        memo = self._text
+        out = []
+        n = call_base
+        for rec in self.records(start, end):
+            if rec[0] == KIND_TEXT:
+                out.append(memo[rec] + '\n')
+            else:
+                n += 1
+                out.append(f'{n} {memo[rec]}\n')
+        return out
+
+    def calls(self, start=0, end=None, call_base=None):
+        """(call, func, args, result, caller) for the RNG call records."""
+        if call_base is None:
+            call_base = self.call_count(0, start)
+        n = call_base
+        out = []
+        for kind, arg0, arg1, result, sid in self.records(start, end):
+            if kind == KIND_TEXT:
+                continue
+            n += 1
+            func = FUNC_NAMES[kind]
+            args = f'{arg0},{arg1}' if func == 'd' else str(arg0)
+            out.append((n, func, args, result,
+                        self.string(sid) if sid else None))
+        return out
@@ -24,6 +24,9 @@ import sys
 import os
 import time
 import subprocess
+import shutil
+import tempfile
+import importlib.util
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
@@ -34,6 +37,16 @@ DEFAULT_FIXED_DATETIME = '20000110090000'
 INSTALL_DIR = os.path.join(PROJECT_ROOT, 'nethack-c', 'install', 'games', 'lib', 'nethackdir')
 NETHACK_BINARY = os.path.join(INSTALL_DIR, 'nethack')
 
+# Persistent tmux control-mode client (one per session, see tmux_control.py)
+_tc_spec = importlib.util.spec_from_file_location('tmux_control', os.path.join(SCRIPT_DIR, 'tmux_control.py'))
+_tmux_control = importlib.util.module_from_spec(_tc_spec)
+_tc_spec.loader.exec_module(_tmux_control)
+
+# Private HOME and playground per capture (see capture_sandbox.py).
+_cs_spec = importlib.util.spec_from_file_location('capture_sandbox', os.path.join(SCRIPT_DIR, 'capture_sandbox.py'))
+_capture_sandbox = importlib.util.module_from_spec(_cs_spec)
+_cs_spec.loader.exec_module(_capture_sandbox)
+
 
 def harness_fixed_datetime():
     dt = os.environ.get('NETHACK_FIXED_DATETIME')
@@ -56,29 +69,45 @@ def has_calendar_luck_warning(content):
 
 def tmux_send(session, keys, delay=0.1):
     """Send literal keys to a tmux session and wait."""
-    subprocess.run(['tmux', 'send-keys', '-t', session, '-l', keys], check=True)
+    client = _tmux_control.get_client(session)
+    if client:
+        client.send_literal(keys)
+    else:
+        subprocess.run(['tmux', 'send-keys', '-t', session, '-l', keys], check=True)
     time.sleep(delay)
 
 def tmux_send_special(session, key, delay=0.1):
     """Send a special key (Enter, Space, etc.) to a tmux session."""
-    subprocess.run(['tmux', 'send-keys', '-t', session, key], check=True)
+    client = _tmux_control.get_client(session)
+    if client:
+        client.send_special(key)
+    else:
+        subprocess.run(['tmux', 'send-keys', '-t', session, key], check=True)
     time.sleep(delay)
 
 def tmux_capture(session):
     """Capture the current tmux pane content."""
+    client = _tmux_control.get_client(session)
+    if client:
+        return client.capture(start=None, end=None)
     result = subprocess.run(
         ['tmux', 'capture-pane', '-t', session, '-p'],
         capture_output=True, text=True, check=True
     )
     return result.stdout
 
-def setup_home(role='Valkyrie', race='human', gender='female', align='neutral'):
-    """Create HOME/.nethackrc for deterministic play.
+def tmux_kill_session(session):
+    """Kill a tmux session and close its control-mode client."""
+    _tmux_control.kill_session(session)
+
+def setup_home(tmpdir, role='Valkyrie', race='human', gender='female', align='neutral'):
+    """Create a capture sandbox in tmpdir with HOME/.nethackrc for deterministic play.
 
     Any of role/race/gender/align may be None to leave that option unset.
+    Returns (home, nethackdir), the HOME and NETHACKDIR to launch with.
     """
-    os.makedirs(RESULTS_DIR, exist_ok=True)
-    nethackrc = os.path.join(RESULTS_DIR, '.nethackrc')
+    home, nethackdir = _capture_sandbox.create_sandbox(tmpdir, INSTALL_DIR)
+    nethackrc = os.path.join(home, '.nethackrc')
     with open(nethackrc, 'w') as f:
         f.write('OPTIONS=name:Wizard\n')
         if race:
@@ -92,19 +121,7 @@ def setup_home(role='Valkyrie', race='human', gender='female', align='neutral'):
         f.write('OPTIONS=!autopickup\n')
         f.write('OPTIONS=suppress_alert:3.4.3\n')
         f.write('OPTIONS=symset:DECgraphics\n')
-
-    # Clean up stale game state to avoid prompts from previous crashed runs.
-    # Remove: save files, level/lock files (e.g. 501wizard.0), and bones files.
-    import glob
-    save_dir = os.path.join(INSTALL_DIR, 'save')
-    if os.path.isdir(save_dir):
-        for f in glob.glob(os.path.join(save_dir, '*')):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, '*wizard*')):
-        if not f.endswith('.lua'):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, 'bon*')):
-        os.unlink(f)
+    return home, nethackdir
 
 def wait_for_game_ready(session, verbose):
     """Wait for the game to finish character selection and show the dungeon."""
@@ -302,7 +319,8 @@ def main():
     if os.path.exists(output_file):
         os.unlink(output_file)
 
-    setup_home()
+    tmpdir = tempfile.mkdtemp(prefix='webhack-dumpmap-')
+    home, nethackdir = setup_home(tmpdir)
 
     verbose = os.environ.get('WEBHACK_DEBUG', '')
     session = f'webhack-dumpmap-{seed}-d{depth}-{os.getpid()}'
@@ -313,11 +331,11 @@ def main():
         rnglog_env = f'NETHACK_RNGLOG={rnglog} ' if rnglog else ''
         cmd = (
             f'{fixed_datetime_env()}'
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'NETHACK_SEED={seed} '
             f'NETHACK_DUMPMAP={output_file} '
             f'{rnglog_env}'
-            f'HOME={RESULTS_DIR} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u Wizard -D; '
             f'sleep 999'
@@ -346,8 +364,8 @@ def main():
 
     finally:
         # Always kill the tmux session
-        subprocess.run(['tmux', 'kill-session', '-t', session],
-                       capture_output=True)
+        tmux_kill_session(session)
+        shutil.rmtree(tmpdir, ignore_errors=True)
 
     if os.path.exists(output_file):
         with open(output_file) as f:
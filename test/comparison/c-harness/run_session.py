@@ -4,7 +4,7 @@
 Usage:
     # Gameplay session
     python3 run_session.py <seed> <output_json> [move_sequence]
-    python3 run_session.py --from-config
+    python3 run_session.py --from-config [--parallel [N]]
 
     # Special level session (via #wizloaddes)
     python3 run_session.py <seed> <output_json> --wizload <level_name>
@@ -15,6 +15,15 @@ Usage:
     # Interface/menu capture session
     python3 run_session.py <seed> <output_json> --interface <keys>
 
+    # Any mode without tmux: drive the game on an in-process pty
+    python3 run_session.py <seed> <output_json> [...] --backend pty
+
+    # Any mode, with per-phase timings in <output>.profile.jsonl
+    python3 run_session.py <seed> <output_json> [...] --profile
+
+    # Salvage the .partial file left by a capture that died
+    python3 run_session.py --recover <output_json>.partial [recovered_json]
+
 Modes:
     Gameplay (default): plays through keystrokes, capturing RNG and screens.
 
@@ -54,6 +63,9 @@ import time
 import subprocess
 import shutil
 import tempfile
+import importlib.util
+import contextlib
+import io
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.normpath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
@@ -64,6 +76,71 @@ NETHACK_BINARY = os.path.join(INSTALL_DIR, 'nethack')
 DEFAULT_FIXED_DATETIME = '20000110090000'
 import re
 
+# Persistent tmux control-mode client (one per session, see tmux_control.py)
+_tc_spec = importlib.util.spec_from_file_location('tmux_control', os.path.join(SCRIPT_DIR, 'tmux_control.py'))
+_tmux_control = importlib.util.module_from_spec(_tc_spec)
+_tc_spec.loader.exec_module(_tmux_control)
+
+# Game session backend: 'tmux' (default) or 'pty' (harness-owned pty rendered
+# into an in-memory pyte screen, see pty_backend.py).  The tmux_* helpers
+# below route to whichever backend started the session.
+GAME_BACKENDS = ('tmux', 'pty')
+GAME_BACKEND = os.environ.get('WEBHACK_BACKEND', 'tmux')
+_pty_backend = None
+_pty_sessions = {}
+
+# Input-wait markers from the C binary (see input_wait.py and
+# patches/015-input-wait-marker.patch), one FIFO reader per session.
+_iw_spec = importlib.util.spec_from_file_location('input_wait', os.path.join(SCRIPT_DIR, 'input_wait.py'))
+_input_wait = importlib.util.module_from_spec(_iw_spec)
+_iw_spec.loader.exec_module(_input_wait)
+_input_waiters = {}
+
+# Automatic typGrid snapshots from the C binary (see typgrid_log.py and
+# patches/020-typgrid-autodump.patch), one log tailer per session.
+_tl_spec = importlib.util.spec_from_file_location('typgrid_log', os.path.join(SCRIPT_DIR, 'typgrid_log.py'))
+_typgrid_log = importlib.util.module_from_spec(_tl_spec)
+_tl_spec.loader.exec_module(_typgrid_log)
+_typgrid_tailers = {}
+
+# Binary RNG log decoder (see rng_log_binary.py and
+# patches/017-rnglog-binary.patch), used when WEBHACK_RNGLOG_FORMAT=binary.
+_rb_spec = importlib.util.spec_from_file_location('rng_log_binary', os.path.join(SCRIPT_DIR, 'rng_log_binary.py'))
+_rng_log_binary = importlib.util.module_from_spec(_rb_spec)
+_rb_spec.loader.exec_module(_rng_log_binary)
+rng_log_format_env = _rng_log_binary.rng_log_format_env
+
+# Optional delta encoding of step screens in session files (see
+# screen_delta.py), used when WEBHACK_SESSION_SCREEN_ENCODING=delta.
+_sd_spec = importlib.util.spec_from_file_location('screen_delta', os.path.join(SCRIPT_DIR, 'screen_delta.py'))
+_screen_delta = importlib.util.module_from_spec(_sd_spec)
+_sd_spec.loader.exec_module(_screen_delta)
+SESSION_SCREEN_ENCODINGS = _screen_delta.ENCODINGS
+session_screen_encoding = _screen_delta.screen_encoding
+expand_session_screens = _screen_delta.expand_session_screens
+
+# Optional delta encoding of level checkpoints in session files (see
+# checkpoint_delta.py), used when WEBHACK_SESSION_CHECKPOINT_ENCODING=delta.
+_ckd_spec = importlib.util.spec_from_file_location('checkpoint_delta', os.path.join(SCRIPT_DIR, 'checkpoint_delta.py'))
+_checkpoint_delta = importlib.util.module_from_spec(_ckd_spec)
+_ckd_spec.loader.exec_module(_checkpoint_delta)
+SESSION_CHECKPOINT_ENCODINGS = _checkpoint_delta.ENCODINGS
+session_checkpoint_encoding = _checkpoint_delta.checkpoint_encoding
+expand_session_checkpoints = _checkpoint_delta.expand_session_checkpoints
+
+# Per-phase timings and counters for the current capture (see
+# capture_profile.py; WEBHACK_PROFILE=1 or --profile for the sidecar).
+_cp_spec = importlib.util.spec_from_file_location('capture_profile', os.path.join(SCRIPT_DIR, 'capture_profile.py'))
+_capture_profile = importlib.util.module_from_spec(_cp_spec)
+_cp_spec.loader.exec_module(_capture_profile)
+profiler = _capture_profile.CaptureProfiler()
+
+# Private HOME and playground per capture (see capture_sandbox.py).
+_cs_spec = importlib.util.spec_from_file_location('capture_sandbox', os.path.join(SCRIPT_DIR, 'capture_sandbox.py'))
+_capture_sandbox = importlib.util.module_from_spec(_cs_spec)
+_cs_spec.loader.exec_module(_capture_sandbox)
+create_sandbox = _capture_sandbox.create_sandbox
+
 # Default character options (must match .nethackrc)
 CHARACTER = {
     'name': 'Wizard',
@@ -121,28 +198,268 @@ def has_calendar_luck_warning(content):
     )
 
 
+def set_game_backend(name):
+    """Select the backend for sessions started by start_game_session()."""
+    global GAME_BACKEND
+    if name not in GAME_BACKENDS:
+        raise ValueError(f'unknown backend {name!r} (expected one of {", ".join(GAME_BACKENDS)})')
+    GAME_BACKEND = name
+    # Inherited by recorder subprocesses (rerecord.py, gen_* drivers).
+    os.environ['WEBHACK_BACKEND'] = name
+
+
+def start_game_session(session, cmd, width=80, height=24):
+    """Start shell command cmd in a new terminal session named session."""
+    global _pty_backend
+    if GAME_BACKEND == 'pty':
+        if _pty_backend is None:
+            spec = importlib.util.spec_from_file_location('pty_backend', os.path.join(SCRIPT_DIR, 'pty_backend.py'))
+            _pty_backend = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(_pty_backend)
+        _pty_sessions[session] = _pty_backend.PtySession(cmd, width, height)
+        return
+    subprocess.run(
+        ['tmux', 'new-session', '-d', '-s', session, '-x', str(width), '-y', str(height), cmd],
+        check=True
+    )
+
+
+def _session_client(session):
+    """Return the pty session or tmux control client for session, if any."""
+    pty_session = _pty_sessions.get(session)
+    if pty_session is not None:
+        return pty_session
+    return _tmux_control.get_client(session)
+
+
+def input_wait_env(session, tmpdir):
+    """Set up input-wait markers for session; return the env prefix for its command.
+
+    Returns '' (and the session keeps using fixed sleeps) when markers are
+    disabled or the C binary predates the input-wait patch.
+    """
+    if not _input_wait.input_wait_enabled() or not _input_wait.binary_supports_input_wait(NETHACK_BINARY):
+        return ''
+    waiter = _input_wait.InputWaiter(os.path.join(tmpdir, 'inputwait.fifo'))
+    _input_waiters[session] = waiter
+    return f'{_input_wait.ENV_VAR}={waiter.path} '
+
+
+def input_wait_active(session):
+    return session in _input_waiters
+
+
+def typgrid_log_env(session, tmpdir):
+    """Set up automatic typGrid snapshots for session; return the env prefix.
+
+    Call after input_wait_env(): a snapshot is attributed to the key after
+    which the harness finds it, so this is left off ('') without input-wait
+    markers or the C patch.  It is also off unless WEBHACK_TYPGRID_LOG=1.
+    Captures then keep typing #dumpmap.
+    """
+    if (not input_wait_active(session) or not _typgrid_log.typgrid_log_enabled()
+            or not _typgrid_log.binary_supports_typgrid_log(NETHACK_BINARY)):
+        return ''
+    tailer = _typgrid_log.TypGridTailer(os.path.join(tmpdir, 'typgrid.log'))
+    _typgrid_tailers[session] = tailer
+    return f'{_typgrid_log.ENV_VAR}={tailer.path} '
+
+
+def typgrid_log_active(session):
+    return session in _typgrid_tailers
+
+
+def read_new_typ_grids(session):
+    """typGrids the game wrote since the last call, oldest first.
+
+    The game writes one when the hero arrives on a level or the terrain
+    changed since it last read a key; [] without typgrid_log_env().
+    """
+    tailer = _typgrid_tailers.get(session)
+    if tailer is None:
+        return []
+    return [record['grid'] for record in tailer.read_new_records()]
+
+
+def latest_typ_grid(session):
+    """The current level's typGrid from the automatic snapshots, or None."""
+    tailer = _typgrid_tailers.get(session)
+    if tailer is None:
+        return None
+    tailer.read_new_records()
+    return tailer.latest['grid'] if tailer.latest else None
+
+
+# Fast-forward replay (patches/019-fastforward-more.patch): while the file
+# named by NETHACK_FASTFORWARD exists, the game dismisses every --More--
+# itself, so a key prefix can be pushed without polling the screen.
+FASTFORWARD_ENV_VAR = 'NETHACK_FASTFORWARD'
+FASTFORWARD_BATCH = 64
+_fastforward_flags = {}
+_fastforward_support = {}
+
+
+def binary_supports_fast_forward(binary):
+    """True if the C binary was built with the fast-forward patch."""
+    if binary not in _fastforward_support:
+        try:
+            with open(binary, 'rb') as f:
+                _fastforward_support[binary] = FASTFORWARD_ENV_VAR.encode('ascii') in f.read()
+        except OSError:
+            _fastforward_support[binary] = False
+    return _fastforward_support[binary]
+
+
+def fast_forward_env(session, tmpdir):
+    """Allow fast_forward() for session; return the env prefix for its command.
+
+    Call after input_wait_env(): fast-forward waits on input-wait markers,
+    so it is left off ('') without them or without the C patch.
+    """
+    if not input_wait_active(session) or not binary_supports_fast_forward(NETHACK_BINARY):
+        return ''
+    flag = os.path.join(tmpdir, 'fastforward')
+    _fastforward_flags[session] = flag
+    return f'{FASTFORWARD_ENV_VAR}={flag} '
+
+
+def send_keys(session, keys):
+    """Send keys as typed, runs of printable characters in one send."""
+    run = ''
+    for ch in keys:
+        code = ord(ch)
+        if 32 <= code < 127 or code > 127:
+            run += ch
+            continue
+        if run:
+            tmux_send(session, run)
+            run = ''
+        if code in (10, 13):
+            tmux_send_special(session, 'Enter')
+        elif code == 27:
+            tmux_send_special(session, 'Escape')
+        elif code == 127:
+            tmux_send_special(session, 'BSpace')
+        else:
+            tmux_send_special(session, f'C-{chr(code + 96)}')
+    if run:
+        tmux_send(session, run)
+
+
+def raw_moves_session(regen):
+    """True if a session's keys include its own --More-- answers.
+
+    regen is the session's regen metadata: keylog conversions and sessions
+    recorded with --raw-moves (regen raw_moves/rawMoves) must be replayed
+    key by key, never with fast_forward().
+    """
+    regen = regen or {}
+    return (regen.get('mode') == 'keylog'
+            or bool(regen.get('raw_moves') or regen.get('rawMoves')))
+
+
+@profiler.timed('fast_forward')
+def fast_forward(session, keys, batch=FASTFORWARD_BATCH):
+    """Replay keys without per-key screen polling; False if not available.
+
+    Keys go out batch at a time and the harness waits only for the game's
+    input-wait marker after each batch, while the game dismisses --More--
+    and answers the wizard-mode "Die?" with 'n' on its own.  The result
+    matches sending each key and then calling clear_more_prompts(), so
+    this is for sessions captured that way (not raw keylogs, whose keys
+    include the Spaces and answers).
+    """
+    flag = _fastforward_flags.get(session)
+    if flag is None:
+        return False
+    open(flag, 'w').close()
+    try:
+        for start in range(0, len(keys), batch):
+            send_keys(session, keys[start:start + batch])
+            wait_for_input(session)
+    finally:
+        os.unlink(flag)
+    clear_more_prompts(session)
+    return True
+
+
+@profiler.timed('wait')
+def wait_for_input(session, fallback=0.02):
+    """Block until the game has processed every key sent and wants another.
+
+    Without input-wait markers for this session, sleep fallback seconds.
+    Returns True if the game was seen waiting for input.
+    """
+    waiter = _input_waiters.get(session)
+    if waiter is None:
+        time.sleep(fallback)
+        return False
+    if not waiter.wait_idle(_input_wait.input_wait_timeout()):
+        return False
+    client = _session_client(session)
+    if client:
+        client.sync()
+    return True
+
+
 def tmux_send(session, keys, delay=0):
-    subprocess.run(['tmux', 'send-keys', '-t', session, '-l', keys], check=True)
+    with profiler.phase('send'):
+        client = _session_client(session)
+        if client:
+            client.send_literal(keys)
+        else:
+            subprocess.run(['tmux', 'send-keys', '-t', session, '-l', keys], check=True)
+    waiter = _input_waiters.get(session)
+    if waiter is not None:
+        waiter.note_sent(len(keys.encode('utf-8')))
     if delay > 0:
-        time.sleep(delay)
+        wait_for_input(session, delay)
 
 def tmux_send_special(session, key, delay=0):
-    subprocess.run(['tmux', 'send-keys', '-t', session, key], check=True)
+    with profiler.phase('send'):
+        client = _session_client(session)
+        if client:
+            client.send_special(key)
+        else:
+            subprocess.run(['tmux', 'send-keys', '-t', session, key], check=True)
+    waiter = _input_waiters.get(session)
+    if waiter is not None:
+        waiter.note_sent(1)
     if delay > 0:
-        time.sleep(delay)
+        wait_for_input(session, delay)
 
+@profiler.timed('capture')
 def tmux_capture(session):
+    client = _session_client(session)
+    if client:
+        return client.capture()
     result = subprocess.run(
         ['tmux', 'capture-pane', '-t', session, '-p', '-S', '0', '-E', '30'],
         capture_output=True, text=True, check=True
     )
     return result.stdout
 
+def tmux_kill_session(session):
+    _fastforward_flags.pop(session, None)
+    _typgrid_tailers.pop(session, None)
+    waiter = _input_waiters.pop(session, None)
+    if waiter is not None:
+        waiter.close()
+    pty_session = _pty_sessions.pop(session, None)
+    if pty_session is not None:
+        pty_session.close()
+        return
+    _tmux_control.kill_session(session)
+
 
-def setup_home(character=None):
+def setup_home(tmpdir, character=None):
+    """Create a capture sandbox in tmpdir with .nethackrc for character.
+
+    Returns (home, nethackdir), the HOME and NETHACKDIR to launch with.
+    """
     char = character or CHARACTER
-    os.makedirs(RESULTS_DIR, exist_ok=True)
-    nethackrc = os.path.join(RESULTS_DIR, '.nethackrc')
+    home, nethackdir = create_sandbox(tmpdir, INSTALL_DIR)
+    nethackrc = os.path.join(home, '.nethackrc')
     with open(nethackrc, 'w') as f:
         f.write(f'OPTIONS=name:{char["name"]}\n')
         f.write(f'OPTIONS=race:{char["race"]}\n')
@@ -152,44 +469,107 @@ def setup_home(character=None):
         f.write('OPTIONS=!autopickup\n')
         f.write('OPTIONS=suppress_alert:3.4.3\n')
         f.write('OPTIONS=symset:DECgraphics\n')
-
-    # Clean up stale game state to avoid prompts from previous crashed runs.
-    # Remove: save files, level/lock files (e.g. 501wizard.0), and bones files.
-    import glob
-    save_dir = os.path.join(INSTALL_DIR, 'save')
-    if os.path.isdir(save_dir):
-        for f in glob.glob(os.path.join(save_dir, '*')):
-            try:
-                os.unlink(f)
-            except FileNotFoundError:
-                pass
-    for f in glob.glob(os.path.join(INSTALL_DIR, '*wizard*')):
-        if not f.endswith('.lua'):
-            try:
-                os.unlink(f)
-            except FileNotFoundError:
-                pass
-    for f in glob.glob(os.path.join(INSTALL_DIR, '*Wizard*')):
-        if not f.endswith('.lua'):
-            try:
-                os.unlink(f)
-            except FileNotFoundError:
-                pass
-    for f in glob.glob(os.path.join(INSTALL_DIR, 'bon*')):
-        try:
-            os.unlink(f)
-        except FileNotFoundError:
-            pass
+    return home, nethackdir
 
 
+@profiler.timed('rng')
 def read_rng_log(rng_log_file):
-    """Read the RNG log file and return (count, lines)."""
+    """Read the RNG log file and return (count, lines).
+
+    The C side block-buffers the log and flushes it when the game waits for
+    input (016-rnglog-block-buffer.patch), so read it while the game is idle.
+    A line cut off by a mid-generation buffer flush is left out.
+    A binary log (017-rnglog-binary.patch) is decoded to the same lines.
+    """
+    if _rng_log_binary.is_binary_rng_log(rng_log_file):
+        lines = _rng_log_binary.BinaryRngLog(rng_log_file).lines()
+        return len(lines), lines
     try:
         with open(rng_log_file) as f:
             lines = f.readlines()
-        return len(lines), lines
     except FileNotFoundError:
         return 0, []
+    if lines and not lines[-1].endswith('\n'):
+        lines.pop()
+    return len(lines), lines
+
+
+class RngLogTailer:
+    """Incremental reader for an RNG log the game is still appending to.
+
+    read_rng_log() rereads the whole file, so calling it after every step of
+    a long capture is quadratic.  The tailer remembers the byte offset of
+    the last complete line and only reads what was appended since.  A
+    partial trailing line (the game mid-write) is left for the next call.
+
+    A binary log is tailed by record instead; read_new() decodes it to text
+    lines and read_new_entries() straight to compact entries.
+    """
+
+    def __init__(self, rng_log_file):
+        self.path = rng_log_file
+        self.offset = 0
+        self.count = 0  # complete lines (or binary records) returned so far
+        self.calls = 0  # RNG calls among them, binary logs only
+        self.binary = None
+
+    def _binary_log(self):
+        if self.binary is None and _rng_log_binary.is_binary_rng_log(self.path):
+            self.binary = _rng_log_binary.BinaryRngLog(self.path)
+        return self.binary
+
+    def _advance_binary(self, log):
+        """Claim the records appended since the last call, as (start, end)."""
+        start, end = self.count, log.record_count()
+        if end < start:
+            # Log was truncated (game restarted with the same path).
+            self.binary = None
+            self.count = self.calls = 0
+            log = self._binary_log()
+            start, end = 0, log.record_count() if log else 0
+        self.count = end
+        return log, start, end
+
+    @profiler.timed('rng')
+    def read_new(self):
+        """Return the complete lines appended since the last call."""
+        log = self._binary_log()
+        if log is not None:
+            log, start, end = self._advance_binary(log)
+            if not log:
+                return []
+            lines = log.lines(start, end, call_base=self.calls)
+            self.calls += log.call_count(start, end)
+            return lines
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < self.offset:
+                    # Log was truncated (game restarted with the same path).
+                    self.offset = 0
+                    self.count = 0
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return []
+        self.offset += end
+        lines = data[:end].decode('utf-8', errors='replace').splitlines(keepends=True)
+        self.count += len(lines)
+        return lines
+
+    @profiler.timed('rng')
+    def read_new_entries(self):
+        """Like parse_rng_lines(self.read_new()), without text for binary logs."""
+        log = self._binary_log()
+        if log is None:
+            return parse_rng_lines(self.read_new())
+        log, start, end = self._advance_binary(log)
+        if not log:
+            return []
+        self.calls += log.call_count(start, end)
+        return log.entries(start, end)
 
 
 def parse_rng_lines(lines):
@@ -338,13 +718,24 @@ def encode_typgrid_row_rle(row, row_width=80):
 def encode_typgrid_rle(grid):
     """Encode entire typGrid (list of rows) using RLE.
 
-    Returns a single string with rows separated by '|'.
+    Returns a single string with rows separated by '|'.  typgrid.encode_rle()
+    writes the same text from a NumPy array, for batch use.
     """
     return "|".join(encode_typgrid_row_rle(row) for row in grid)
 
 
 # === Screen Capture Functions ===
 
+# Mirrors stripAnsiSequences() in test/comparison/session_loader.js.
+_ANSI_CURSOR_FORWARD_RE = re.compile(r'\x1b\[(\d*)C')
+_ANSI_STRIP_RES = (
+    re.compile(r'\x1b\[[0-?]*[ -/]*[@-~]'),
+    re.compile(r'\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)'),
+    re.compile(r'\x1b[@-Z\\-_]'),
+    re.compile(r'\x9b[0-?]*[ -/]*[@-~]'),
+    re.compile(r'[\x0e\x0f]'),
+)
+
 def capture_screen_lines(session):
     """Capture tmux screen and return as list of 24 lines."""
     content = tmux_capture(session)
@@ -355,18 +746,47 @@ def capture_screen_lines(session):
     return lines[:24]
 
 
+@profiler.timed('capture')
 def capture_screen_ansi_lines(session):
     """Capture tmux screen with ANSI escapes preserved; return as 24 lines."""
-    result = subprocess.run(
-        ['tmux', 'capture-pane', '-t', session, '-p', '-e', '-J', '-S', '0', '-E', '30'],
-        capture_output=True, text=True, check=True
-    )
-    lines = result.stdout.split('\n')
+    client = _session_client(session)
+    if client:
+        content = client.capture(ansi=True)
+    else:
+        content = subprocess.run(
+            ['tmux', 'capture-pane', '-t', session, '-p', '-e', '-J', '-S', '0', '-E', '30'],
+            capture_output=True, text=True, check=True
+        ).stdout
+    lines = content.split('\n')
     while len(lines) < 24:
         lines.append('')
     return lines[:24]
 
 
+def strip_ansi_sequences(line):
+    """Plain text of an ANSI capture line, as session_loader.js stripAnsiSequences.
+
+    Cursor-forward codes become spaces and other escape sequences are
+    dropped.  SO/SI (DEC line-drawing shifts) are dropped too, so the result
+    matches what a plain `capture-pane -p` shows for the same row.
+    """
+    line = _ANSI_CURSOR_FORWARD_RE.sub(lambda m: ' ' * max(1, int(m.group(1) or '1')), line)
+    for pattern in _ANSI_STRIP_RES:
+        line = pattern.sub('', line)
+    return line
+
+
+def ansi_to_plain_lines(ansi_lines):
+    """Derive plain screen lines (trailing blanks trimmed) from ANSI lines."""
+    return [strip_ansi_sequences(line).rstrip(' ') for line in ansi_lines]
+
+
+def capture_screen_views(session):
+    """Capture once and return (plain_lines, ansi_lines) from the same instant."""
+    ansi_lines = capture_screen_ansi_lines(session)
+    return ansi_to_plain_lines(ansi_lines), ansi_lines
+
+
 def capture_screen_compressed(session):
     """Capture tmux screen and return as single ANSI-RLE compressed string."""
     lines = capture_screen_ansi_lines(session)
@@ -374,12 +794,10 @@ def capture_screen_compressed(session):
 
 
 def capture_screen_payload(session, include_ansi=False):
-    payload = {
-        'screen': capture_screen_lines(session)
-    }
-    if include_ansi:
-        payload['screenAnsi'] = capture_screen_ansi_lines(session)
-    return payload
+    if not include_ansi:
+        return {'screen': capture_screen_lines(session)}
+    screen, screen_ansi = capture_screen_views(session)
+    return {'screen': screen, 'screenAnsi': screen_ansi}
 
 
 def read_typ_grid(dumpmap_file):
@@ -394,27 +812,99 @@ def read_typ_grid(dumpmap_file):
     return grid if len(grid) == 21 else None
 
 
-def read_checkpoint_entries(checkpoint_file, start_index=0):
-    """Read JSONL checkpoint entries from checkpoint_file starting at start_index."""
-    if not checkpoint_file or not os.path.exists(checkpoint_file):
-        return [], start_index
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WS_RE = re.compile(r'[ \t\n\r]*')
 
-    entries = []
-    next_index = int(start_index)
-    with open(checkpoint_file, 'r', encoding='utf-8', errors='ignore') as f:
-        for idx, line in enumerate(f):
-            if idx < int(start_index):
-                continue
-            next_index = idx + 1
-            line = line.strip()
-            if not line:
-                continue
+
+def parse_checkpoint(line, keys=None):
+    """Parse one NETHACK_DUMPSNAP line; with keys, only those top-level keys.
+
+    With keys, members are decoded in file order and parsing stops once
+    every key is found.  The C side writes phase, rngCallCount, dnum and
+    dlevel first, so reading those skips the grids, monsters and objects
+    that make up most of a checkpoint.  Raises ValueError on a malformed
+    line.
+    """
+    if keys is None:
+        return json.loads(line)
+    wanted = set(keys)
+    found = {}
+    try:
+        pos = _JSON_WS_RE.match(line).end()
+        if line[pos] != '{':
+            raise ValueError('checkpoint is not a JSON object')
+        pos += 1
+        while wanted:
+            pos = _JSON_WS_RE.match(line, pos).end()
+            if line[pos] == '}':
+                break
+            if line[pos] != '"':
+                raise ValueError(f'expected a key at column {pos}')
+            key, pos = json.decoder.scanstring(line, pos + 1)
+            pos = _JSON_WS_RE.match(line, pos).end()
+            if line[pos] != ':':
+                raise ValueError(f'expected ":" at column {pos}')
+            pos = _JSON_WS_RE.match(line, pos + 1).end()
+            value, pos = _JSON_DECODER.raw_decode(line, pos)
+            if key in wanted:
+                found[key] = value
+                wanted.discard(key)
+            pos = _JSON_WS_RE.match(line, pos).end()
+            if line[pos] == ',':
+                pos += 1
+    except IndexError:
+        raise ValueError('truncated checkpoint') from None
+    return found
+
+
+class CheckpointTailer:
+    """Incremental reader for a NETHACK_DUMPSNAP checkpoint stream.
+
+    Like RngLogTailer, it remembers the byte offset of the last complete
+    line and only reads what was appended since, so checkpoints already
+    read are not parsed again.
+    """
+
+    def __init__(self, checkpoint_file):
+        self.path = checkpoint_file
+        self.offset = 0
+        self.count = 0  # checkpoint lines returned so far
+
+    def read_new_lines(self):
+        """Return the complete, non-empty lines appended since the last call."""
+        if not self.path:
+            return []
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < self.offset:
+                    # File was truncated (game restarted with the same path).
+                    self.offset = 0
+                    self.count = 0
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return []
+        self.offset += end
+        text = data[:end].decode('utf-8', errors='ignore')
+        lines = [line for line in text.splitlines() if line.strip()]
+        self.count += len(lines)
+        return lines
+
+    def read_new(self, keys=None):
+        """Parse the checkpoints appended since the last call (see parse_checkpoint).
+
+        Malformed lines are skipped.
+        """
+        entries = []
+        for line in self.read_new_lines():
             try:
-                entries.append(json.loads(line))
-            except json.JSONDecodeError:
+                entries.append(parse_checkpoint(line, keys))
+            except ValueError:
                 continue
-
-    return entries, next_index
+        return entries
 
 
 def execute_wizload(session, level_name, steps, rng_log_file, verbose=False):
@@ -503,19 +993,43 @@ def execute_wizload(session, level_name, steps, rng_log_file, verbose=False):
     return False, None
 
 
-def get_rng_call_count(rng_log_file):
-    """Return the last RNG call number from an RNG log file, or None."""
+@profiler.timed('rng')
+def get_rng_call_count(rng_log_file, chunk_size=65536):
+    """Return the last RNG call number from an RNG log file, or None.
+
+    Like read_rng_log(), this relies on the C side flushing the log when
+    the game waits for input.  Only complete lines are considered, and the
+    file is scanned backwards from the end so the cost does not grow with
+    the length of the log.
+    """
     if not rng_log_file or not os.path.exists(rng_log_file):
         return None
-    last = None
-    with open(rng_log_file, 'r', encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            m = re.match(r'^\s*(\d+)\s+', line)
-            if m:
-                last = int(m.group(1))
-    return last
-
-
+    if _rng_log_binary.is_binary_rng_log(rng_log_file):
+        return _rng_log_binary.BinaryRngLog(rng_log_file).call_count() or None
+    with open(rng_log_file, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        pending = b''
+        skip_partial = True
+        while pos > 0:
+            size = min(chunk_size, pos)
+            pos -= size
+            f.seek(pos)
+            pending = f.read(size) + pending
+            lines = pending.split(b'\n')
+            # The first piece may start mid-line until we reach offset 0.
+            pending = lines.pop(0) if pos > 0 else b''
+            if skip_partial and lines:
+                # Bytes after the last newline: a line still being written.
+                lines.pop()
+                skip_partial = False
+            for line in reversed(lines):
+                m = re.match(rb'^\s*(\d+)\s+', line)
+                if m:
+                    return int(m.group(1))
+    return None
+
+
+@profiler.timed('dumpmap')
 def execute_dumpmap(session, dumpmap_file):
     """Execute #dumpmap and read the resulting grid."""
     # Remove old dumpmap file
@@ -523,7 +1037,7 @@ def execute_dumpmap(session, dumpmap_file):
         os.unlink(dumpmap_file)
 
     tmux_send(session, '#', 0.1)
-    time.sleep(0.02)
+    wait_for_input(session)
     tmux_send(session, 'dumpmap', 0.1)
     tmux_send_special(session, 'Enter', 0.3)
 
@@ -537,28 +1051,25 @@ def execute_dumpmap(session, dumpmap_file):
             tmux_send_special(session, 'Space', 0.1)
         else:
             break
-        time.sleep(0.02)
+        wait_for_input(session)
 
-    time.sleep(0.02)
+    wait_for_input(session)
     return read_typ_grid(dumpmap_file)
 
 
-# Counter for tracking clear_more_prompts activity
-_clear_more_stats = {'cleared': 0, 'calls': 0}
-
+@profiler.timed('clear_more')
 def clear_more_prompts(session, max_iterations=20):
-    global _clear_more_stats
-    _clear_more_stats['calls'] += 1
+    profiler.count('clear_more_calls')
     content = ''
     had_more = False
     for _ in range(max_iterations):
-        time.sleep(0.02)
+        wait_for_input(session)
         try:
             content = tmux_capture(session)
         except subprocess.CalledProcessError:
             break
         if '--More--' in content:
-            _clear_more_stats['cleared'] += 1
+            profiler.count('more_cleared')
             had_more = True
             tmux_send_special(session, 'Space', 0.1)
         elif 'Die?' in content:
@@ -567,7 +1078,9 @@ def clear_more_prompts(session, max_iterations=20):
             tmux_send(session, 'n', 0.1)
             print('  [WIZARD] Died and resurrected')
         else:
-            if not had_more:
+            # With input-wait markers the capture above was taken with the
+            # game blocked on input, so there is nothing left to wait for.
+            if not had_more or input_wait_active(session):
                 break
             # We just dismissed a --More--.  The game may still be processing
             # the turn (e.g. m_throw flight after a "throws" --More--) and
@@ -580,7 +1093,7 @@ def clear_more_prompts(session, max_iterations=20):
                 except subprocess.CalledProcessError:
                     break
                 if '--More--' in content:
-                    _clear_more_stats['cleared'] += 1
+                    profiler.count('more_cleared')
                     tmux_send_special(session, 'Space', 0.1)
                     found = True
                     break
@@ -593,13 +1106,6 @@ def clear_more_prompts(session, max_iterations=20):
                 break
     return content
 
-def get_clear_more_stats():
-    return _clear_more_stats.copy()
-
-def reset_clear_more_stats():
-    global _clear_more_stats
-    _clear_more_stats = {'cleared': 0, 'calls': 0}
-
 
 def wait_for_game_ready(session, rng_log_file):
     """Navigate startup prompts until the game is ready."""
@@ -671,7 +1177,7 @@ def wait_for_game_ready(session, rng_log_file):
         if attempt > 2:
             tmux_send_special(session, 'Space', 0.1)
         else:
-            time.sleep(0.02)
+            wait_for_input(session)
 
 
 def describe_key(key):
@@ -821,7 +1327,113 @@ def quit_game(session):
     time.sleep(0.02)
 
 
-def compact_session_json(session_data):
+# Interned RNG encoding for session files (optional, see
+# compact_session_json).  Each "fn(args)=result @ site" entry becomes
+# [call, result] or [call, result, site], where call and site index the
+# per-file tables rngTable.calls and rngTable.sites.  Other entries (midlog
+# >/<, events ^) stay strings.  expand_session_rng() restores the strings.
+RNG_TABLE_VERSION = 1
+SESSION_RNG_ENCODINGS = ('strings', 'interned')
+_RNG_CALL_ENTRY_RE = re.compile(r'^(.*\))=(-?(?:0|[1-9]\d*))(?: @ (.*))?$')
+
+
+def session_rng_encoding():
+    return os.environ.get('WEBHACK_SESSION_RNG_ENCODING', 'strings')
+
+
+def _session_rng_holders(session_data):
+    """Yield (container, key) for every RNG-bearing dict in a session."""
+    for key in ('startup', 'steps', 'levels'):
+        value = session_data.get(key)
+        if isinstance(value, dict):
+            yield session_data, key
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                if isinstance(item, dict):
+                    yield value, i
+
+
+def _map_session_rng(session_data, fn):
+    """Copy session_data with fn applied to every rng array."""
+    out = dict(session_data)
+    for key in ('startup', 'steps', 'levels'):
+        if isinstance(out.get(key), list):
+            out[key] = list(out[key])
+    for container, key in _session_rng_holders(out):
+        holder = container[key]
+        if isinstance(holder.get('rng'), list):
+            container[key] = dict(holder, rng=fn(holder['rng']))
+    return out
+
+
+def _expand_rng_entry(entry, calls, sites):
+    if not isinstance(entry, list):
+        return entry
+    text = f'{calls[entry[0]]}={entry[1]}'
+    if len(entry) > 2:
+        text += f' @ {sites[entry[2]]}'
+    return text
+
+
+def intern_session_rng(session_data):
+    """Return a copy of session_data with its RNG entries interned."""
+    if 'rngTable' in session_data:
+        return session_data
+    calls, sites = {}, {}
+    call_list, site_list = [], []
+
+    def index(table, values, text):
+        i = table.get(text)
+        if i is None:
+            i = table[text] = len(values)
+            values.append(text)
+        return i
+
+    def encode(rng):
+        out = []
+        for entry in rng:
+            m = _RNG_CALL_ENTRY_RE.match(entry) if isinstance(entry, str) else None
+            if not m:
+                out.append(entry)
+                continue
+            call, result, site = m.groups()
+            rec = [index(calls, call_list, call), int(result)]
+            if site is not None:
+                rec.append(index(sites, site_list, site))
+            if _expand_rng_entry(rec, call_list, site_list) != entry:
+                rec = entry  # keep anything that would not round-trip
+            out.append(rec)
+        return out
+
+    encoded = _map_session_rng(session_data, encode)
+    table = {'version': RNG_TABLE_VERSION, 'calls': call_list, 'sites': site_list}
+    # Put the table ahead of the steps so line-oriented readers meet it first.
+    out = {}
+    for key, value in encoded.items():
+        if key in ('startup', 'steps', 'levels') and 'rngTable' not in out:
+            out['rngTable'] = table
+        out[key] = value
+    out.setdefault('rngTable', table)
+    return out
+
+
+def expand_session_rng(session_data):
+    """Inverse of intern_session_rng(): RNG entries back to strings."""
+    table = session_data.get('rngTable')
+    if table is None:
+        return session_data
+    if table.get('version') != RNG_TABLE_VERSION:
+        raise ValueError(f"unsupported rngTable version {table.get('version')}")
+    calls, sites = table['calls'], table['sites']
+    out = _map_session_rng(
+        session_data,
+        lambda rng: [_expand_rng_entry(e, calls, sites) for e in rng])
+    del out['rngTable']
+    return out
+
+
+def compact_session_json(session_data, rng_encoding=None, screen_encoding=None,
+                         checkpoint_encoding=None):
     """Serialize session to JSON with newlines but no indentation.
 
     Format:
@@ -830,7 +1442,39 @@ def compact_session_json(session_data):
     - Arrays (like rng) stay compact
 
     Uses ensure_ascii=True for portability (escapes all non-ASCII as \\uXXXX).
+
+    rng_encoding 'interned' (default: $WEBHACK_SESSION_RNG_ENCODING, else
+    'strings') stores RNG entries via intern_session_rng().
+    screen_encoding 'delta' (default: $WEBHACK_SESSION_SCREEN_ENCODING, else
+    'full') stores step screens as keyframes and deltas (screen_delta.py).
+    checkpoint_encoding 'delta' (default: $WEBHACK_SESSION_CHECKPOINT_ENCODING,
+    else 'full') stores each checkpoint after the first of its list as a
+    delta against the one before (checkpoint_delta.py).
     """
+    if rng_encoding is None:
+        rng_encoding = session_rng_encoding()
+    if rng_encoding not in SESSION_RNG_ENCODINGS:
+        raise ValueError(f'unknown session rng encoding: {rng_encoding}')
+    if screen_encoding is None:
+        screen_encoding = session_screen_encoding()
+    if screen_encoding not in SESSION_SCREEN_ENCODINGS:
+        raise ValueError(f'unknown session screen encoding: {screen_encoding}')
+    if checkpoint_encoding is None:
+        checkpoint_encoding = session_checkpoint_encoding()
+    if checkpoint_encoding not in SESSION_CHECKPOINT_ENCODINGS:
+        raise ValueError(f'unknown session checkpoint encoding: {checkpoint_encoding}')
+    if rng_encoding == 'interned':
+        session_data = intern_session_rng(session_data)
+    else:
+        session_data = expand_session_rng(session_data)
+    if screen_encoding == 'delta':
+        session_data = _screen_delta.encode_session_screens(session_data)
+    else:
+        session_data = expand_session_screens(session_data)
+    if checkpoint_encoding == 'delta':
+        session_data = _checkpoint_delta.encode_session_checkpoints(session_data)
+    else:
+        session_data = expand_session_checkpoints(session_data)
     lines = ['{']
 
     keys = list(session_data.keys())
@@ -844,16 +1488,169 @@ def compact_session_json(session_data):
             steps = value
             for j, step in enumerate(steps):
                 step_comma = ',' if j < len(steps) - 1 else ''
-                lines.append(json.dumps(step, ensure_ascii=True) + step_comma)
+                lines.append(_session_step_line(step) + step_comma)
             lines.append(']' + comma)
         else:
             # Other keys: compact on one line
-            lines.append(f'"{key}":{json.dumps(value, ensure_ascii=True)}{comma}')
+            lines.append(_session_key_line(key, value) + comma)
 
     lines.append('}')
     return '\n'.join(lines) + '\n'
 
 
+def _session_key_line(key, value):
+    return f'"{key}":{json.dumps(value, ensure_ascii=True)}'
+
+
+def _session_step_line(step):
+    return json.dumps(step, ensure_ascii=True)
+
+
+class SessionWriter:
+    """Stream a session file to disk one step at a time.
+
+    The result is byte-for-byte what compact_session_json() would write for
+    the same data, but steps are not kept in memory: the keys before
+    'steps' are written when the writer is created, each step as soon as
+    it is appended, and the keys after 'steps' by finalize().
+
+    Output goes to <path>.partial, flushed after every step and fsynced
+    every fsync_every steps; finalize() moves it into place.  A capture
+    that dies midway leaves the .partial behind for recover_session_file().
+    """
+
+    def __init__(self, path, session_data, fsync_every=50, rng_encoding=None, screen_encoding=None,
+                 checkpoint_encoding=None):
+        keys = list(session_data)
+        split = keys.index('steps')
+        self.path = path
+        self.partial_path = path + '.partial'
+        self.header = {key: session_data[key] for key in keys[:split]}
+        self.trailer = {key: session_data[key] for key in keys[split + 1:]}
+        self.fsync_every = fsync_every
+        self.rng_encoding = rng_encoding or session_rng_encoding()
+        if self.rng_encoding not in SESSION_RNG_ENCODINGS:
+            raise ValueError(f'unknown session rng encoding: {self.rng_encoding}')
+        self.screen_encoding = screen_encoding or session_screen_encoding()
+        if self.screen_encoding not in SESSION_SCREEN_ENCODINGS:
+            raise ValueError(f'unknown session screen encoding: {self.screen_encoding}')
+        self.checkpoint_encoding = checkpoint_encoding or session_checkpoint_encoding()
+        if self.checkpoint_encoding not in SESSION_CHECKPOINT_ENCODINGS:
+            raise ValueError(f'unknown session checkpoint encoding: {self.checkpoint_encoding}')
+        self.step_count = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.f = open(self.partial_path, 'w')
+        self.f.write(self._header_text())
+        self.steps_offset = self.f.tell()
+        for step in session_data['steps']:
+            self.append_step(step)
+
+    def _header_text(self):
+        lines = ['{']
+        lines += [_session_key_line(k, v) + ',' for k, v in self.header.items()]
+        lines.append('"steps":[')
+        return '\n'.join(lines)
+
+    def _sync(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    @profiler.timed('write')
+    def append_step(self, step):
+        sep = ',\n' if self.step_count else '\n'
+        self.f.write(sep + _session_step_line(step))
+        self.f.flush()
+        self.step_count += 1
+        if self.step_count % self.fsync_every == 0:
+            os.fsync(self.f.fileno())
+
+    def finalize(self, **updates):
+        """Close the steps array, write the remaining keys and move into place.
+
+        Keyword arguments set top-level keys that were not known when the
+        writer was created.  Changing a key before 'steps' rewrites the
+        header, copying the steps across without loading them.
+        """
+        rewrite = any(key in self.header for key in updates)
+        for key, value in updates.items():
+            (self.header if key in self.header else self.trailer)[key] = value
+        lines = [']' + (',' if self.trailer else '')]
+        items = list(self.trailer.items())
+        for i, (key, value) in enumerate(items):
+            lines.append(_session_key_line(key, value) + (',' if i < len(items) - 1 else ''))
+        lines.append('}')
+        self.f.write('\n' + '\n'.join(lines) + '\n')
+        self._sync()
+        self.f.close()
+        self.f = None
+
+        if (self.rng_encoding != 'strings' or self.screen_encoding != 'full'
+                or self.checkpoint_encoding != 'full'):
+            with open(self.partial_path) as f:
+                data = json.load(f)
+            with open(self.partial_path, 'w') as f:
+                f.write(compact_session_json(data, self.rng_encoding, self.screen_encoding,
+                                             self.checkpoint_encoding))
+                f.flush()
+                os.fsync(f.fileno())
+        elif rewrite:
+            tmp_path = self.path + '.tmp'
+            with open(self.partial_path) as src, open(tmp_path, 'w') as dst:
+                dst.write(self._header_text())
+                src.seek(self.steps_offset)
+                shutil.copyfileobj(src, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_path, self.partial_path)
+        os.replace(self.partial_path, self.path)
+
+    def close(self):
+        """Flush and close without finalizing, keeping the .partial file."""
+        if self.f is not None:
+            self._sync()
+            self.f.close()
+            self.f = None
+            print(f'Partial session kept at {self.partial_path} '
+                  f'({self.step_count} steps)')
+
+
+def recover_session_file(path):
+    """Read a session file, salvaging what a crashed SessionWriter left.
+
+    Returns (session_data, complete).  A truncated file keeps every key
+    before 'steps' and every whole step line; a cut-off last line is
+    dropped, as are any keys after 'steps' that were never written.
+    """
+    with open(path) as f:
+        text = f.read()
+    try:
+        return json.loads(text), True
+    except json.JSONDecodeError:
+        pass
+    data = {}
+    steps = None
+    in_steps = False
+    for line in text.split('\n')[1:]:
+        if in_steps:
+            if line.startswith(']'):
+                in_steps = False
+                continue
+            try:
+                steps.append(json.loads(line.rstrip(',')))
+            except json.JSONDecodeError:
+                break
+        elif line == '"steps":[':
+            data['steps'] = steps = []
+            in_steps = True
+        else:
+            try:
+                data.update(json.loads('{' + line.rstrip(',') + '}'))
+            except json.JSONDecodeError:
+                break
+    data.setdefault('steps', [])
+    return data, False
+
+
 def load_seeds_config():
     """Load test/comparison/seeds.json configuration."""
     config_path = os.path.join(PROJECT_ROOT, 'test', 'comparison', 'seeds.json')
@@ -870,10 +1667,9 @@ def run_wizload_session(seed, output_json, level_name, verbose=False):
         print(f"Run setup.sh first: bash {os.path.join(SCRIPT_DIR, 'setup.sh')}")
         sys.exit(1)
 
-    setup_home()
-
     # Temp files for RNG log, dumpmap, and checkpoints
     tmpdir = tempfile.mkdtemp(prefix='webhack-wizload-')
+    home, nethackdir = setup_home(tmpdir)
     rng_log_file = os.path.join(tmpdir, 'rnglog.txt')
     dumpmap_file = os.path.join(tmpdir, 'dumpmap.txt')
     checkpoint_file = os.path.join(tmpdir, 'checkpoints.jsonl')
@@ -882,41 +1678,37 @@ def run_wizload_session(seed, output_json, level_name, verbose=False):
 
     try:
         cmd = (
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'{fixed_datetime_env()}'
             f'NETHACK_SEED={seed} '
             f'NETHACK_RNGLOG={rng_log_file} '
+            f'{rng_log_format_env()}'
             f'NETHACK_DUMPMAP={dumpmap_file} '
             f'NETHACK_DUMPSNAP={checkpoint_file} '
-            f'HOME={RESULTS_DIR} '
+            f'{input_wait_env(session_name, tmpdir)}'
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u {CHARACTER["name"]} -D; '
             f'sleep 999'
         )
-        subprocess.run(
-            ['tmux', 'new-session', '-d', '-s', session_name, '-x', '80', '-y', '24', cmd],
-            check=True
-        )
+        start_game_session(session_name, cmd)
 
-        time.sleep(1.0)
+        wait_for_input(session_name, 1.0)
 
         print(f'=== Capturing wizload session: seed={seed}, level={level_name} ===')
         print(f'=== STARTUP ===')
         wait_for_game_ready(session_name, rng_log_file)
-        time.sleep(0.02)
+        wait_for_input(session_name)
         clear_more_prompts(session_name)
-        time.sleep(0.02)
+        wait_for_input(session_name)
 
         # Capture startup state
-        startup_rng_count, startup_rng_lines = read_rng_log(rng_log_file)
-        print(f'Startup: {startup_rng_count} RNG calls')
+        rng_tail = RngLogTailer(rng_log_file)
+        startup_rng_entries = rng_tail.read_new_entries()
+        print(f'Startup: {rng_tail.count} RNG calls')
 
         startup_screen_compressed = capture_screen_compressed(session_name)
 
-        # Build session object (unified format v3)
-        startup_rng_entries = parse_rng_lines(startup_rng_lines)
-        startup_actual_rng = sum(1 for e in startup_rng_entries if e[0] not in ('>', '<'))
-
         # Build startup step (first step with no key)
         startup_step = {
             'key': None,
@@ -924,7 +1716,9 @@ def run_wizload_session(seed, output_json, level_name, verbose=False):
             'rng': startup_rng_entries,
             'screen': startup_screen_compressed,
         }
+        checkpoint_tail = CheckpointTailer(checkpoint_file)
 
+        # Build session object (unified format v3)
         session_data = {
             'version': 3,
             'seed': seed,
@@ -951,7 +1745,6 @@ def run_wizload_session(seed, output_json, level_name, verbose=False):
 
         # Execute wizload, collecting steps
         steps = session_data['steps']
-        checkpoint_cursor = 0
         ok, rng_call_start = execute_wizload(
             session_name, level_name, steps, rng_log_file, verbose
         )
@@ -973,7 +1766,7 @@ def run_wizload_session(seed, output_json, level_name, verbose=False):
             print('WARNING: Failed to capture typGrid')
 
         # Read checkpoints
-        checkpoints, checkpoint_cursor = read_checkpoint_entries(checkpoint_file, 0)
+        checkpoints = checkpoint_tail.read_new()
         if checkpoints:
             # Convert checkpoint grids to RLE format
             for cp in checkpoints:
@@ -982,10 +1775,8 @@ def run_wizload_session(seed, output_json, level_name, verbose=False):
                         cp[grid_key] = encode_typgrid_rle(cp[grid_key])
             print(f'Checkpoints: {len(checkpoints)} captured')
 
-        # Read RNG log from wizload start
-        final_rng_count, final_rng_lines = read_rng_log(rng_log_file)
-        delta_lines = final_rng_lines[startup_rng_count:final_rng_count]
-        rng_entries = parse_rng_lines(delta_lines)
+        # RNG log from wizload start
+        rng_entries = rng_tail.read_new_entries()
 
         # Add final step with level data
         final_screen = capture_screen_compressed(session_name)
@@ -1001,9 +1792,6 @@ def run_wizload_session(seed, output_json, level_name, verbose=False):
             final_step['checkpoints'] = checkpoints
         steps.append(final_step)
 
-        # Quit the game cleanly
-        quit_game(session_name)
-
         # Write JSON
         os.makedirs(os.path.dirname(output_json), exist_ok=True)
         with open(output_json, 'w') as f:
@@ -1014,8 +1802,11 @@ def run_wizload_session(seed, output_json, level_name, verbose=False):
         print(f'Session: {output_json}')
         print(f'Steps: {len(steps)}, Level RNG calls: {len(rng_entries)}')
 
+        # Quit the game cleanly
+        quit_game(session_name)
+
     finally:
-        subprocess.run(['tmux', 'kill-session', '-t', session_name], capture_output=True)
+        tmux_kill_session(session_name)
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
@@ -1035,49 +1826,34 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
         print(f"Error: nethack binary not found at {NETHACK_BINARY}")
         sys.exit(1)
 
-    # Create minimal .nethackrc without preset selections
-    os.makedirs(RESULTS_DIR, exist_ok=True)
-    nethackrc = os.path.join(RESULTS_DIR, '.nethackrc')
+    # Fresh sandbox (no save to restore) with a minimal .nethackrc
+    # without preset selections
+    tmpdir = tempfile.mkdtemp(prefix='webhack-chargen-')
+    home, nethackdir = create_sandbox(tmpdir, INSTALL_DIR)
+    nethackrc = os.path.join(home, '.nethackrc')
     with open(nethackrc, 'w') as f:
         f.write('OPTIONS=name:Wizard\n')
         f.write('OPTIONS=!autopickup\n')
         f.write('OPTIONS=suppress_alert:3.4.3\n')
         f.write('OPTIONS=symset:DECgraphics\n')
 
-    # Clean up stale game state to force fresh character creation
-    import glob
-    save_dir = os.path.join(INSTALL_DIR, 'save')
-    if os.path.isdir(save_dir):
-        for f in glob.glob(os.path.join(save_dir, '*')):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, '*wizard*')):
-        if not f.endswith('.lua'):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, '*Wizard*')):
-        if not f.endswith('.lua'):
-            os.unlink(f)
-    for f in glob.glob(os.path.join(INSTALL_DIR, 'bon*')):
-        os.unlink(f)
-
-    tmpdir = tempfile.mkdtemp(prefix='webhack-chargen-')
     rng_log_file = os.path.join(tmpdir, 'rnglog.txt')
     session_name = f'webhack-chargen-{seed}-{os.getpid()}'
+    writer = None
 
     try:
         cmd = (
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'{fixed_datetime_env()}'
             f'NETHACK_SEED={seed} '
             f'NETHACK_RNGLOG={rng_log_file} '
-            f'HOME={RESULTS_DIR} '
+            f'{rng_log_format_env()}'
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u Wizard -D; '
             f'sleep 999'
         )
-        subprocess.run(
-            ['tmux', 'new-session', '-d', '-s', session_name, '-x', '80', '-y', '24', cmd],
-            check=True
-        )
+        start_game_session(session_name, cmd)
 
         time.sleep(1.0)
 
@@ -1091,12 +1867,25 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
         startup_rng_count, startup_rng_lines = read_rng_log(rng_log_file)
         startup_rng_entries = parse_rng_lines(startup_rng_lines)
 
-        steps = [{
-            'key': None,
-            'action': 'startup',
-            'rng': startup_rng_entries,
-            'screen': startup_screen,
-        }]
+        # Options depend on the selections made below; finalize() fills them in.
+        writer = SessionWriter(output_json, {
+            'version': 3,
+            'seed': seed,
+            'source': 'c',
+            'type': 'chargen',
+            'regen': {
+                'mode': 'chargen',
+                'selections': selections,
+                'tutorial': tutorial_response,
+            },
+            'options': {},
+            'steps': [{
+                'key': None,
+                'action': 'startup',
+                'rng': startup_rng_entries,
+                'screen': startup_screen,
+            }],
+        })
         prev_rng_count = startup_rng_count
 
         # Track actual selections for session metadata
@@ -1118,7 +1907,7 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
             rng_entries = parse_rng_lines(delta_lines)
 
             if '--More--' in content:
-                steps.append({
+                writer.append_step({
                     'key': ' ',
                     'action': 'more-prompt',
                     'rng': rng_entries,
@@ -1129,7 +1918,7 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
                 continue
 
             if 'Shall I pick' in content:
-                steps.append({
+                writer.append_step({
                     'key': 'n',
                     'action': 'decline-autopick',
                     'rng': rng_entries,
@@ -1142,7 +1931,7 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
             if 'Pick a role' in content or 'pick a role' in content:
                 key = selections[selection_idx] if selection_idx < len(selections) else 'v'
                 selected['role'] = CHARGEN_ROLE_KEYS.get(key, key)
-                steps.append({
+                writer.append_step({
                     'key': key,
                     'action': 'select-role',
                     'rng': rng_entries,
@@ -1156,7 +1945,7 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
             if 'Pick a race' in content or 'pick a race' in content:
                 key = selections[selection_idx] if selection_idx < len(selections) else 'h'
                 selected['race'] = CHARGEN_RACE_KEYS.get(key, key)
-                steps.append({
+                writer.append_step({
                     'key': key,
                     'action': 'select-race',
                     'rng': rng_entries,
@@ -1170,7 +1959,7 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
             if 'Pick a gender' in content or 'pick a gender' in content:
                 key = selections[selection_idx] if selection_idx < len(selections) else 'f'
                 selected['gender'] = CHARGEN_GENDER_KEYS.get(key, key)
-                steps.append({
+                writer.append_step({
                     'key': key,
                     'action': 'select-gender',
                     'rng': rng_entries,
@@ -1184,7 +1973,7 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
             if 'Pick an alignment' in content or 'pick an alignment' in content:
                 key = selections[selection_idx] if selection_idx < len(selections) else 'n'
                 selected['align'] = CHARGEN_ALIGN_KEYS.get(key, key)
-                steps.append({
+                writer.append_step({
                     'key': key,
                     'action': 'select-alignment',
                     'rng': rng_entries,
@@ -1196,7 +1985,7 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
                 continue
 
             if 'Is this ok?' in content:
-                steps.append({
+                writer.append_step({
                     'key': 'y',
                     'action': 'confirm-character',
                     'rng': rng_entries,
@@ -1208,7 +1997,7 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
 
             if (not tutorial_prompt_handled) and ('Do you want a tutorial?' in content):
                 tkey = tutorial_response if tutorial_response in ('y', 'n') else 'n'
-                steps.append({
+                writer.append_step({
                     'key': tkey,
                     'action': 'accept-tutorial' if tkey == 'y' else 'decline-tutorial',
                     'rng': rng_entries,
@@ -1221,14 +2010,14 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
 
             # Game ready - capture final state
             if 'Dlvl:' in content or 'St:' in content:
-                steps.append({
+                writer.append_step({
                     'key': '',
                     'action': 'game-ready',
                     'rng': rng_entries,
                     'screen': screen,
                 })
                 prev_rng_count = rng_count
-                print(f'  Game ready after {len(steps)} steps, {rng_count} RNG calls')
+                print(f'  Game ready after {writer.step_count} steps, {rng_count} RNG calls')
                 break
 
         # Capture inventory after game start
@@ -1239,7 +2028,7 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
         rng_count, rng_lines = read_rng_log(rng_log_file)
         delta_lines = rng_lines[prev_rng_count:rng_count]
         rng_entries = parse_rng_lines(delta_lines)
-        steps.append({
+        writer.append_step({
             'key': 'i',
             'action': 'inventory',
             'rng': rng_entries,
@@ -1276,34 +2065,19 @@ def run_chargen_session(seed, output_json, selections, tutorial_response='n', ve
         if selected['align']:
             options['align'] = selected['align']
 
-        session_data = {
-            'version': 3,
-            'seed': seed,
-            'source': 'c',
-            'type': 'chargen',
-            'regen': {
-                'mode': 'chargen',
-                'selections': selections,
-                'tutorial': tutorial_response,
-            },
-            'options': options,
-            'steps': steps,
-        }
-
         # Quit the game
         quit_game(session_name)
 
-        # Write JSON
-        os.makedirs(os.path.dirname(output_json), exist_ok=True)
-        with open(output_json, 'w') as f:
-            f.write(compact_session_json(session_data))
+        writer.finalize(options=options)
 
         print(f'\n=== DONE ===')
         print(f'Session: {output_json}')
-        print(f'Steps: {len(steps)}')
+        print(f'Steps: {writer.step_count}')
 
     finally:
-        subprocess.run(['tmux', 'kill-session', '-t', session_name], capture_output=True)
+        if writer is not None:
+            writer.close()
+        tmux_kill_session(session_name)
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
@@ -1322,27 +2096,25 @@ def run_interface_session(seed, output_json, keys, verbose=False, auto_clear_mor
         print(f"Error: nethack binary not found at {NETHACK_BINARY}")
         sys.exit(1)
 
-    setup_home()
-
     tmpdir = tempfile.mkdtemp(prefix='webhack-interface-')
+    home, nethackdir = setup_home(tmpdir)
     rng_log_file = os.path.join(tmpdir, 'rnglog.txt')
     session_name = f'webhack-interface-{seed}-{os.getpid()}'
+    profiler.start(output_json)
 
     try:
         cmd = (
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'{fixed_datetime_env()}'
             f'NETHACK_SEED={seed} '
             f'NETHACK_RNGLOG={rng_log_file} '
-            f'HOME={RESULTS_DIR} '
+            f'{rng_log_format_env()}'
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u {CHARACTER["name"]} -D; '
             f'sleep 999'
         )
-        subprocess.run(
-            ['tmux', 'new-session', '-d', '-s', session_name, '-x', '80', '-y', '24', cmd],
-            check=True
-        )
+        start_game_session(session_name, cmd)
 
         time.sleep(1.0)
 
@@ -1354,11 +2126,12 @@ def run_interface_session(seed, output_json, keys, verbose=False, auto_clear_mor
         time.sleep(0.02)
 
         # Capture startup state
-        startup_rng_count, startup_rng_lines = read_rng_log(rng_log_file)
+        rng_tail = RngLogTailer(rng_log_file)
+        startup_rng_entries = rng_tail.read_new_entries()
+        startup_rng_count = rng_tail.count
         print(f'Startup: {startup_rng_count} RNG calls')
 
         startup_screen = capture_screen_compressed(session_name)
-        startup_rng_entries = parse_rng_lines(startup_rng_lines)
 
         # Build startup step (first step with no key)
         startup_step = {
@@ -1389,11 +2162,11 @@ def run_interface_session(seed, output_json, keys, verbose=False, auto_clear_mor
             },
             'steps': [startup_step],
         }
+        profiler.end_step('startup')
 
         print(f'\n=== INTERFACE ({len(keys)} keys) ===')
 
         # Send each key and capture screen
-        prev_rng_count = startup_rng_count
         for i, key in enumerate(keys):
             # Handle special key encodings
             if key == '^' and i + 1 < len(keys):
@@ -1423,9 +2196,7 @@ def run_interface_session(seed, output_json, keys, verbose=False, auto_clear_mor
                 clear_more_prompts(session_name)
 
             screen = capture_screen_compressed(session_name)
-            rng_count, rng_lines = read_rng_log(rng_log_file)
-            delta_lines = rng_lines[prev_rng_count:rng_count]
-            rng_entries = parse_rng_lines(delta_lines)
+            rng_entries = rng_tail.read_new_entries()
 
             step = {
                 'key': key,
@@ -1434,7 +2205,7 @@ def run_interface_session(seed, output_json, keys, verbose=False, auto_clear_mor
                 'screen': screen,
             }
             session_data['steps'].append(step)
-            prev_rng_count = rng_count
+            profiler.end_step(key)
 
             print(f'  [{i+1:03d}] {repr(key):5s} ({action:20s}) +{len(rng_entries):4d} RNG')
 
@@ -1449,9 +2220,11 @@ def run_interface_session(seed, output_json, keys, verbose=False, auto_clear_mor
         print(f'\n=== DONE ===')
         print(f'Session: {output_json}')
         print(f'Steps: {len(session_data["steps"])}')
+        profiler.finish('quit')
 
     finally:
-        subprocess.run(['tmux', 'kill-session', '-t', session_name], capture_output=True)
+        profiler.close()
+        tmux_kill_session(session_name)
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
@@ -1485,6 +2258,34 @@ def run_session_entry(entry, sessions_dir):
 
 
 def main():
+    # Parse --backend <tmux|pty> flag (applies to every mode)
+    if '--backend' in sys.argv:
+        idx = sys.argv.index('--backend')
+        if idx + 1 >= len(sys.argv) or sys.argv[idx + 1] not in GAME_BACKENDS:
+            print(f"Error: --backend requires one of: {', '.join(GAME_BACKENDS)}")
+            sys.exit(1)
+        set_game_backend(sys.argv[idx + 1])
+        del sys.argv[idx:idx + 2]
+
+    if '--profile' in sys.argv:
+        sys.argv.remove('--profile')
+        os.environ['WEBHACK_PROFILE'] = '1'
+        profiler.reset()
+
+    if '--recover' in sys.argv:
+        idx = sys.argv.index('--recover')
+        if idx + 1 >= len(sys.argv):
+            print('Error: --recover requires a session file')
+            sys.exit(1)
+        partial = sys.argv[idx + 1]
+        output = sys.argv[idx + 2] if idx + 2 < len(sys.argv) else partial.removesuffix('.partial')
+        data, complete = recover_session_file(partial)
+        with open(output, 'w') as f:
+            f.write(compact_session_json(data))
+        state = 'complete' if complete else 'truncated'
+        print(f'Recovered {len(data.get("steps", []))} steps ({state}) to {output}')
+        return
+
     if '--from-config' in sys.argv:
         from concurrent.futures import ProcessPoolExecutor, as_completed
         import multiprocessing
@@ -1493,9 +2294,16 @@ def main():
         sessions_dir = os.path.join(PROJECT_ROOT, 'test', 'comparison', 'sessions')
         entries = config['session_seeds']['sessions']
 
-        # Check for --parallel flag
+        # Check for --parallel [N] flag (default: one worker per core; each
+        # capture runs in its own sandbox, see capture_sandbox.py)
         parallel = '--parallel' in sys.argv
-        max_workers = 4 if parallel else 1
+        max_workers = 1
+        if parallel:
+            idx = sys.argv.index('--parallel')
+            if idx + 1 < len(sys.argv) and sys.argv[idx + 1].isdigit():
+                max_workers = int(sys.argv[idx + 1])
+            else:
+                max_workers = os.cpu_count() or 4
 
         if parallel:
             print(f'Running {len(entries)} sessions in parallel with {max_workers} workers')
@@ -1607,9 +2415,11 @@ def main():
         print(f"       {sys.argv[0]} <seed> <output_json> --chargen <selections> [--tutorial y|n]")
         print(f"       {sys.argv[0]} <seed> <output_json> --interface <keys>")
         print(f"       {sys.argv[0]} --from-config")
+        print(f"       {sys.argv[0]} --recover <output_json>.partial [recovered_json]")
         print(f"Options:")
         print(f"  --raw-moves: Moves include --More-- responses (from keylog)")
         print(f"  --no-wizard: Run gameplay capture without -D (non-wizard mode)")
+        print(f"  --backend tmux|pty: Terminal backend (pty needs pexpect + pyte; default tmux)")
         print(f"Character presets: {', '.join(CHARACTER_PRESETS.keys())} (default: valkyrie)")
         print(f"Example: {sys.argv[0]} 42 sessions/seed42.session.json ':hhlhhhh.hhs'")
         print(f"Example: {sys.argv[0]} 42 sessions/seed42_castle.session.json --wizload castle")
@@ -1650,7 +2460,9 @@ def run_session(seed, output_json, move_str, raw_moves=False, character=None, wi
                    If False, clear_more_prompts is called after each move.
         character: Character config dict (name, role, race, gender, align).
                    Uses default CHARACTER if None.
-        wizard_mode: If True, launch C NetHack with -D and capture typGrid via #dumpmap.
+        wizard_mode: If True, launch C NetHack with -D and capture typGrids, from
+                     the game's automatic snapshots when the binary writes
+                     them (typgrid_log.py), else via #dumpmap.
     """
     char = character or CHARACTER
     output_json = os.path.abspath(output_json)
@@ -1660,48 +2472,57 @@ def run_session(seed, output_json, move_str, raw_moves=False, character=None, wi
         print(f"Run setup.sh first: bash {os.path.join(SCRIPT_DIR, 'setup.sh')}")
         sys.exit(1)
 
-    setup_home(char)
-
     # Temp files for RNG log and dumpmap
     tmpdir = tempfile.mkdtemp(prefix='webhack-session-')
+    home, nethackdir = setup_home(tmpdir, char)
     rng_log_file = os.path.join(tmpdir, 'rnglog.txt')
     dumpmap_file = os.path.join(tmpdir, 'dumpmap.txt')
 
     session_name = f'webhack-session-{seed}-{os.getpid()}'
+    writer = None
+    profiler.start(output_json)
 
     try:
         wiz_flag = ' -D' if wizard_mode else ''
         cmd = (
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'{fixed_datetime_env()}'
             f'NETHACK_SEED={seed} '
             f'NETHACK_RNGLOG={rng_log_file} '
+            f'{rng_log_format_env()}'
             f'NETHACK_DUMPMAP={dumpmap_file} '
-            f'HOME={RESULTS_DIR} '
+            f'{input_wait_env(session_name, tmpdir)}'
+            f'{typgrid_log_env(session_name, tmpdir) if wizard_mode else ""}'
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u {char["name"]}{wiz_flag}; '
             f'sleep 999'
         )
-        subprocess.run(
-            ['tmux', 'new-session', '-d', '-s', session_name, '-x', '80', '-y', '24', cmd],
-            check=True
-        )
+        start_game_session(session_name, cmd)
 
-        time.sleep(1.0)
+        wait_for_input(session_name, 1.0)
 
         print(f'=== Capturing session: seed={seed}, role={char["role"]}, moves="{move_str}" ===')
         print(f'=== STARTUP ===')
         wait_for_game_ready(session_name, rng_log_file)
-        time.sleep(0.02)
+        wait_for_input(session_name)
         clear_more_prompts(session_name)
-        time.sleep(0.02)
+        wait_for_input(session_name)
 
         # Capture startup state
-        startup_rng_count, startup_rng_lines = read_rng_log(rng_log_file)
+        rng_tail = RngLogTailer(rng_log_file)
+        startup_rng_entries = rng_tail.read_new_entries()
+        startup_rng_count = rng_tail.count
         print(f'Startup: {startup_rng_count} RNG calls')
 
         startup_typ_grid = None
-        if wizard_mode:
+        if wizard_mode and typgrid_log_active(session_name):
+            startup_typ_grid = latest_typ_grid(session_name)
+            if startup_typ_grid:
+                print(f'Startup typGrid: {len(startup_typ_grid)}x{len(startup_typ_grid[0])} captured')
+            else:
+                print('WARNING: Failed to capture startup typGrid')
+        elif wizard_mode:
             # Capture startup typ grid via #dumpmap (wizard-mode only).
             startup_typ_grid = execute_dumpmap(session_name, dumpmap_file)
             if startup_typ_grid:
@@ -1715,7 +2536,6 @@ def run_session(seed, output_json, move_str, raw_moves=False, character=None, wi
         startup_screen_compressed = capture_screen_compressed(session_name)
 
         # Build session object (unified format v3)
-        startup_rng_entries = parse_rng_lines(startup_rng_lines)
         startup_actual_rng = sum(1 for e in startup_rng_entries if e[0] not in ('>', '<'))
 
         # Build startup step (first step with no key)
@@ -1728,7 +2548,7 @@ def run_session(seed, output_json, move_str, raw_moves=False, character=None, wi
         if startup_typ_grid:
             startup_step['typGrid'] = encode_typgrid_rle(startup_typ_grid)
 
-        session_data = {
+        writer = SessionWriter(output_json, {
             'version': 3,
             'seed': seed,
             'source': 'c',
@@ -1748,7 +2568,8 @@ def run_session(seed, output_json, move_str, raw_moves=False, character=None, wi
                 'pickup_types': '',
             },
             'steps': [startup_step],
-        }
+        })
+        profiler.end_step('startup')
 
         # Execute moves - send each character individually (no grouping)
         prev_rng_count = startup_rng_count
@@ -1776,18 +2597,17 @@ def run_session(seed, output_json, move_str, raw_moves=False, character=None, wi
 
             # Send the character
             send_char(ch)
-            time.sleep(0.02)  # 20ms delay for game to process input
+            wait_for_input(session_name)  # until the game wants the next key
 
             # Only clear --More-- if not raw_moves (raw moves include space keys)
             if not raw_moves:
                 clear_more_prompts(session_name)
 
-            # Capture state after this step
-            screen_lines = capture_screen_lines(session_name)
-            screen_compressed = capture_screen_compressed(session_name)
-            rng_count, rng_lines = read_rng_log(rng_log_file)
-            delta_lines = rng_lines[prev_rng_count:rng_count]
-            rng_entries = parse_rng_lines(delta_lines)
+            # Capture state after this step (one capture for both views)
+            screen_lines, screen_ansi = capture_screen_views(session_name)
+            screen_compressed = encode_screen_ansi_rle(screen_ansi)
+            rng_entries = rng_tail.read_new_entries()
+            rng_count = rng_tail.count
 
             # Detect current level from status line
             depth = detect_depth(screen_lines)
@@ -1800,8 +2620,16 @@ def run_session(seed, output_json, move_str, raw_moves=False, character=None, wi
                 'screen': screen_compressed,
             }
 
-            # Capture typGrid snapshots only in wizard-mode, where #dumpmap exists.
-            if wizard_mode:
+            # typGrid snapshots are captured in wizard-mode only, as with #dumpmap.
+            if wizard_mode and typgrid_log_active(session_name):
+                # The game wrote one if this key changed level or terrain.
+                new_grids = read_new_typ_grids(session_name)
+                if new_grids:
+                    step['typGrid'] = encode_typgrid_rle(new_grids[-1])
+                    captured_levels.add(depth)
+                    print(f'  Terrain changed (depth={depth}), typGrid captured')
+                    prev_typ_grid = new_grids[-1]
+            elif wizard_mode:
                 level_gen_likely = delta > 1000
                 new_depth = depth not in captured_levels
                 if new_depth or (level_gen_likely and 'typGrid' not in step):
@@ -1814,31 +2642,119 @@ def run_session(seed, output_json, move_str, raw_moves=False, character=None, wi
                         print(f'  New level detected ({reason}), typGrid captured')
                         prev_typ_grid = current_grid
 
-            session_data['steps'].append(step)
+            writer.append_step(step)
+            profiler.end_step(key)
             print(f'  [{idx+1:03d}] {key!r:5s} ({description:20s}) +{delta:4d} RNG calls (total {rng_count})')
             prev_rng_count = rng_count
 
         # Quit the game cleanly
         quit_game(session_name)
 
-        # Write JSON with compact typGrid rows
-        os.makedirs(os.path.dirname(output_json), exist_ok=True)
-        with open(output_json, 'w') as f:
-            f.write(compact_session_json(session_data))
+        writer.finalize()
 
         # Summary
         total_rng = prev_rng_count
-        total_steps = len(session_data['steps'])
-        stats = get_clear_more_stats()
+        total_steps = writer.step_count
+        counts = profiler.counts
         print(f'\n=== DONE ===')
         print(f'Session: {output_json}')
         print(f'Steps: {total_steps}, Total RNG calls: {total_rng}')
         if not raw_moves:
-            print(f'clear_more_prompts: {stats["calls"]} calls, {stats["cleared"]} --More-- cleared')
+            print(f'clear_more_prompts: {counts.get("clear_more_calls", 0)} calls, '
+                  f'{counts.get("more_cleared", 0)} --More-- cleared')
+        profiler.finish('quit')
+
+    finally:
+        if writer is not None:
+            writer.close()
+        profiler.close()
+        tmux_kill_session(session_name)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
 
+
+STATUS_DLVL_RE = re.compile(r'Dlvl:\s*(\d+)')
+STATUS_XP_RE = re.compile(r'(?:Xp|Exp):\s*(\d+)')
+
+
+def read_status(screen_lines):
+    """Return (dlvl, xp) from the bottom status lines; None where not shown."""
+    dlvl = xp = None
+    for line in screen_lines[22:24]:
+        m = STATUS_DLVL_RE.search(line)
+        if m:
+            dlvl = int(m.group(1))
+        m = STATUS_XP_RE.search(line)
+        if m:
+            xp = int(m.group(1))
+    return dlvl, xp
+
+
+def run_probe(seed, move_str, character=None, until=None, wizard_mode=True):
+    """Play move_str like run_session() but record only the status line.
+
+    For seed searches: no RNG log, no #dumpmap, no ANSI screens and no
+    session file.  Keys are sent and --More-- cleared exactly as
+    run_session() does (raw_moves=False), so a seed behaves the same in
+    the probe and in its full capture.  until(max_dlvl, max_xp) is called
+    after each step and the game is abandoned as soon as it returns True.
+
+    Returns {'max_dlvl', 'max_xp', 'steps'} (steps actually played).
+    """
+    char = character or CHARACTER
+    if not os.path.isfile(NETHACK_BINARY):
+        raise RuntimeError(f'nethack binary not found at {NETHACK_BINARY}')
+
+    tmpdir = tempfile.mkdtemp(prefix='webhack-probe-')
+    home, nethackdir = setup_home(tmpdir, char)
+    session_name = f'webhack-probe-{seed}-{os.getpid()}'
+    max_dlvl = max_xp = 1
+    steps = 0
+    try:
+        wiz_flag = ' -D' if wizard_mode else ''
+        cmd = (
+            f'NETHACKDIR={nethackdir} '
+            f'{fixed_datetime_env()}'
+            f'NETHACK_SEED={seed} '
+            f'{input_wait_env(session_name, tmpdir)}'
+            f'HOME={home} '
+            f'TERM=xterm-256color '
+            f'{NETHACK_BINARY} -u {char["name"]}{wiz_flag}; '
+            f'sleep 999'
+        )
+        start_game_session(session_name, cmd)
+        wait_for_input(session_name, 1.0)
+        # No RNG log: wait_for_game_ready() just reports 0 calls.
+        with contextlib.redirect_stdout(io.StringIO()):
+            wait_for_game_ready(session_name, os.path.join(tmpdir, 'rnglog.txt'))
+        wait_for_input(session_name)
+        clear_more_prompts(session_name)
+
+        for ch in move_str:
+            code = ord(ch)
+            if code == 10 or code == 13:
+                tmux_send_special(session_name, 'Enter')
+            elif code == 27:
+                tmux_send_special(session_name, 'Escape')
+            elif code == 127:
+                tmux_send_special(session_name, 'BSpace')
+            elif code < 32:
+                tmux_send_special(session_name, f'C-{chr(code + 96)}')
+            else:
+                tmux_send(session_name, ch)
+            wait_for_input(session_name)
+            clear_more_prompts(session_name)
+            steps += 1
+
+            dlvl, xp = read_status(capture_screen_lines(session_name))
+            max_dlvl = max(max_dlvl, dlvl or 1)
+            max_xp = max(max_xp, xp or 1)
+            if until is not None and until(max_dlvl, max_xp):
+                break
     finally:
-        subprocess.run(['tmux', 'kill-session', '-t', session_name], capture_output=True)
+        tmux_kill_session(session_name)
         shutil.rmtree(tmpdir, ignore_errors=True)
+    return {'max_dlvl': max_dlvl, 'max_xp': max_xp, 'steps': steps}
 
 
 if __name__ == '__main__':
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Delta encoding of step screens in session files.
+
+Consecutive screens of a gameplay session usually differ in a few cells,
+yet every step stores its whole screen.  With the 'delta' screen encoding
+(WEBHACK_SESSION_SCREEN_ENCODING=delta), a step keeps its full `screen`
+(and `screenAnsi`, for keylog sessions) only as a keyframe; other steps
+store `screenDelta` (and `screenAnsiDelta`):
+
+    [line_count, [row, col, cut, text], ...]
+
+against the same field of the nearest earlier step that has it.  The
+previous value as lines (a string split on '\\n', or the list itself;
+missing lines start empty) has line `row` replaced by
+line[:col] + text + line[col + cut:], and is cut to line_count lines.  A
+delta decodes to the same type as the keyframe it started from (joined
+string or list), so decoding reproduces the stored value exactly.
+
+A step is a keyframe for all its screen fields at once: every
+KEYFRAME_INTERVAL screen steps, whenever the deltas would not be smaller
+than the screens, when a field is new or changes type, and for screens
+outside the Basic Multilingual Plane (the JS decoder indexes UTF-16 code
+units).  Decoding state restarts at each keyframe, so step i can be
+decoded from the last keyframe at or before it.
+
+Files using it carry a top-level "screenEncoding": {"version": 1,
+"keyframeEvery": N} ahead of the steps.  expand_session_screens() turns a
+session back into plain screen fields; session_loader.js does the same
+in JS.
+"""
+
+import json
+import os
+
+VERSION = 1
+ENCODINGS = ('full', 'delta')
+KEYFRAME_INTERVAL = 50
+SCREEN_FIELDS = ('screen', 'screenAnsi')
+
+
+def screen_encoding():
+    """Screen encoding requested for new session files: 'full' or 'delta'."""
+    return os.environ.get('WEBHACK_SESSION_SCREEN_ENCODING', 'full')
+
+
+def _lines(value):
+    return value.split('\n') if isinstance(value, str) else list(value)
+
+
+def _is_screen(value):
+    if isinstance(value, str):
+        return True
+    return isinstance(value, list) and all(isinstance(line, str) for line in value)
+
+
+def _has_astral(value):
+    return any(ord(ch) > 0xFFFF for line in _lines(value) for ch in line)
+
+
+def diff_screens(prev, cur):
+    """Delta that turns screen prev into cur (both strings or both lists)."""
+    old = _lines(prev)
+    new = _lines(cur)
+    delta = [len(new)]
+    for row, line in enumerate(new):
+        before = old[row] if row < len(old) else ''
+        if line == before:
+            continue
+        limit = min(len(line), len(before))
+        start = 0
+        while start < limit and line[start] == before[start]:
+            start += 1
+        end = 0
+        while end < limit - start and line[-1 - end] == before[-1 - end]:
+            end += 1
+        delta.append([row, start, len(before) - start - end, line[start:len(line) - end]])
+    return delta
+
+
+def apply_delta(prev, delta):
+    """Inverse of diff_screens(): the screen delta leads to from prev."""
+    lines = _lines(prev)
+    count = delta[0]
+    if len(lines) < count:
+        lines += [''] * (count - len(lines))
+    for row, col, cut, text in delta[1:]:
+        line = lines[row]
+        lines[row] = line[:col] + text + line[col + cut:]
+    lines = lines[:count]
+    return '\n'.join(lines) if isinstance(prev, str) else lines
+
+
+def _screen_fields(step):
+    if not isinstance(step, dict):
+        return []
+    return [f for f in SCREEN_FIELDS if f in step and _is_screen(step[f])]
+
+
+def _step_deltas(step, fields, prev):
+    """{field: delta} for a non-keyframe step, or None if it must be a keyframe."""
+    deltas = {}
+    full_size = delta_size = 0
+    for field in fields:
+        value = step[field]
+        if field not in prev or isinstance(prev[field], str) != isinstance(value, str):
+            return None
+        if _has_astral(value):
+            return None
+        deltas[field] = diff_screens(prev[field], value)
+        full_size += len(json.dumps(value))
+        delta_size += len(json.dumps(deltas[field]))
+    if delta_size >= full_size:
+        return None
+    return deltas
+
+
+def is_keyframe(step):
+    """True for a step that restarts screen decoding."""
+    return bool(_screen_fields(step)) and not any(f + 'Delta' in step for f in SCREEN_FIELDS)
+
+
+def encode_session_screens(session_data, keyframe_every=KEYFRAME_INTERVAL):
+    """Return a copy of session_data with step screens delta-encoded."""
+    steps = session_data.get('steps')
+    if 'screenEncoding' in session_data or not isinstance(steps, list):
+        return session_data
+    out_steps = []
+    prev = None
+    since_keyframe = 0
+    for step in steps:
+        fields = _screen_fields(step)
+        if not fields:
+            out_steps.append(step)
+            continue
+        deltas = None
+        if prev is not None and since_keyframe + 1 < keyframe_every:
+            deltas = _step_deltas(step, fields, prev)
+        if deltas is None:
+            out_steps.append(step)
+            prev = {}
+            since_keyframe = 0
+        else:
+            out_steps.append({(k + 'Delta' if k in deltas else k): (deltas[k] if k in deltas else v)
+                              for k, v in step.items()})
+            since_keyframe += 1
+        for field in fields:
+            prev[field] = step[field]
+    out = {}
+    for key, value in session_data.items():
+        if key == 'steps':
+            out['screenEncoding'] = {'version': VERSION, 'keyframeEvery': keyframe_every}
+            value = out_steps
+        out[key] = value
+    return out
+
+
+def expand_steps(steps, prev=None):
+    """Yield steps with every *Delta field replaced by the decoded screen.
+
+    steps must start at a keyframe, or prev must hold the decoding state
+    ({field: screen}) left by the steps before the first one.
+    """
+    prev = dict(prev or {})
+    for step in steps:
+        if is_keyframe(step):
+            prev = {}
+        elif isinstance(step, dict) and any(f + 'Delta' in step for f in SCREEN_FIELDS):
+            out = {}
+            for key, value in step.items():
+                field = key[:-len('Delta')] if key.endswith('Delta') else None
+                if field in SCREEN_FIELDS:
+                    if field not in prev:
+                        raise ValueError(f'{key} without an earlier keyframe')
+                    key, value = field, apply_delta(prev[field], value)
+                out[key] = value
+            step = out
+        for field in _screen_fields(step):
+            prev[field] = step[field]
+        yield step
+
+
+def decode_state(steps):
+    """Decoding state after steps, which must start at a keyframe."""
+    state = {}
+    for step in expand_steps(steps):
+        if is_keyframe(step):
+            state = {}
+        for field in _screen_fields(step):
+            state[field] = step[field]
+    return state
+
+
+def expand_session_screens(session_data):
+    """Inverse of encode_session_screens(): every step keeps full screens."""
+    encoding = session_data.get('screenEncoding')
+    if encoding is None:
+        return session_data
+    if encoding.get('version') != VERSION:
+        raise ValueError(f"unsupported screenEncoding version {encoding.get('version')}")
+    out = dict(session_data)
+    del out['screenEncoding']
+    out['steps'] = list(expand_steps(out.get('steps') or []))
+    return out
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Catalog of session files: test/comparison/sessions/index.json.
+
+Tools that only need a few fields of each session (its mode, seed,
+character, size) used to json.load every file to get them, tens of MB of
+JSON per run.  The catalog keeps those fields per file:
+
+    {"version": 1, "sessions": {
+        "test/comparison/sessions/seed42_gameplay.session.json": {
+            "type": "gameplay", "seed": 42,
+            "character": {"name": ..., "role": ..., ...},
+            "steps": 101, "rngCalls": 5321,
+            "size": 123456, "mtime": 1760000000.0,
+            "regen": {...}, "options": {...}, "symset": "DECgraphics"
+        }, ...}}
+
+Keys are paths relative to the project root.  load_index() brings the
+catalog up to date first: files whose size and mtime match their entry
+are not read again, new or changed files are parsed once, and entries for
+deleted files are dropped.  The catalog is generated (and git-ignored), so
+it is safe to delete.
+
+Usage:
+    python3 session_index.py            # refresh and summarize
+    python3 session_index.py --rebuild  # reparse every session
+"""
+
+import fnmatch
+import glob
+import json
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.normpath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
+SESSIONS_DIR = os.path.join(PROJECT_ROOT, 'test', 'comparison', 'sessions')
+MAPS_DIR = os.path.join(PROJECT_ROOT, 'test', 'comparison', 'maps')
+MANUAL_DIR = os.path.join(SESSIONS_DIR, 'manual')
+INDEX_FILE = os.path.join(SESSIONS_DIR, 'index.json')
+INDEX_VERSION = 1
+
+CHARACTER_FIELDS = ('name', 'role', 'race', 'gender', 'align')
+
+# Sessions the gameplay validators and analyzers cover, by file name:
+# recorded play (regen.mode gameplay, and keylog for hand-played games such
+# as seed8_tutorial_manual_gameplay), selfplay traces, and chargen sessions
+# played on in wizard mode.  The mode alone would miss the last two kinds.
+GAMEPLAY_PATTERNS = ('*_gameplay.session.json', '*_selfplay*.session.json', '*_wizard.session.json')
+
+
+def session_files():
+    """Every session file the catalog covers, in a stable order."""
+    files = []
+    for directory in (SESSIONS_DIR, MAPS_DIR, MANUAL_DIR):
+        files.extend(sorted(glob.glob(os.path.join(directory, '*.session.json'))))
+    return files
+
+
+def index_key(path):
+    """Key for a session in the catalog: its path relative to the project."""
+    return os.path.relpath(os.path.abspath(path), PROJECT_ROOT)
+
+
+def session_type(data):
+    """regen.mode for recorder-written sessions, else the top-level type."""
+    regen = data.get('regen') or {}
+    return regen.get('mode') or data.get('type') or 'unknown'
+
+
+def is_rng_call(entry):
+    """True for an RNG call entry, False for midlog and event entries."""
+    return isinstance(entry, list) or bool(entry and entry[0] not in ('>', '<', '^'))
+
+
+def count_rng_calls(data):
+    """RNG calls recorded in a session (midlog and event entries excluded)."""
+    total = 0
+    for key in ('startup', 'steps', 'levels'):
+        value = data.get(key)
+        holders = [value] if isinstance(value, dict) else value or []
+        for holder in holders:
+            if not isinstance(holder, dict):
+                continue
+            total += sum(1 for entry in holder.get('rng') or [] if is_rng_call(entry))
+    return total
+
+
+def build_entry(path, st=None):
+    """Parse one session file into its catalog entry."""
+    st = st or os.stat(path)
+    with open(path) as f:
+        data = json.load(f)
+    options = data.get('options') or {}
+    character = data.get('character') or options
+    return {
+        'type': session_type(data),
+        'seed': data.get('seed'),
+        'character': {k: character[k] for k in CHARACTER_FIELDS if character.get(k)},
+        'steps': len(data.get('steps') or []),
+        'rngCalls': count_rng_calls(data),
+        'size': st.st_size,
+        'mtime': st.st_mtime,
+        'regen': data.get('regen'),
+        'options': data.get('options'),
+        'symset': data.get('symset') or options.get('symset'),
+    }
+
+
+def session_header(entry):
+    """The top-level session fields a recorder needs, rebuilt from an entry.
+
+    Stands in for the parsed file in code that reads seed, regen, options,
+    character or symset (rerecord.build_command()).
+    """
+    return {
+        'seed': entry.get('seed'),
+        'regen': entry.get('regen'),
+        'options': entry.get('options') or {},
+        'character': entry.get('character') or {},
+        'symset': entry.get('symset'),
+    }
+
+
+def _read_index():
+    try:
+        with open(INDEX_FILE) as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if index.get('version') != INDEX_VERSION:
+        return {}
+    return index.get('sessions') or {}
+
+
+def _write_index(sessions):
+    tmp = INDEX_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'version': INDEX_VERSION, 'sessions': sessions}, f, indent=1, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp, INDEX_FILE)
+
+
+def load_index(rebuild=False):
+    """Return the up-to-date catalog as {key: entry}, saving it if it changed.
+
+    An unreadable session file is left out (and retried on the next call).
+    """
+    old = {} if rebuild else _read_index()
+    sessions = {}
+    changed = False
+    for path in session_files():
+        key = index_key(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entry = old.get(key)
+        if entry and entry.get('size') == st.st_size and entry.get('mtime') == st.st_mtime:
+            sessions[key] = entry
+            continue
+        try:
+            sessions[key] = build_entry(path, st)
+        except (OSError, ValueError) as e:
+            print(f'Warning: cannot index {key}: {e}', file=sys.stderr)
+            continue
+        changed = True
+    if changed or set(sessions) != set(old):
+        _write_index(sessions)
+    return sessions
+
+
+def session_path(key):
+    """Absolute path of a catalog key."""
+    return os.path.join(PROJECT_ROOT, key)
+
+
+def select(index, types=None, pattern=None, directory=None):
+    """Keys of catalog entries, filtered by type, file-name glob and directory."""
+    keys = []
+    for key in sorted(index):
+        if types and index[key]['type'] not in types:
+            continue
+        if directory and os.path.dirname(session_path(key)) != os.path.normpath(directory):
+            continue
+        if pattern and not fnmatch.fnmatch(os.path.basename(key), pattern):
+            continue
+        keys.append(key)
+    return keys
+
+
+def select_gameplay(index, directory=None):
+    """Keys of the gameplay sessions (see GAMEPLAY_PATTERNS), sorted."""
+    keys = set()
+    for pattern in GAMEPLAY_PATTERNS:
+        keys.update(select(index, pattern=pattern, directory=directory))
+    return sorted(keys)
+
+
+def main():
+    index = load_index(rebuild='--rebuild' in sys.argv)
+    by_type = {}
+    for entry in index.values():
+        counts = by_type.setdefault(entry['type'], [0, 0, 0])
+        counts[0] += 1
+        counts[1] += entry['steps']
+        counts[2] += entry['size']
+    print(f'{len(index)} sessions in {os.path.relpath(INDEX_FILE, PROJECT_ROOT)}')
+    for name in sorted(by_type):
+        files, steps, size = by_type[name]
+        print(f'  {name:<12} {files:>4} files {steps:>7} steps {size / 1e6:>7.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
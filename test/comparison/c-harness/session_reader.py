@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Random-access reader for session files.
+
+compact_session_json() and SessionWriter write one top-level key or one
+step per line:
+
+    {
+    "version":3,
+    ...
+    "steps":[
+    {"key": null, "action": "startup", ...},
+    {"key": "h", ...}
+    ],
+    "trailerKey":...
+    }
+
+so a step can be read by seeking to the start of its line.  SessionReader
+scans a file once for those line offsets and then parses only what is asked
+for: header keys without the steps, one step, a slice, or steps lazily in
+order.
+
+    reader = SessionReader(path)
+    reader.get('seed'), reader['options']   # header keys
+    len(reader)                             # number of steps
+    reader.step(1742), reader.step(-1)      # one step
+    reader.steps(100, 200)                  # a list of steps
+    for step in reader.iter_steps(1): ...   # lazily, in order
+
+Offsets are cached in memory and in results/session-offsets/, keyed by
+the file's size and mtime, so reopening an unchanged file does not scan it
+again.  Files in any other layout (map sessions, hand-edited JSON) are
+parsed whole and served from memory through the same interface.
+
+Steps come back with full `screen` and `screenAnsi` fields: delta-encoded
+screens (see screen_delta.py) are decoded from the nearest earlier keyframe.
+Delta-encoded checkpoints (checkpoint_delta.py) are decoded within each
+step; the header's startup and levels keep them as stored.  RNG
+entries are returned as stored, so interned entries stay lists (see
+rngTable).  load() returns the stored document unchanged.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OFFSETS_DIR = os.path.join(SCRIPT_DIR, 'results', 'session-offsets')
+OFFSETS_VERSION = 1
+
+_offsets_memo = {}
+
+_sd_spec = importlib.util.spec_from_file_location('screen_delta', os.path.join(SCRIPT_DIR, 'screen_delta.py'))
+_screen_delta = importlib.util.module_from_spec(_sd_spec)
+_sd_spec.loader.exec_module(_screen_delta)
+
+_ckd_spec = importlib.util.spec_from_file_location('checkpoint_delta', os.path.join(SCRIPT_DIR, 'checkpoint_delta.py'))
+_checkpoint_delta = importlib.util.module_from_spec(_ckd_spec)
+_ckd_spec.loader.exec_module(_checkpoint_delta)
+
+
+def _offsets_cache_path(path):
+    name = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(OFFSETS_DIR, name + '.json')
+
+
+def scan_offsets(path):
+    """Scan a line-per-step session file; return its offset index or None.
+
+    The index is {'keys': [...], 'steps': [...], 'stepsAt': n}: byte
+    offsets of every top-level key line and of every step line, and how
+    many keys come before 'steps'.  None if the file is not in the
+    line-per-step layout.
+    """
+    keys = []
+    steps = []
+    steps_at = None
+    with open(path, 'rb') as f:
+        if f.readline().rstrip(b'\r\n') != b'{':
+            return None
+        in_steps = False
+        saw_steps = False
+        while True:
+            pos = f.tell()
+            line = f.readline()
+            if not line:
+                break
+            text = line.rstrip(b'\r\n')
+            if in_steps:
+                if text in (b']', b'],'):
+                    in_steps = False
+                elif text:
+                    steps.append(pos)
+            elif text == b'"steps":[':
+                in_steps = saw_steps = True
+                steps_at = len(keys)
+            elif text == b'}':
+                break
+            elif text.startswith(b'"'):
+                keys.append(pos)
+            elif text:
+                return None
+    if not saw_steps or in_steps:
+        return None
+    return {'keys': keys, 'steps': steps, 'stepsAt': steps_at}
+
+
+def load_offsets(path):
+    """Offset index for path, from the caches when the file is unchanged."""
+    st = os.stat(path)
+    stamp = [st.st_size, st.st_mtime_ns]
+    memo = _offsets_memo.get(os.path.abspath(path))
+    if memo and memo['stamp'] == stamp:
+        return memo['index']
+    cache_path = _offsets_cache_path(path)
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if cached.get('version') == OFFSETS_VERSION and cached.get('stamp') == stamp:
+            _offsets_memo[os.path.abspath(path)] = cached
+            return cached['index']
+    except (OSError, ValueError):
+        pass
+    cached = {'version': OFFSETS_VERSION, 'stamp': stamp, 'index': scan_offsets(path)}
+    _offsets_memo[os.path.abspath(path)] = cached
+    try:
+        os.makedirs(OFFSETS_DIR, exist_ok=True)
+        tmp = cache_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(cached, f, separators=(',', ':'))
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass  # the in-memory copy still serves this process
+    return cached['index']
+
+
+class SessionReader:
+    """Header keys and steps of one session file, read on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        self._index = load_offsets(path)
+        self._header = None
+        self._data = None
+        if self._index is None:
+            with open(path) as f:
+                self._data = json.load(f)
+
+    def _read_line(self, offset):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.readline().rstrip(b'\r\n').rstrip(b',')
+
+    @property
+    def header(self):
+        """Every top-level key except steps."""
+        if self._header is None:
+            if self._data is not None:
+                self._header = {k: v for k, v in self._data.items() if k != 'steps'}
+            else:
+                self._header = {}
+                with open(self.path, 'rb') as f:
+                    for offset in self._index['keys']:
+                        f.seek(offset)
+                        line = f.readline().rstrip(b'\r\n').rstrip(b',')
+                        self._header.update(json.loads(b'{' + line + b'}'))
+        return self._header
+
+    def get(self, key, default=None):
+        return self.header.get(key, default)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.header[key]
+        if isinstance(key, slice):
+            start, stop, stride = key.indices(len(self))
+            if stride == 1:
+                return self.steps(start, stop)
+            return [self.step(i) for i in range(start, stop, stride)]
+        return self.step(key)
+
+    def __contains__(self, key):
+        return key in self.header
+
+    def __len__(self):
+        if self._data is not None:
+            return len(self._data.get('steps') or [])
+        return len(self._index['steps'])
+
+    def _raw_step(self, i):
+        if self._data is not None:
+            return (self._data.get('steps') or [])[i]
+        return json.loads(self._read_line(self._index['steps'][i]))
+
+    def _raw_steps(self, start, stop):
+        if self._data is not None:
+            yield from (self._data.get('steps') or [])[start:stop]
+            return
+        if start >= stop:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._index['steps'][start])
+            for _ in range(start, stop):
+                yield json.loads(f.readline().rstrip(b'\r\n').rstrip(b','))
+
+    def _screens_before(self, i):
+        """Screen decoding state left by steps 0..i-1 ({field: screen})."""
+        keyframe = i - 1
+        while keyframe >= 0 and not _screen_delta.is_keyframe(self._raw_step(keyframe)):
+            keyframe -= 1
+        if keyframe < 0:
+            return {}
+        return _screen_delta.decode_state(self._raw_steps(keyframe, i))
+
+    def step(self, i):
+        """Step i (negative counts from the end)."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('step index out of range')
+        return next(self.iter_steps(i, i + 1))
+
+    def iter_steps(self, start=0, stop=None):
+        """Yield steps start..stop-1 in order, parsing one line at a time."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        steps = self._raw_steps(start, stop)
+        if 'screenEncoding' in self.header:
+            steps = _screen_delta.expand_steps(steps, self._screens_before(start))
+        if 'checkpointEncoding' in self.header:
+            steps = (_checkpoint_delta.map_holder(step, _checkpoint_delta.expand_checkpoints)
+                     for step in steps)
+        yield from steps
+
+    def steps(self, start=0, stop=None):
+        """Steps start..stop-1 as a list."""
+        return list(self.iter_steps(start, stop))
+
+    def __iter__(self):
+        return self.iter_steps()
+
+    def load(self):
+        """The whole session as json.load() would return it."""
+        if self._data is not None:
+            return self._data
+        items = list(self.header.items())
+        split = self._index['stepsAt']
+        data = dict(items[:split])
+        data['steps'] = list(self._raw_steps(0, len(self)))
+        data.update(items[split:])
+        return data
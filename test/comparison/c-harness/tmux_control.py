@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Persistent tmux control-mode client for the C capture harness.
+
+Every `tmux send-keys` / `tmux capture-pane` subprocess costs a fork+exec of
+a tmux client.  A capture that sends one key and reads the screen a few times
+per step spends most of its wall-clock in process startup.
+
+TmuxControl attaches once to a session with `tmux -C` and pushes commands
+over that single pipe.  Control mode replies to each client command with a
+block:
+
+    %begin <time> <cmdnum> 1
+    ...output lines...
+    %end <time> <cmdnum> 1        (or %error on failure)
+
+Lines outside a block are asynchronous notifications (%session-changed,
+%exit, ...), which we skip.  Pane output notifications are switched off
+with `refresh-client -f no-output` so the pipe stays quiet between commands.
+
+Failures raise subprocess.CalledProcessError, matching what callers already
+catch from the per-command subprocess helpers.
+
+Set WEBHACK_TMUX_CONTROL=0 to disable the control client and fall back to
+one tmux subprocess per command.
+"""
+
+import os
+import subprocess
+
+
+def control_mode_enabled():
+    return os.environ.get('WEBHACK_TMUX_CONTROL', '1') not in ('0', 'false', 'no', '')
+
+
+def quote(arg):
+    """Quote arg as one word of a tmux command line.
+
+    Inside single quotes tmux treats every character literally except the
+    closing quote, so a ' is written as '\\'' (close, escaped quote, reopen).
+    """
+    return "'" + arg.replace("'", "'\\''") + "'"
+
+
+class TmuxControl:
+    """A control-mode tmux client attached to one session."""
+
+    def __init__(self, session):
+        self.session = session
+        self.proc = subprocess.Popen(
+            ['tmux', '-C', 'attach-session', '-t', session],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        # Commands sent before the attach completes run without a current
+        # client, so wait for the attach notification first.
+        while True:
+            line = self._readline()
+            if line.startswith(b'%session-changed'):
+                break
+            if line.startswith(b'%exit'):
+                self.close()
+                raise subprocess.CalledProcessError(1, ['tmux', '-C', 'attach-session', '-t', session])
+        try:
+            self.command('refresh-client -f no-output')
+        except subprocess.CalledProcessError:
+            # Older tmux without client flags: %output lines are skipped.
+            pass
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def _readline(self):
+        line = self.proc.stdout.readline()
+        if not line:
+            raise subprocess.CalledProcessError(1, ['tmux', '-C', 'attach-session', '-t', self.session])
+        return line.rstrip(b'\n')
+
+    def command(self, cmdline):
+        """Run one tmux command and return its output as text."""
+        if not self.alive():
+            raise subprocess.CalledProcessError(1, cmdline)
+        try:
+            self.proc.stdin.write(cmdline.encode('utf-8') + b'\n')
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self.close()
+            raise subprocess.CalledProcessError(1, cmdline)
+
+        # Skip notifications until our reply block starts.
+        while True:
+            line = self._readline()
+            if line.startswith(b'%begin ') and line.endswith(b' 1'):
+                break
+            if line.startswith(b'%exit'):
+                self.close()
+                raise subprocess.CalledProcessError(1, cmdline)
+
+        guard = line.split()[1:]
+        out = []
+        while True:
+            line = self._readline()
+            if line.startswith((b'%end ', b'%error ')) and line.split()[1:] == guard:
+                text = b'\n'.join(out).decode('utf-8', errors='replace')
+                if line.startswith(b'%error '):
+                    raise subprocess.CalledProcessError(1, cmdline, output=text)
+                return text + '\n' if out else ''
+            out.append(line)
+
+    def send_literal(self, keys):
+        """Send keys literally (like `send-keys -l`), as hex to avoid quoting."""
+        data = keys.encode('utf-8')
+        if not data:
+            return
+        hex_bytes = ' '.join(f'{b:02x}' for b in data)
+        self.command(f'send-keys -t {self.session} -H {hex_bytes}')
+
+    def send_special(self, key):
+        """Send a named key such as Enter, Space, Escape, C-v or C-}."""
+        self.command(f'send-keys -t {self.session} {quote(key)}')
+
+    def capture(self, ansi=False, start=0, end=30):
+        """Capture the pane; start/end of None capture just the visible area."""
+        flags = '-p -e -J' if ansi else '-p'
+        if start is not None:
+            flags += f' -S {start}'
+        if end is not None:
+            flags += f' -E {end}'
+        return self.command(f'capture-pane -t {self.session} {flags}')
+
+    def sync(self, max_captures=5):
+        """Return once the pane has caught up with the output already written.
+
+        tmux reads the pane's pty asynchronously, so output flushed just
+        before a command arrives may not be parsed yet; wait until two
+        consecutive captures agree.
+        """
+        prev = self.capture(start=None, end=None)
+        for _ in range(max_captures):
+            cur = self.capture(start=None, end=None)
+            if cur == prev:
+                return
+            prev = cur
+
+    def close(self):
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+
+
+# One client per tmux session name, created on first use.
+_clients = {}
+
+
+def get_client(session):
+    """Return a live control client for session, or None if unavailable."""
+    if not control_mode_enabled():
+        return None
+    client = _clients.get(session)
+    if client is not None and client.alive():
+        return client
+    try:
+        client = TmuxControl(session)
+    except (OSError, subprocess.CalledProcessError):
+        _clients.pop(session, None)
+        return None
+    _clients[session] = client
+    return client
+
+
+def close_client(session):
+    client = _clients.pop(session, None)
+    if client is not None:
+        client.close()
+
+
+def kill_session(session):
+    """Detach our control client and kill the tmux session."""
+    close_client(session)
+    subprocess.run(['tmux', 'kill-session', '-t', session], capture_output=True)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""typGrid codec on NumPy arrays.
+
+A typGrid is the levl[x][y].typ grid of one level: GRID_ROWS rows of
+GRID_COLS terrain type codes, held here as a uint8 array of that shape.
+Parsing, RLE and comparison are done with array operations instead of
+per-cell Python, so batch map generation and trace analysis over
+thousands of levels is bound by I/O rather than the interpreter.
+
+    grid = read_dumpmap(path)          # #dumpmap output, None if missing
+    rows = parse_dumpmap(path)         # the same as lists, for session JSON
+    text = encode_rle(grid)            # "3:0,p,5:p|..." as in sessions
+    grid = decode_rle(text)            # as decodeRleGrid() in session_loader.js
+    grids_equal(a, b), grid_diff(a, b)
+
+encode_rle() matches run_session.encode_typgrid_rle() byte for byte; use
+grid.tolist() where session JSON stores plain rows.
+
+Requires NumPy (pip install numpy), except parse_dumpmap(): the map
+generators import this module only for that, so they still run without
+NumPy, parsing line by line as they used to.
+"""
+
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+GRID_ROWS = 21
+GRID_COLS = 80
+
+# typ code -> RLE character: 0-9 -> '0'-'9', 10-35 -> 'a'-'z', else '?'
+_RLE_CHARS = [str(v) if v < 10 else chr(ord('a') + v - 10) if v < 36 else '?' for v in range(256)]
+
+if np is not None:
+    DTYPE = np.uint8
+
+    # Run token for run length n and code v at [n * 256 + v], for n <= GRID_COLS
+    _RLE_TOKENS = np.array([_RLE_CHARS[v] if n == 1 else f'{n}:{_RLE_CHARS[v]}'
+                            for n in range(GRID_COLS + 1) for v in range(256)], dtype=object)
+
+    # RLE character byte -> typ code, as decodeCell() (unknown characters are 0)
+    _RLE_VALUES = np.zeros(256, dtype=DTYPE)
+    _RLE_VALUES[ord('0'):ord('9') + 1] = np.arange(10)
+    _RLE_VALUES[ord('a'):ord('z') + 1] = np.arange(10, 36)
+    _RLE_VALUES[ord('A'):ord('Z') + 1] = np.arange(10, 36)
+
+    # Every token encode_rle() writes -> (count, code)
+    _TOKEN_RUNS = {_RLE_TOKENS[n * 256 + v]: (n, v) for n in range(1, GRID_COLS + 1) for v in range(36)}
+
+
+def as_grid(grid):
+    """grid (nested lists or an array) as a uint8 array."""
+    return np.asarray(grid, dtype=DTYPE)
+
+
+def parse_dumpmap_bytes(data, cols=GRID_COLS):
+    """Parse #dumpmap output (whitespace-separated codes, one row per line).
+
+    Returns an array of shape (rows, cols).  Raises ValueError if the
+    number of codes is not a whole number of rows.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    digit = (buf >= ord('0')) & (buf <= ord('9'))
+    edges = np.diff(np.concatenate(([0], digit.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    lengths = np.flatnonzero(edges == -1) - starts
+    values = np.zeros(len(starts), dtype=np.int32)
+    for k in range(int(lengths.max()) if len(lengths) else 0):
+        more = lengths > k
+        values[more] = values[more] * 10 + (buf[starts[more] + k] - ord('0'))
+    if len(values) % cols:
+        raise ValueError(f'dumpmap has {len(values)} codes, not a multiple of {cols}')
+    return values.astype(DTYPE).reshape(-1, cols)
+
+
+def parse_dumpmap(path):
+    """Rows of a #dumpmap file as lists of ints, as session JSON stores them.
+
+    A partial dump (the game still writing it) gives the lines read so far,
+    the last one possibly short.  Works without NumPy.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if np is not None:
+        try:
+            return parse_dumpmap_bytes(data).tolist()
+        except ValueError:
+            pass
+    return [[int(x) for x in line.split()] for line in data.decode('ascii', 'replace').splitlines()]
+
+
+def read_dumpmap(path, rows=GRID_ROWS):
+    """Read a #dumpmap file; None if it is missing or not rows full rows."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        try:
+            grid = parse_dumpmap_bytes(f.read())
+        except ValueError:
+            return None
+    return grid if len(grid) == rows else None
+
+
+def encode_rle(grid):
+    """RLE text of grid: rows joined by '|', runs as "count:char" or "char".
+
+    Trailing zero runs are left out, so an all-zero row is "".
+    """
+    grid = as_grid(grid)
+    nrows, ncols = grid.shape
+    if ncols > GRID_COLS:
+        raise ValueError(f'typGrid rows are {ncols} wide, at most {GRID_COLS} supported')
+    if ncols == 0:
+        return '|'.join([''] * nrows)
+    starts = np.ones(grid.shape, dtype=bool)
+    starts[:, 1:] = grid[:, 1:] != grid[:, :-1]
+    run_rows, run_cols = np.nonzero(starts)
+    run_ends = np.full(len(run_cols), ncols)
+    same_row = run_rows[1:] == run_rows[:-1]
+    run_ends[:-1][same_row] = run_cols[1:][same_row]
+    run_values = grid[run_rows, run_cols]
+    keep = (run_values != 0) | (run_ends != ncols)
+    counts = (run_ends - run_cols)[keep]
+    values = run_values[keep].astype(np.intp)
+    tokens = _RLE_TOKENS[counts * 256 + values].tolist()
+    bounds = np.searchsorted(run_rows[keep], np.arange(nrows + 1)).tolist()
+    return '|'.join(','.join(tokens[bounds[y]:bounds[y + 1]]) for y in range(nrows))
+
+
+def _parse_token(token):
+    """(count, code) of an RLE run token as decodeRleGridRow() reads it, or None."""
+    count, sep, cell = token.partition(':')
+    if not sep:
+        count, cell = '1', token
+    if not (count.isascii() and count.isdigit()) or int(count) < 1:
+        return None
+    if cell.isascii() and cell.isdigit():
+        return int(count), int(cell)
+    code = ord(cell[0]) if cell else 0
+    return int(count), int(_RLE_VALUES[code]) if code < 256 else 0
+
+
+def decode_rle(text, rows=GRID_ROWS, cols=GRID_COLS):
+    """Grid of RLE text, padded or cut to rows x cols like decodeRleGrid()."""
+    counts = []
+    values = []
+    row_texts = text.split('|')[:rows]
+    for row in row_texts:
+        filled = 0
+        for token in row.split(','):
+            run = _TOKEN_RUNS.get(token) or (_parse_token(token) if token else None)
+            if run is None:
+                continue
+            count = min(run[0], cols - filled)
+            if count <= 0:
+                break
+            counts.append(count)
+            values.append(run[1])
+            filled += count
+        if filled < cols:
+            counts.append(cols - filled)
+            values.append(0)
+    if len(row_texts) < rows:
+        counts.append((rows - len(row_texts)) * cols)
+        values.append(0)
+    return np.repeat(np.array(values, dtype=DTYPE), counts).reshape(rows, cols)
+
+
+def grids_equal(a, b):
+    """True if a and b hold the same codes in the same shape."""
+    return np.array_equal(as_grid(a), as_grid(b))
+
+
+def grid_diff(a, b):
+    """(row, col) pairs where grids a and b differ, as an (n, 2) array."""
+    return np.argwhere(as_grid(a) != as_grid(b))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Read the typGrid snapshots the C game writes on its own.
+
+With 020-typgrid-autodump.patch, C NetHack appends a record to
+$NETHACK_TYPGRID_LOG whenever the hero is on a new level or the terrain
+changed since the last key read, just before its input-wait marker:
+
+    typgrid <seq> <dnum> <dlevel> <depth>
+    <21 rows of 80 space-separated typ codes, as #dumpmap writes them>
+
+TypGridTailer reads records as they are appended, so captures get a
+typGrid at every terrain change without sending #dumpmap (and clearing
+its --More--) into the game.  seq is the number of key reads so far, the
+same count as the input-wait marker that follows the record.
+
+The snapshots are opt-in until the patch has been built and checked
+against #dumpmap captures: set WEBHACK_TYPGRID_LOG=1 to use them.
+Otherwise (and without the patch) captures keep typing #dumpmap.
+"""
+
+import os
+
+ENV_VAR = 'NETHACK_TYPGRID_LOG'
+GRID_ROWS = 21
+
+_binary_support = {}
+
+
+def typgrid_log_enabled():
+    return os.environ.get('WEBHACK_TYPGRID_LOG', '0') not in ('0', 'false', 'no', '')
+
+
+def binary_supports_typgrid_log(binary):
+    """True if the C binary was built with the typGrid autodump patch."""
+    if binary not in _binary_support:
+        try:
+            with open(binary, 'rb') as f:
+                _binary_support[binary] = ENV_VAR.encode('ascii') in f.read()
+        except OSError:
+            _binary_support[binary] = False
+    return _binary_support[binary]
+
+
+def parse_record(lines):
+    """Turn a header line and GRID_ROWS grid lines into a record dict."""
+    _, seq, dnum, dlevel, depth = lines[0].split()
+    grid = [[int(x) for x in line.split()] for line in lines[1:]]
+    return {
+        'seq': int(seq),
+        'dnum': int(dnum),
+        'dlevel': int(dlevel),
+        'depth': int(depth),
+        'grid': grid,
+    }
+
+
+class TypGridTailer:
+    """Reads typGrid records appended to a log file since the last call."""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.latest = None
+
+    def read_new_records(self):
+        """Return records completed since the last call, oldest first.
+
+        A record the game is still writing stays in the file and is
+        returned by a later call.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        records = []
+        pos = 0
+        while True:
+            lines = []
+            end = pos
+            while len(lines) < GRID_ROWS + 1:
+                nl = data.find(b'\n', end)
+                if nl < 0:
+                    break
+                lines.append(data[end:nl].decode('ascii'))
+                end = nl + 1
+            if len(lines) < GRID_ROWS + 1:
+                break
+            if not lines[0].startswith('typgrid '):
+                raise ValueError(f'{self.path}: bad typGrid record header {lines[0]!r}')
+            records.append(parse_record(lines))
+            pos = end
+        self.offset += pos
+        if records:
+            self.latest = records[-1]
+        return records
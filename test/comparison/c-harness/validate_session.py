@@ -5,23 +5,46 @@ This script replays a recorded session in the C harness and verifies that
 the messages (line 0) match between the recording and the replay.
 
 Usage:
-    python3 validate_session.py <session_json>
-    python3 validate_session.py --all  # Validate all gameplay sessions
+    python3 validate_session.py <session_json> [--fail-fast-per-session | --bisect]
+    python3 validate_session.py --all [--jobs N] [--fail-fast-per-session | --bisect]
+                                      [--jsonl PATH]
     python3 validate_session.py --from-config  # Validate sessions from seeds.json
 
 This helps detect when:
 - The RNG has diverged and the map is different
 - Combat outcomes are different
 - Item interactions differ from the recording
+
+--fail-fast-per-session stops replaying a session at its first divergent
+message instead of playing it to the end.
+
+--bisect looks for the first divergent step with probes instead of one
+key-by-key replay.  Each probe starts a fresh game, fast-forwards the
+first n keys (run_session.fast_forward) and compares the RNG call count
+and message line with the recording after step n.  A session whose last
+step matches passes after one probe; otherwise the first divergent step is
+found in O(log n) probes, assuming a game that has diverged stays
+diverged.  Probes need the input-wait and fast-forward patches; without
+them (or for keylog sessions, whose keys include the Spaces for --More--)
+keys are replayed one at a time.
+
+--jobs N validates up to N sessions at once, each in its own worker
+process with its own tmux session, temp directory and HOME/playground
+sandbox.  --jsonl PATH appends a summary of the run in the shape of an
+oracle/results.jsonl entry as oracle/rebuild.sh writes them, per-session
+session_detail included (with RNG match counts from --bisect).
 """
 
 import sys
 import os
+import re
 import json
 import time
 import subprocess
 import shutil
 import tempfile
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.normpath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
@@ -31,6 +54,27 @@ INSTALL_DIR = os.path.join(PROJECT_ROOT, 'nethack-c', 'install', 'games', 'lib',
 NETHACK_BINARY = os.path.join(INSTALL_DIR, 'nethack')
 DEFAULT_FIXED_DATETIME = '20000110090000'
 
+# Private HOME and playground per capture (see capture_sandbox.py).
+_cs_spec = importlib.util.spec_from_file_location('capture_sandbox', os.path.join(SCRIPT_DIR, 'capture_sandbox.py'))
+_capture_sandbox = importlib.util.module_from_spec(_cs_spec)
+_cs_spec.loader.exec_module(_capture_sandbox)
+
+# Session catalog (see session_index.py).
+_si_spec = importlib.util.spec_from_file_location('session_index', os.path.join(SCRIPT_DIR, 'session_index.py'))
+_session_index = importlib.util.module_from_spec(_si_spec)
+_si_spec.loader.exec_module(_session_index)
+
+# Random-access session reader (see session_reader.py).
+_sr_spec = importlib.util.spec_from_file_location('session_reader', os.path.join(SCRIPT_DIR, 'session_reader.py'))
+_session_reader = importlib.util.module_from_spec(_sr_spec)
+_sr_spec.loader.exec_module(_session_reader)
+SessionReader = _session_reader.SessionReader
+
+# Game control with input-wait markers and fast-forward, for --bisect probes.
+_rs_spec = importlib.util.spec_from_file_location('run_session', os.path.join(SCRIPT_DIR, 'run_session.py'))
+_run_session = importlib.util.module_from_spec(_rs_spec)
+_rs_spec.loader.exec_module(_run_session)
+
 
 def harness_fixed_datetime():
     dt = os.environ.get('NETHACK_FIXED_DATETIME')
@@ -81,10 +125,13 @@ def extract_message_line(screen_lines):
     return msg
 
 
-def setup_home(options):
-    """Set up .nethackrc with character options."""
-    os.makedirs(RESULTS_DIR, exist_ok=True)
-    nethackrc = os.path.join(RESULTS_DIR, '.nethackrc')
+def setup_home(tmpdir, options):
+    """Create a capture sandbox in tmpdir with .nethackrc for character options.
+
+    Returns (home, nethackdir), the HOME and NETHACKDIR to launch with.
+    """
+    home, nethackdir = _capture_sandbox.create_sandbox(tmpdir, INSTALL_DIR)
+    nethackrc = os.path.join(home, '.nethackrc')
     with open(nethackrc, 'w') as f:
         f.write(f'OPTIONS=name:{options.get("name", "Wizard")}\n')
         f.write(f'OPTIONS=race:{options.get("race", "human")}\n')
@@ -94,23 +141,7 @@ def setup_home(options):
         f.write('OPTIONS=!autopickup\n')
         f.write('OPTIONS=suppress_alert:3.4.3\n')
         f.write('OPTIONS=symset:DECgraphics\n')
-
-    # Clean up stale game state
-    import glob
-    save_dir = os.path.join(INSTALL_DIR, 'save')
-    if os.path.isdir(save_dir):
-        for f in glob.glob(os.path.join(save_dir, '*')):
-            try:
-                os.unlink(f)
-            except FileNotFoundError:
-                pass
-    for pattern in ['*wizard*', '*Wizard*', 'bon*']:
-        for f in glob.glob(os.path.join(INSTALL_DIR, pattern)):
-            if not f.endswith('.lua'):
-                try:
-                    os.unlink(f)
-                except FileNotFoundError:
-                    pass
+    return home, nethackdir
 
 
 def clear_more_prompts(session, max_iterations=10):
@@ -206,6 +237,23 @@ def send_char(session_name, ch):
         tmux_send(session_name, ch)
 
 
+def recorded_message(step):
+    """Message line the recording shows after step, or None.
+
+    Sessions store the screen rather than the message: line 0 of `screen`
+    (ANSI-RLE text or a list of lines), read like a live capture.  A `msg`
+    field, if a step has one, takes precedence.
+    """
+    if step.get('msg') is not None:
+        return step['msg']
+    screen = step.get('screen')
+    if isinstance(screen, str):
+        screen = screen.split('\n')
+    if not isinstance(screen, list) or not screen:
+        return None
+    return extract_message_line([_run_session.strip_ansi_sequences(screen[0])])
+
+
 def normalize_message(msg):
     """Normalize a message for comparison."""
     if not msg:
@@ -240,27 +288,29 @@ def messages_match(expected, actual):
     return False
 
 
-def validate_session(session_path, verbose=False):
+def validate_session(session_path, verbose=False, fail_fast=False):
     """Validate a session by replaying and checking messages.
 
+    With fail_fast, the replay stops at the first divergence.
+
     Returns a dict with:
         - passed: bool
         - total_steps: int
         - messages_checked: int
         - divergences: list of {step, expected, actual}
     """
-    with open(session_path) as f:
-        session_data = json.load(f)
+    # Steps are parsed one line at a time as the replay reaches them.
+    session_data = SessionReader(session_path)
 
     seed = session_data.get('seed', 0)
     options = session_data.get('options', {})
-    steps = session_data.get('steps', [])
+    steps = session_data
     regen = session_data.get('regen', {})
     moves = regen.get('moves', '')
 
     if not moves and len(steps) > 1:
         # Extract moves from steps
-        moves = ''.join(s.get('key', '') or '' for s in steps[1:] if s.get('key'))
+        moves = ''.join(s.get('key', '') or '' for s in steps.iter_steps(1) if s.get('key'))
 
     result = {
         'session': os.path.basename(session_path),
@@ -271,17 +321,16 @@ def validate_session(session_path, verbose=False):
         'divergences': [],
     }
 
-    setup_home(options)
-
     tmpdir = tempfile.mkdtemp(prefix='webhack-validate-')
+    home, nethackdir = setup_home(tmpdir, options)
     session_name = f'webhack-validate-{seed}-{os.getpid()}'
 
     try:
         cmd = (
-            f'NETHACKDIR={INSTALL_DIR} '
+            f'NETHACKDIR={nethackdir} '
             f'{fixed_datetime_env()}'
             f'NETHACK_SEED={seed} '
-            f'HOME={RESULTS_DIR} '
+            f'HOME={home} '
             f'TERM=xterm-256color '
             f'{NETHACK_BINARY} -u {options.get("name", "Wizard")} -D; '
             f'sleep 999'
@@ -302,7 +351,7 @@ def validate_session(session_path, verbose=False):
         # Check startup message
         if steps:
             startup_step = steps[0]
-            expected_msg = startup_step.get('msg')
+            expected_msg = recorded_message(startup_step)
             screen_lines = capture_screen_lines(session_name)
             actual_msg = extract_message_line(screen_lines)
 
@@ -322,7 +371,10 @@ def validate_session(session_path, verbose=False):
 
         # Replay moves and check messages
         move_idx = 0
-        for step_idx, step in enumerate(steps[1:], 1):
+        for step_idx, step in enumerate(steps.iter_steps(1), 1):
+            if fail_fast and result['divergences']:
+                result['stopped_early'] = True
+                break
             key = step.get('key', '')
             if not key:
                 continue
@@ -333,7 +385,7 @@ def validate_session(session_path, verbose=False):
             clear_more_prompts(session_name)
 
             # Capture and check message
-            expected_msg = step.get('msg')
+            expected_msg = recorded_message(step)
             screen_lines = capture_screen_lines(session_name)
             actual_msg = extract_message_line(screen_lines)
 
@@ -376,52 +428,346 @@ def validate_session(session_path, verbose=False):
     return result
 
 
-def validate_all_sessions(verbose=False):
-    """Validate all gameplay sessions."""
-    import glob
+def replay_plan(session_path):
+    """What a --bisect probe needs from a session, read once.
 
-    sessions = glob.glob(os.path.join(SESSIONS_DIR, '*_gameplay.session.json'))
-    sessions += glob.glob(os.path.join(SESSIONS_DIR, '*_selfplay*.session.json'))
-    sessions += glob.glob(os.path.join(SESSIONS_DIR, '*_wizard.session.json'))
+    'states' has the recorded state after startup and after each gameplay
+    key: (step index, key, RNG calls so far, message).  'rng' is False for
+    sessions recorded without RNG logs; only messages are compared then.
+    """
+    reader = SessionReader(session_path)
+    regen = reader.get('regen', {}) or {}
+    states = []
+    rng_calls = 0
+    has_rng = False
+    for step_idx, step in enumerate(reader):
+        rng = step.get('rng')
+        if isinstance(rng, list):
+            has_rng = True
+            rng_calls += sum(1 for entry in rng if _session_index.is_rng_call(entry))
+        key = step.get('key')
+        if step_idx == 0:
+            states.append((0, None, rng_calls, recorded_message(step)))
+        elif isinstance(key, str) and key:
+            states.append((step_idx, key, rng_calls, recorded_message(step)))
+    return {
+        'session': os.path.basename(session_path),
+        'seed': reader.get('seed', 0),
+        'options': reader.get('options', {}) or {},
+        'raw': _run_session.raw_moves_session(regen),
+        'rng': has_rng,
+        'total_steps': len(reader),
+        'states': states,
+    }
 
-    results = []
-    for session_path in sorted(sessions):
-        print(f'\n=== Validating {os.path.basename(session_path)} ===')
-        result = validate_session(session_path, verbose=verbose)
-        results.append(result)
 
-        status = 'PASS' if result['passed'] else 'FAIL'
-        print(f'  Result: {status} ({result["messages_matched"]}/{result["messages_checked"]} messages)')
+def probe_state(plan, replayed, verbose=False):
+    """Replay the first replayed gameplay keys of plan in a fresh game.
+
+    Returns {replayed, step, key, match, expectedRng, actualRng, expected,
+    actual}: the game state after those keys against the recording.
+    """
+    step_idx, key, expected_rng, expected_msg = plan['states'][replayed]
+    keys = ''.join(state[1] for state in plan['states'][1:replayed + 1])
+    seed = plan['seed']
+    options = plan['options']
+
+    tmpdir = tempfile.mkdtemp(prefix='webhack-bisect-')
+    home, nethackdir = setup_home(tmpdir, options)
+    rng_log_file = os.path.join(tmpdir, 'rnglog.txt')
+    session_name = f'webhack-bisect-{seed}-{os.getpid()}'
+
+    try:
+        cmd = (
+            f'NETHACKDIR={nethackdir} '
+            f'{fixed_datetime_env()}'
+            f'NETHACK_SEED={seed} '
+            f'NETHACK_RNGLOG={rng_log_file} '
+            f'{_run_session.rng_log_format_env()}'
+            f'{_run_session.input_wait_env(session_name, tmpdir)}'
+            f'{"" if plan["raw"] else _run_session.fast_forward_env(session_name, tmpdir)}'
+            f'HOME={home} '
+            f'TERM=xterm-256color '
+            f'{NETHACK_BINARY} -u {options.get("name", "Wizard")} -D; '
+            f'sleep 999'
+        )
+        _run_session.start_game_session(session_name, cmd)
+        _run_session.wait_for_input(session_name, 1.0)
+        _run_session.wait_for_game_ready(session_name, rng_log_file)
+        _run_session.wait_for_input(session_name)
+        _run_session.clear_more_prompts(session_name)
+        _run_session.wait_for_input(session_name)
+
+        if keys and (plan['raw'] or not _run_session.fast_forward(session_name, keys)):
+            for ch in keys:
+                _run_session.send_keys(session_name, ch)
+                _run_session.wait_for_input(session_name)
+                if not plan['raw']:
+                    _run_session.clear_more_prompts(session_name)
+        _run_session.wait_for_input(session_name)
+
+        _, lines = _run_session.read_rng_log(rng_log_file)
+        actual_rng = sum(1 for entry in _run_session.parse_rng_lines(lines)
+                         if _session_index.is_rng_call(entry))
+        actual_msg = extract_message_line(_run_session.capture_screen_lines(session_name))
+    finally:
+        _run_session.tmux_kill_session(session_name)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    match = messages_match(expected_msg, actual_msg) if expected_msg is not None else True
+    if plan['rng']:
+        match = match and actual_rng == expected_rng
+    probe = {
+        'replayed': replayed,
+        'step': step_idx,
+        'key': key,
+        'match': match,
+        'expectedRng': expected_rng if plan['rng'] else None,
+        'actualRng': actual_rng,
+        'expected': expected_msg,
+        'actual': actual_msg,
+    }
+    if verbose:
+        status = 'ok' if match else 'DIVERGE'
+        print(f'  probe {replayed} keys (step {step_idx}): {status}, '
+              f'RNG {actual_rng}/{probe["expectedRng"]}')
+    return probe
+
+
+def bisect_session(session_path, verbose=False):
+    """Find the first divergent step of a session by bisection (see --bisect).
+
+    Returns a dict like validate_session()'s, with the first divergence as
+    the only entry of divergences and every probe under probes.
+    """
+    result = {
+        'session': os.path.basename(session_path),
+        'passed': True,
+        'mode': 'bisect',
+        'divergences': [],
+        'probes': [],
+    }
+    try:
+        plan = replay_plan(session_path)
+        result['total_steps'] = plan['total_steps']
+        last = len(plan['states']) - 1
+
+        def probe(replayed):
+            state = probe_state(plan, replayed, verbose)
+            result['probes'].append(state)
+            return state
+
+        first = probe(last)
+        good = last
+        if not first['match']:
+            good = None
+            if last > 0 and probe(0)['match']:
+                good, bad = 0, last
+                while bad - good > 1:
+                    mid = (good + bad) // 2
+                    state = probe(mid)
+                    if state['match']:
+                        good = mid
+                    else:
+                        bad, first = mid, state
+            elif last > 0:
+                first = result['probes'][-1]
+            result['passed'] = False
+            result['divergences'].append({
+                'step': first['step'],
+                'key': first['key'],
+                'expected': first['expected'],
+                'actual': first['actual'],
+                'expectedRng': first['expectedRng'],
+                'actualRng': first['actualRng'],
+            })
+        if plan['rng']:
+            # RNG calls replayed in step with the recording, as in rebuild.sh's rngCalls
+            result['metrics'] = {'rngCalls': {
+                'matched': plan['states'][good][2] if good is not None else 0,
+                'total': plan['states'][last][2],
+            }}
+    except Exception as e:
+        result['passed'] = False
+        result['error'] = str(e)
+        if verbose:
+            print(f'  ERROR: {e}')
+    return result
+
+
+def run_validation(session_path, bisect=False, fail_fast=False, verbose=False):
+    """Validate one session in the chosen mode; adds its duration in seconds."""
+    start = time.time()
+    if bisect:
+        result = bisect_session(session_path, verbose=verbose)
+    else:
+        result = validate_session(session_path, verbose=verbose, fail_fast=fail_fast)
+    result['duration'] = time.time() - start
+    return result
+
+
+def describe_result(result):
+    """One-line status of a validation result."""
+    status = 'PASS' if result['passed'] else 'FAIL'
+    if 'error' in result:
+        return f'{status} (error: {result["error"]})'
+    if result.get('mode') == 'bisect':
+        detail = f'{len(result["probes"])} probes'
+        if result['divergences']:
+            detail += f', first divergence at step {result["divergences"][0]["step"]}'
+        return f'{status} ({detail})'
+    return f'{status} ({result["messages_matched"]}/{result["messages_checked"]} messages)'
+
+
+def git_commit_info():
+    """commit, parent, date, author and message of HEAD, as the test-log hook records them."""
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=PROJECT_ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ''
+    return {
+        'commit': git('rev-parse', '--short=8', 'HEAD'),
+        'parent': git('rev-parse', 'HEAD^')[:7],
+        'date': git('show', '-s', '--format=%cI', 'HEAD'),
+        'author': git('show', '-s', '--format=%an', 'HEAD'),
+        'message': git('show', '-s', '--format=%s', 'HEAD'),
+    }
+
+
+def results_entry(results, categories):
+    """Summary of a validation run shaped like an oracle/results.jsonl entry.
+
+    The fields are those oracle/rebuild.sh writes: stats, sessions, metrics,
+    categories and one session_detail item per session (s, t, p and the RNG,
+    screen and grid match counts, 0 where this run does not measure them).
+    Only --bisect measures RNG calls.  Session names lose "_gameplay" as in
+    rebuild.sh, so they line up with the dashboard's earlier entries.
+    """
+    entry = git_commit_info()
+    passed = sum(1 for r in results if r['passed'])
+    entry['stats'] = {
+        'total': len(results),
+        'pass': passed,
+        'fail': len(results) - passed,
+    }
+    entry['sessions'] = len(results)
+    detail = []
+    for result in results:
+        rng = (result.get('metrics') or {}).get('rngCalls') or {}
+        detail.append({
+            's': re.sub(r'_gameplay\.session\.json$', '.session.json', result['session']),
+            't': categories.get(result['session'], 'gameplay'),
+            'p': result['passed'],
+            'rm': rng.get('matched', 0),
+            'rt': rng.get('total', 0),
+            'sm': 0,
+            'st': 0,
+            'gm': 0,
+            'gt': 0,
+        })
+    entry['metrics'] = {
+        'rng': {'matched': sum(d['rm'] for d in detail), 'total': sum(d['rt'] for d in detail)},
+        'screens': {'matched': 0, 'total': 0},
+        'grids': {'matched': 0, 'total': 0},
+    }
+    entry['categories'] = {}
+    for d in detail:
+        category = entry['categories'].setdefault(d['t'], {'total': 0, 'pass': 0, 'fail': 0})
+        category['total'] += 1
+        category['pass' if d['p'] else 'fail'] += 1
+    entry['session_detail'] = detail
+    return entry
+
+
+def validate_all_sessions(verbose=False, jobs=1, bisect=False, fail_fast=False, jsonl_path=None):
+    """Validate all gameplay sessions (session_index.GAMEPLAY_PATTERNS).
+
+    Up to jobs sessions run at once.  Returns the results, sorted by session.
+    """
+    index = _session_index.load_index()
+    keys = _session_index.select_gameplay(index, directory=SESSIONS_DIR)
+    sessions = [_session_index.session_path(key) for key in keys]
+    categories = {os.path.basename(_session_index.session_path(key)): index[key]['type'] for key in keys}
+
+    start = time.time()
+    results = []
+    if jobs <= 1:
+        for session_path in sessions:
+            print(f'\n=== Validating {os.path.basename(session_path)} ===')
+            result = run_validation(session_path, bisect, fail_fast, verbose)
+            results.append(result)
+            print(f'  Result: {describe_result(result)}')
+    else:
+        print(f'Validating {len(sessions)} sessions with {jobs} workers')
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(run_validation, path, bisect, fail_fast, verbose): path
+                       for path in sessions}
+            for n, future in enumerate(as_completed(futures), 1):
+                name = os.path.basename(futures[future])
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'session': name, 'passed': False, 'divergences': [], 'error': repr(e)}
+                results.append(result)
+                print(f'[{n}/{len(sessions)}] {name}: {describe_result(result)}')
+        results.sort(key=lambda r: r['session'])
+    duration = time.time() - start
 
     # Summary
     passed = sum(1 for r in results if r['passed'])
     total = len(results)
     print(f'\n=== Summary ===')
-    print(f'Passed: {passed}/{total}')
+    print(f'Passed: {passed}/{total} in {duration:.1f}s')
+
+    if jsonl_path:
+        with open(jsonl_path, 'a') as f:
+            f.write(json.dumps(results_entry(results, categories), separators=(',', ':')) + '\n')
+        print(f'Appended results to {jsonl_path}')
 
     return results
 
 
 def main():
-    verbose = '--verbose' in sys.argv or '-v' in sys.argv
-    args = [a for a in sys.argv[1:] if not a.startswith('-')]
+    argv = sys.argv[1:]
+    jobs = 1
+    jsonl_path = None
+    if '--jobs' in argv:
+        idx = argv.index('--jobs')
+        jobs = max(1, int(argv[idx + 1]))
+        argv = argv[:idx] + argv[idx + 2:]
+    if '--jsonl' in argv:
+        idx = argv.index('--jsonl')
+        jsonl_path = argv[idx + 1]
+        argv = argv[:idx] + argv[idx + 2:]
+    verbose = '--verbose' in argv or '-v' in argv
+    bisect = '--bisect' in argv
+    fail_fast = '--fail-fast-per-session' in argv
+    args = [a for a in argv if not a.startswith('-')]
+
+    if (args or '--all' in argv) and not os.path.isfile(NETHACK_BINARY):
+        print(f'Error: nethack binary not found at {NETHACK_BINARY}')
+        print(f"Run setup.sh first: bash {os.path.join(SCRIPT_DIR, 'setup.sh')}")
+        sys.exit(1)
 
-    if '--all' in sys.argv:
-        validate_all_sessions(verbose=verbose)
+    if '--all' in argv:
+        results = validate_all_sessions(verbose=verbose, jobs=jobs, bisect=bisect,
+                                        fail_fast=fail_fast, jsonl_path=jsonl_path)
+        sys.exit(0 if all(r['passed'] for r in results) else 1)
     elif len(args) >= 1:
         session_path = args[0]
         if not os.path.isabs(session_path):
             session_path = os.path.join(SESSIONS_DIR, session_path)
-        result = validate_session(session_path, verbose=True)
-        status = 'PASS' if result['passed'] else 'FAIL'
-        print(f'\nResult: {status}')
+        result = run_validation(session_path, bisect, fail_fast, verbose=True)
+        print(f'\nResult: {describe_result(result)}')
         if result['divergences']:
             print(f'Divergences: {len(result["divergences"])}')
             for d in result['divergences'][:5]:
                 print(f'  Step {d["step"]}: expected "{d["expected"]}", got "{d["actual"]}"')
     else:
-        print(f'Usage: {sys.argv[0]} <session_json>')
-        print(f'       {sys.argv[0]} --all')
+        print(f'Usage: {sys.argv[0]} <session_json> [--fail-fast-per-session | --bisect]')
+        print(f'       {sys.argv[0]} --all [--jobs N] [--fail-fast-per-session | --bisect] [--jsonl PATH]')
         sys.exit(1)
 
 
@@ -64,6 +64,190 @@ function deriveType(raw, fileName) {
     return 'gameplay';
 }
 
+// Optional interned RNG encoding written by the C harness
+// (compact_session_json with rng_encoding 'interned'): each call entry is
+// [call, result] or [call, result, site], indexing raw.rngTable.calls and
+// raw.rngTable.sites.  Other entries (midlog, events) remain strings.
+const RNG_TABLE_VERSION = 1;
+
+function expandRngEntries(rng, table) {
+    return rng.map((entry) => {
+        if (!Array.isArray(entry)) return entry;
+        const [call, result, site] = entry;
+        const text = `${table.calls[call]}=${result}`;
+        return entry.length > 2 ? `${text} @ ${table.sites[site]}` : text;
+    });
+}
+
+export function expandSessionRng(raw) {
+    const table = raw?.rngTable;
+    if (!table) return raw;
+    if (table.version !== RNG_TABLE_VERSION) {
+        throw new Error(`unsupported rngTable version ${table.version}`);
+    }
+    const expandHolder = (holder) => (Array.isArray(holder?.rng)
+        ? { ...holder, rng: expandRngEntries(holder.rng, table) }
+        : holder);
+    const { rngTable: _table, ...out } = raw;
+    if (out.startup) out.startup = expandHolder(out.startup);
+    if (Array.isArray(out.steps)) out.steps = out.steps.map(expandHolder);
+    if (Array.isArray(out.levels)) out.levels = out.levels.map(expandHolder);
+    return out;
+}
+
+// Optional screen delta encoding written by the C harness
+// (compact_session_json with screen_encoding 'delta', see screen_delta.py):
+// keyframe steps keep `screen`/`screenAnsi`, other steps store
+// `screenDelta`/`screenAnsiDelta` = [lineCount, [row, col, cut, text], ...]
+// against the same field of the nearest earlier step that has it.
+const SCREEN_ENCODING_VERSION = 1;
+const SCREEN_FIELDS = ['screen', 'screenAnsi'];
+
+function isScreenValue(value) {
+    return typeof value === 'string'
+        || (Array.isArray(value) && value.every((line) => typeof line === 'string'));
+}
+
+function applyScreenDelta(prev, delta) {
+    const lines = typeof prev === 'string' ? prev.split('\n') : [...prev];
+    const [count, ...edits] = delta;
+    while (lines.length < count) lines.push('');
+    for (const [row, col, cut, text] of edits) {
+        const line = lines[row];
+        lines[row] = line.slice(0, col) + text + line.slice(col + cut);
+    }
+    lines.length = count;
+    return typeof prev === 'string' ? lines.join('\n') : lines;
+}
+
+export function expandSessionScreens(raw) {
+    const encoding = raw?.screenEncoding;
+    if (!encoding) return raw;
+    if (encoding.version !== SCREEN_ENCODING_VERSION) {
+        throw new Error(`unsupported screenEncoding version ${encoding.version}`);
+    }
+    const { screenEncoding: _encoding, ...out } = raw;
+    let prev = {};
+    if (Array.isArray(out.steps)) out.steps = out.steps.map((step) => {
+        if (!step || typeof step !== 'object') return step;
+        const hasDelta = SCREEN_FIELDS.some((field) => `${field}Delta` in step);
+        const hasScreen = SCREEN_FIELDS.some((field) => isScreenValue(step[field]));
+        if (hasScreen && !hasDelta) prev = {};
+        let row = step;
+        if (hasDelta) {
+            row = {};
+            for (const [key, value] of Object.entries(step)) {
+                const field = key.endsWith('Delta') ? key.slice(0, -'Delta'.length) : null;
+                if (SCREEN_FIELDS.includes(field)) {
+                    if (!(field in prev)) throw new Error(`${key} without an earlier keyframe`);
+                    row[field] = applyScreenDelta(prev[field], value);
+                } else {
+                    row[key] = value;
+                }
+            }
+        }
+        for (const field of SCREEN_FIELDS) {
+            if (isScreenValue(row[field])) prev[field] = row[field];
+        }
+        return row;
+    });
+    return out;
+}
+
+// Delta-encoded checkpoints (c-harness/checkpoint_delta.py): the first
+// checkpoint of each `checkpoints` list is full, later ones may be
+// { delta: { set, rows, cells, edits, unset, keys } } against the one before.
+const CHECKPOINT_ENCODING_VERSION = 1;
+const CHECKPOINT_HOLDERS = ['startup', 'steps', 'levels'];
+
+function isCheckpointDelta(entry) {
+    return !!entry && typeof entry === 'object' && !Array.isArray(entry)
+        && Object.keys(entry).length === 1 && 'delta' in entry;
+}
+
+function applyRowDelta(prev, delta) {
+    const rows = prev.split('|');
+    const [count, ...edits] = delta;
+    while (rows.length < count) rows.push('');
+    for (const [row, text] of edits) rows[row] = text;
+    rows.length = count;
+    return rows.join('|');
+}
+
+function applyCellRuns(prev, runs) {
+    const grid = prev.map((row) => [...row]);
+    for (const [y, x, values] of runs) grid[y].splice(x, values.length, ...values);
+    return grid;
+}
+
+function applyListEdits(prev, edits) {
+    const out = [];
+    let pos = 0;
+    for (const [start, end, items] of edits) {
+        out.push(...prev.slice(pos, start), ...items);
+        pos = end;
+    }
+    out.push(...prev.slice(pos));
+    return out;
+}
+
+function applyCheckpointDelta(prev, delta) {
+    const sets = delta.set || {};
+    const rows = delta.rows || {};
+    const cells = delta.cells || {};
+    const edits = delta.edits || {};
+    let keys = delta.keys;
+    if (!keys) {
+        const unset = new Set(delta.unset || []);
+        keys = Object.keys(prev).filter((key) => !unset.has(key));
+        keys.push(...Object.keys(sets).filter((key) => !(key in prev)));
+    }
+    const out = {};
+    for (const key of keys) {
+        if (key in sets) out[key] = sets[key];
+        else if (key in rows) out[key] = applyRowDelta(prev[key], rows[key]);
+        else if (key in cells) out[key] = applyCellRuns(prev[key], cells[key]);
+        else if (key in edits) out[key] = applyListEdits(prev[key], edits[key]);
+        else out[key] = prev[key];
+    }
+    return out;
+}
+
+function expandCheckpoints(checkpoints) {
+    let prev = null;
+    return checkpoints.map((entry) => {
+        if (isCheckpointDelta(entry)) {
+            if (!prev || typeof prev !== 'object') {
+                throw new Error('checkpoint delta without a full checkpoint before it');
+            }
+            entry = applyCheckpointDelta(prev, entry.delta);
+        }
+        prev = entry;
+        return entry;
+    });
+}
+
+function expandHolderCheckpoints(holder) {
+    if (!holder || typeof holder !== 'object' || !Array.isArray(holder.checkpoints)) return holder;
+    return { ...holder, checkpoints: expandCheckpoints(holder.checkpoints) };
+}
+
+export function expandSessionCheckpoints(raw) {
+    const encoding = raw?.checkpointEncoding;
+    if (!encoding) return raw;
+    if (encoding.version !== CHECKPOINT_ENCODING_VERSION) {
+        throw new Error(`unsupported checkpointEncoding version ${encoding.version}`);
+    }
+    const { checkpointEncoding: _encoding, ...out } = raw;
+    for (const key of CHECKPOINT_HOLDERS) {
+        if (!(key in out)) continue;
+        const value = out[key];
+        if (Array.isArray(value)) out[key] = value.map(expandHolderCheckpoints);
+        else out[key] = expandHolderCheckpoints(value);
+    }
+    return out;
+}
+
 function normalizeStep(step, index) {
     const row = step || {};
     const rng = Array.isArray(row.rng) ? row.rng : [];
@@ -153,6 +337,7 @@ function normalizeLevels(levels) {
 }
 
 export function normalizeSession(raw, meta = {}) {
+    raw = expandSessionCheckpoints(expandSessionScreens(expandSessionRng(raw)));
     const file = meta.file || raw?.file || 'unknown.session.json';
     const dir = meta.dir || raw?.dir || '';
     const version = Number.isInteger(raw?.version) ? raw.version : 1;
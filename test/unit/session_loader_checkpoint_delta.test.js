@@ -0,0 +1,70 @@
+import { describe, test } from 'node:test';
+import assert from 'node:assert/strict';
+
+import { expandSessionCheckpoints, normalizeSession } from '../comparison/session_loader.js';
+
+describe('session loader checkpoint deltas', () => {
+
+const full = {
+    phase: 'after_makelevel',
+    typGrid: '3:1,2|5:2|',
+    flagGrid: [[0, 0, 0, 0], [0, 1, 1, 0]],
+    monsters: [{ id: 1 }, { id: 2 }, { id: 3 }],
+    rooms: [],
+};
+
+const encoded = {
+    version: 3,
+    seed: 1,
+    checkpointEncoding: { version: 1 },
+    startup: {
+        rng: [],
+        checkpoints: [
+            full,
+            { delta: {
+                set: { phase: 'after_mineralize' },
+                rows: { typGrid: [4, [1, '4:2,1'], [3, '2:3']] },
+                cells: { flagGrid: [[0, 2, [4, 4]], [1, 0, [9]]] },
+                edits: { monsters: [[1, 2, []], [3, 3, [{ id: 4 }]]] },
+            } },
+            { delta: { unset: ['rooms'], set: { doors: [] }, keys: ['doors', 'phase', 'typGrid', 'flagGrid', 'monsters'] } },
+        ],
+    },
+    steps: [{ key: null, action: 'startup', rng: [] }],
+};
+
+test('expandSessionCheckpoints restores full checkpoints', () => {
+    const raw = expandSessionCheckpoints(encoded);
+    assert.equal(raw.checkpointEncoding, undefined);
+    const [first, second, third] = raw.startup.checkpoints;
+    assert.equal(first, full);
+    assert.deepEqual(second, {
+        phase: 'after_mineralize',
+        typGrid: '3:1,2|4:2,1||2:3',
+        flagGrid: [[0, 0, 4, 4], [9, 1, 1, 0]],
+        monsters: [{ id: 1 }, { id: 3 }, { id: 4 }],
+        rooms: [],
+    });
+    assert.deepEqual(Object.keys(third), ['doors', 'phase', 'typGrid', 'flagGrid', 'monsters']);
+    assert.deepEqual(third.flagGrid, second.flagGrid);
+    // The input is left untouched.
+    assert.deepEqual(full.flagGrid, [[0, 0, 0, 0], [0, 1, 1, 0]]);
+    assert.ok(!('levels' in raw));
+});
+
+test('expandSessionCheckpoints passes full-checkpoint sessions through', () => {
+    const raw = { version: 3, startup: { checkpoints: [full] }, steps: [] };
+    assert.equal(expandSessionCheckpoints(raw), raw);
+});
+
+test('expandSessionCheckpoints rejects a delta before any full checkpoint', () => {
+    const raw = { checkpointEncoding: { version: 1 }, levels: [{ checkpoints: [{ delta: {} }] }] };
+    assert.throws(() => expandSessionCheckpoints(raw), /without a full checkpoint/);
+});
+
+test('normalizeSession expands checkpoint deltas', () => {
+    const normalized = normalizeSession(encoded, { file: 'tmp.session.json', dir: '.' });
+    assert.equal(normalized.startup.checkpoints[1].phase, 'after_mineralize');
+});
+
+});
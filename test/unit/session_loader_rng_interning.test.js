@@ -0,0 +1,45 @@
+import { describe, test } from 'node:test';
+import assert from 'node:assert/strict';
+
+import { expandSessionRng, normalizeSession } from '../comparison/session_loader.js';
+
+describe('session loader interned rng', () => {
+
+const interned = {
+    version: 3,
+    seed: 1,
+    rngTable: {
+        version: 1,
+        calls: ['rn2(12)', 'd(2,6)'],
+        sites: ['mon.c:1145', 'newmonhp(makemon.c:1044)'],
+    },
+    steps: [
+        { key: null, action: 'startup', rng: [[0, 2, 0], '>makemon @ m(x.c:1)', [1, -1]], screen: '' },
+        { key: 's', action: 'search', rng: [[1, 7, 1], '^place[1,2]'], screen: '' },
+    ],
+    levels: [{ depth: 1, rng: [[0, 11]] }],
+};
+
+test('expandSessionRng restores canonical rng strings', () => {
+    const raw = expandSessionRng(interned);
+    assert.equal(raw.rngTable, undefined);
+    assert.deepEqual(raw.steps[0].rng, ['rn2(12)=2 @ mon.c:1145', '>makemon @ m(x.c:1)', 'd(2,6)=-1']);
+    assert.deepEqual(raw.steps[1].rng, ['d(2,6)=7 @ newmonhp(makemon.c:1044)', '^place[1,2]']);
+    assert.deepEqual(raw.levels[0].rng, ['rn2(12)=11']);
+    // The input is left untouched.
+    assert.deepEqual(interned.steps[0].rng[0], [0, 2, 0]);
+});
+
+test('expandSessionRng passes string-form sessions through', () => {
+    const raw = { version: 3, steps: [{ key: null, rng: ['rn2(5)=1'] }] };
+    assert.equal(expandSessionRng(raw), raw);
+});
+
+test('normalizeSession expands interned rng', () => {
+    const normalized = normalizeSession(interned, { file: 'tmp.session.json', dir: '.' });
+    assert.equal(normalized.startup?.rng[0], 'rn2(12)=2 @ mon.c:1145');
+    assert.deepEqual(normalized.steps[0]?.rng, ['d(2,6)=7 @ newmonhp(makemon.c:1044)', '^place[1,2]']);
+    assert.deepEqual(normalized.levels[0]?.rng, ['rn2(12)=11']);
+});
+
+});
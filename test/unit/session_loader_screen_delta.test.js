@@ -0,0 +1,51 @@
+import { describe, test } from 'node:test';
+import assert from 'node:assert/strict';
+
+import { expandSessionScreens, normalizeSession } from '../comparison/session_loader.js';
+
+describe('session loader screen deltas', () => {
+
+const encoded = {
+    version: 3,
+    seed: 1,
+    screenEncoding: { version: 1, keyframeEvery: 50 },
+    steps: [
+        { key: null, action: 'startup', rng: [], screen: 'Hello\n @..\nDlvl:1' },
+        { key: 'l', action: 'move', rng: [], screenDelta: [3, [1, 0, 3, '.@']] },
+        { key: 'l', action: 'move', rng: [], screenDelta: [2, [0, 5, 0, ' there']] },
+        { key: 'i', action: 'inventory', rng: [], screen: ['a - a +0 short sword', ''] },
+        { key: ':', action: 'look', rng: [], screenDelta: [3, [0, 0, 1, 'b'], [2, 0, 0, 'x']] },
+    ],
+};
+
+test('expandSessionScreens restores full screens', () => {
+    const raw = expandSessionScreens(encoded);
+    assert.equal(raw.screenEncoding, undefined);
+    assert.deepEqual(raw.steps.map((step) => step.screen), [
+        'Hello\n @..\nDlvl:1',
+        'Hello\n.@.\nDlvl:1',
+        'Hello there\n.@.',
+        ['a - a +0 short sword', ''],
+        ['b - a +0 short sword', '', 'x'],
+    ]);
+    assert.ok(raw.steps.every((step) => !('screenDelta' in step)));
+    // The input is left untouched.
+    assert.deepEqual(encoded.steps[1].screenDelta, [3, [1, 0, 3, '.@']]);
+});
+
+test('expandSessionScreens passes full-screen sessions through', () => {
+    const raw = { version: 3, steps: [{ key: null, screen: 'x' }] };
+    assert.equal(expandSessionScreens(raw), raw);
+});
+
+test('expandSessionScreens rejects a delta before any keyframe', () => {
+    const raw = { screenEncoding: { version: 1 }, steps: [{ key: 'h', screenDelta: [1] }] };
+    assert.throws(() => expandSessionScreens(raw), /without an earlier keyframe/);
+});
+
+test('normalizeSession expands screen deltas', () => {
+    const normalized = normalizeSession(encoded, { file: 'tmp.session.json', dir: '.' });
+    assert.equal(normalized.steps[0]?.screen[1], '.@.');
+});
+
+});